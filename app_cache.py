@@ -0,0 +1,47 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : app_cache.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： EasyPack 自身的持久化缓存目录与JSON读写工具。
+
+import json
+import os
+import tempfile
+
+# 可通过环境变量指定缓存目录，默认为用户目录下的 .easypack
+CACHE_DIR_ENV = "EASYPACK_CACHE_DIR"
+
+
+def cache_dir():
+    """返回（并在需要时创建）EasyPack的缓存目录"""
+    path = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".easypack")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_json(name, default=None):
+    """读取缓存目录下的JSON文件，不存在或损坏时返回default"""
+    try:
+        with open(os.path.join(cache_dir(), name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(name, data):
+    """原子地写入缓存目录下的JSON文件，写入失败时静默忽略"""
+    tmp_path = None
+    try:
+        directory = cache_dir()
+        # 每次写入使用唯一的临时文件，多个线程或进程同时写入时互不干扰
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory)
+        with open(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(directory, name))
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,392 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : benchmark.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 打包基准测试。在选项矩阵（单文件/单目录、是否清理、是否UPX、是否排除模块）上重复构建 pack_test.py
+#                及可选的其他脚本，记录构建耗时、峰值内存、产物大小和文件数，输出中位数/p95 到 JSON 和 CSV。
+#                用法: python benchmark.py --trials 5 [--env myenv] [--script other.py] [--compare 上次结果.json]
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from build_config import BuildConfig, artifact_stats, build_command
+from build_phases import PhaseTimer
+from resource_limits import tree_rss
+from upx_cache import make_upx_pass
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pack_test.py")
+# "排除模块" 组合默认排除的标准库模块，pack_test.py 用不到它们
+DEFAULT_EXCLUDES = ("tkinter", "unittest", "pydoc", "doctest", "test")
+# 统计的指标
+METRICS = ("wall_time", "peak_memory_mb", "artifact_size_mb", "file_count")
+# 峰值内存的采样间隔（秒），仅在安装了 psutil 时使用
+MEMORY_SAMPLE_INTERVAL = 0.05
+
+
+class BenchmarkCase:
+    """选项矩阵中的一个组合"""
+
+    def __init__(self, script, onefile, clean, upx, excludes):
+        self.script = os.path.abspath(script)
+        self.onefile = onefile
+        self.clean = clean
+        self.upx = upx
+        self.excludes = tuple(excludes)
+
+    @property
+    def case_id(self):
+        script_name = os.path.splitext(os.path.basename(self.script))[0]
+        return "_".join([
+            script_name,
+            "onefile" if self.onefile else "onedir",
+            "clean" if self.clean else "warm",
+            "upx" if self.upx else "noupx",
+            "excludes" if self.excludes else "full",
+        ])
+
+    def options(self):
+        return {"onefile": self.onefile, "clean": self.clean, "upx": self.upx, "excludes": list(self.excludes)}
+
+    def config(self, python_executable, paths, upx_dir=""):
+        """每个组合使用不同的程序名称，各自的 build/dist 子目录互不干扰"""
+        return BuildConfig(python_executable=python_executable, script=self.script, name=self.case_id,
+                           onefile=self.onefile, noconsole=True, clean=self.clean, paths=paths,
+                           exclude_modules=self.excludes, upx=self.upx, upx_dir=upx_dir or "")
+
+    @staticmethod
+    def command(config):
+        command, error = build_command(config)
+        if error:
+            raise ValueError(error)
+        # 非交互运行：dist 目录已存在时不询问是否覆盖
+        return f"{command} --noconfirm"
+
+
+def _windows_peak_working_set(handle):
+    """Windows 上没有 psutil 时，读取进程自身的峰值工作集（字节）"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    if ctypes.windll.psapi.GetProcessMemoryInfo(int(handle), ctypes.byref(counters), counters.cb):
+        return counters.PeakWorkingSetSize
+    return None
+
+
+def measure_build(command, log_path):
+    """
+    执行一次构建，返回 {wall_time, peak_memory_mb, memory_method, return_code, phases}。
+    峰值内存：安装了 psutil 时为整个进程树的内存之和的峰值；否则在 POSIX 上为进程树中最大单个进程的峰值
+    （wait4 的 ru_maxrss），在 Windows 上为构建主进程的峰值工作集。
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    phase_timer = PhaseTimer()
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        process = subprocess.Popen(shlex.split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, text=True, encoding='utf-8', errors='replace',
+                                   env=env)
+        peak = [0]
+        sampler = None
+        if psutil is not None:
+            stop_sampling = threading.Event()
+
+            def sample():
+                while not stop_sampling.is_set():
+                    peak[0] = max(peak[0], tree_rss(process.pid))
+                    stop_sampling.wait(MEMORY_SAMPLE_INTERVAL)
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+
+        for line in process.stdout:
+            phase_timer.feed(line)
+            log_file.write(line)
+
+        if sampler is not None:
+            stop_sampling.set()
+            sampler.join()
+            return_code = process.wait()
+            peak_bytes, method = peak[0], "psutil_tree_sum"
+        elif hasattr(os, "wait4"):
+            _, status, rusage = os.wait4(process.pid, 0)
+            return_code = os.waitstatus_to_exitcode(status)
+            process.returncode = return_code
+            # Linux 上 ru_maxrss 的单位是KB，macOS 上是字节
+            peak_bytes = rusage.ru_maxrss if sys.platform == 'darwin' else rusage.ru_maxrss * 1024
+            method = "rusage_max_process"
+        else:
+            return_code = process.wait()
+            peak_bytes, method = _windows_peak_working_set(process._handle), "peak_working_set"
+    wall_time = time.perf_counter() - start
+    phase_timer.finish()
+    return {
+        "wall_time": round(wall_time, 3),
+        "peak_memory_mb": round(peak_bytes / 2 ** 20, 1) if peak_bytes else None,
+        "memory_method": method,
+        "return_code": return_code,
+        "phases": {phase["name"]: phase["duration"] for phase in phase_timer.summary()["phases"]},
+    }
+
+
+def percentile(values, p):
+    """最近秩法的百分位数"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return {"median": round(median, 3), "p95": percentile(ordered, 95),
+            "min": ordered[0], "max": ordered[-1]}
+
+
+def _remove_outputs(config):
+    """删除某个组合以前的 build 和 dist 输出，使清理构建从冷状态开始"""
+    for path in (os.path.join(config.build_path, config.app_name), config.artifact_path):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def run_upx_pass(upx_pass, result, log_path):
+    """单目录UPX组合在构建后执行UPX压缩（与EasyPack相同），耗时计入构建耗时"""
+    start = time.perf_counter()
+    with open(log_path, 'a', encoding='utf-8') as log_file:
+        succeeded = upx_pass.run(log_file.write)
+    duration = round(time.perf_counter() - start, 3)
+    result["wall_time"] = round(result["wall_time"] + duration, 3)
+    result["phases"]["UPX"] = duration
+    if not succeeded:
+        result["return_code"] = 1
+
+
+def build_once(config, command, log_path):
+    """执行一次构建；需要时接着执行构建后的UPX压缩"""
+    result = measure_build(command, log_path)
+    upx_pass = make_upx_pass(config)
+    if result["return_code"] == 0 and upx_pass is not None:
+        run_upx_pass(upx_pass, result, log_path)
+    return result
+
+
+def run_case(case, python_executable, paths, upx_dir, trials, log_dir):
+    """运行一个组合的所有轮次；非清理组合先做一次不计时的预热构建"""
+    config = case.config(python_executable, paths, upx_dir)
+    command = case.command(config)
+    print(f"\n=== {case.case_id} ===\n{command}", flush=True)
+
+    if not case.clean:
+        _remove_outputs(config)
+        warmup = build_once(config, command, os.path.join(log_dir, f"{case.case_id}_warmup.log"))
+        print(f"  预热: {warmup['wall_time']:.2f} 秒 (退出代码 {warmup['return_code']})", flush=True)
+
+    runs = []
+    for trial in range(1, trials + 1):
+        if case.clean:
+            _remove_outputs(config)
+        result = build_once(config, command, os.path.join(log_dir, f"{case.case_id}_{trial}.log"))
+        if result["return_code"] == 0 and os.path.exists(config.artifact_path):
+            result["artifact_size_mb"], result["file_count"] = artifact_stats(config.artifact_path)
+        else:
+            result["artifact_size_mb"], result["file_count"] = None, None
+        runs.append(result)
+        memory = f"{result['peak_memory_mb']} MB" if result["peak_memory_mb"] is not None else "-"
+        print(f"  第 {trial}/{trials} 轮: {result['wall_time']:.2f} 秒, 峰值内存 {memory}, "
+              f"产物 {result['artifact_size_mb']} MB / {result['file_count']} 个文件, "
+              f"退出代码 {result['return_code']}", flush=True)
+
+    successful = [run for run in runs if run["return_code"] == 0]
+    return {
+        "case": case.case_id,
+        "script": case.script,
+        "options": case.options(),
+        "command": command,
+        "failures": len(runs) - len(successful),
+        "runs": runs,
+        "stats": {metric: summarize([run[metric] for run in successful]) for metric in METRICS},
+    }
+
+
+def _pyinstaller_version(python_executable):
+    try:
+        proc = subprocess.run([python_executable, "-c", "import PyInstaller; print(PyInstaller.__version__)"],
+                              capture_output=True, text=True, timeout=60)
+        return proc.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def write_results(report, json_path, csv_path):
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        header = ["case", "onefile", "clean", "upx", "excludes", "trials", "failures"]
+        for metric in METRICS:
+            header.extend([f"{metric}_median", f"{metric}_p95"])
+        writer.writerow(header)
+        for result in report["results"]:
+            options = result["options"]
+            row = [result["case"], options["onefile"], options["clean"], options["upx"],
+                   " ".join(options["excludes"]), len(result["runs"]), result["failures"]]
+            for metric in METRICS:
+                stats = result["stats"][metric]
+                row.extend([stats["median"], stats["p95"]] if stats else ["", ""])
+            writer.writerow(row)
+
+
+def compare_results(report, baseline, threshold):
+    """与基线结果比较各组合的耗时中位数，返回超过阈值的退化描述列表"""
+    baseline_stats = {result["case"]: result["stats"] for result in baseline.get("results", [])}
+    regressions = []
+    print(f"\n与基线比较 (阈值 {threshold:.0%}):")
+    for result in report["results"]:
+        old = (baseline_stats.get(result["case"]) or {}).get("wall_time")
+        new = result["stats"]["wall_time"]
+        if not old or not new:
+            continue
+        change = new["median"] / old["median"] - 1 if old["median"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  <-- 退化"
+            regressions.append(f"{result['case']}: {old['median']:.2f} -> {new['median']:.2f} 秒 ({change:+.1%})")
+        print(f"  {result['case']:<48}{old['median']:>8.2f} -> {new['median']:>8.2f} 秒 ({change:+.1%}){flag}")
+    return regressions
+
+
+def build_matrix(scripts, modes, cleans, upxs, excludes_options, excludes):
+    cases = []
+    for script, onefile, clean, upx, use_excludes in itertools.product(scripts, modes, cleans, upxs,
+                                                                      excludes_options):
+        cases.append(BenchmarkCase(script, onefile, clean, upx, excludes if use_excludes else ()))
+    return cases
+
+
+def _on_off(value, name):
+    choices = {"on": [True], "off": [False], "both": [True, False]}
+    if value not in choices:
+        raise argparse.ArgumentTypeError(f"{name} 只能是 on、off 或 both")
+    return choices[value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EasyPack 打包基准测试")
+    parser.add_argument("--script", action="append", default=[], help="额外测试的脚本，可多次指定")
+    parser.add_argument("--skip-pack-test", action="store_true", help="不测试自带的 pack_test.py")
+    parser.add_argument("--env", help="Conda环境名称或路径（默认使用 --python 或当前解释器）")
+    parser.add_argument("--python", help="运行PyInstaller的Python解释器")
+    parser.add_argument("--trials", type=int, default=3, help="每个组合计时的轮数（默认3）")
+    parser.add_argument("--modes", choices=["onefile", "onedir", "both"], default="both")
+    parser.add_argument("--clean", default="both", help="on / off / both（默认both）")
+    parser.add_argument("--upx", default=None, help="on / off / both（默认: 找到UPX时为both，否则为off）")
+    parser.add_argument("--upx-dir", help="UPX所在目录（默认在PATH中查找）")
+    parser.add_argument("--excludes", default="both", help="on / off / both（默认both）")
+    parser.add_argument("--exclude", action="append", default=[],
+                        help=f"排除的模块，可多次指定（默认: {', '.join(DEFAULT_EXCLUDES)}）")
+    parser.add_argument("--output-dir", default="benchmark_results", help="结果输出目录")
+    parser.add_argument("--compare", metavar="JSON", help="与之前的结果比较，耗时中位数退化超过阈值时退出代码为1")
+    parser.add_argument("--threshold", type=float, default=0.10, help="退化阈值（默认0.10，即10%%）")
+    args = parser.parse_args(argv)
+
+    scripts = [os.path.abspath(s) for s in args.script]
+    if not args.skip_pack_test:
+        # pack_test.py 只有一个文件，复制到结果目录中构建，输出不会落在仓库目录里
+        work_dir = os.path.join(args.output_dir, "work")
+        os.makedirs(work_dir, exist_ok=True)
+        scripts.insert(0, shutil.copy2(DEFAULT_SCRIPT, work_dir))
+    if not scripts:
+        parser.error("没有要测试的脚本")
+
+    python_executable = args.python or sys.executable
+    paths = ""
+    if args.env:
+        # 与命令行构建使用相同的环境解析和探测逻辑
+        from easypack import resolve_env
+        from env_probe import probe_env
+        env_path = resolve_env(args.env)
+        if env_path is None:
+            parser.error(f"未找到Conda环境 '{args.env}'")
+        info = probe_env(env_path)
+        python_executable = info["executable"]
+        paths = os.pathsep.join(info["site_packages"])
+
+    upx_dir = args.upx_dir
+    upx_found = bool(upx_dir) or shutil.which("upx") is not None
+    try:
+        modes = {"onefile": [True], "onedir": [False], "both": [True, False]}[args.modes]
+        cleans = _on_off(args.clean, "--clean")
+        upxs = _on_off(args.upx or ("both" if upx_found else "off"), "--upx")
+        excludes_options = _on_off(args.excludes, "--excludes")
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if True in upxs and not upx_found:
+        parser.error("未找到UPX，请用 --upx-dir 指定或把 upx 加入 PATH")
+
+    cases = build_matrix(scripts, modes, cleans, upxs, excludes_options, args.exclude or DEFAULT_EXCLUDES)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    log_dir = os.path.join(args.output_dir, f"logs-{timestamp}")
+    os.makedirs(log_dir, exist_ok=True)
+
+    report = {
+        "timestamp": timestamp,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": python_executable,
+        "pyinstaller_version": _pyinstaller_version(python_executable),
+        "trials": args.trials,
+        "results": [],
+    }
+    print(f"共 {len(cases)} 个组合，每个 {args.trials} 轮；PyInstaller {report['pyinstaller_version']}")
+    for case in cases:
+        report["results"].append(run_case(case, python_executable, paths, upx_dir, args.trials, log_dir))
+
+    json_path = os.path.join(args.output_dir, f"benchmark-{timestamp}.json")
+    csv_path = os.path.join(args.output_dir, f"benchmark-{timestamp}.csv")
+    write_results(report, json_path, csv_path)
+    print(f"\n结果已写入:\n  {json_path}\n  {csv_path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print("\n发现退化:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0 if all(result["failures"] == 0 for result in report["results"]) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,663 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_agent.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 分布式构建。构建代理（BuildAgent）是运行在构建主机上的无界面EasyPack，通过TCP接收构建任务
+#                （配置 + 输入文件的 tar.gz），在指定的环境中用 BuildRunner 执行PyInstaller，实时返回日志，
+#                成功后把产物打包发回。客户端的 AgentPool 在每次派发前查询各代理的负载，选择最空闲的一个；
+#                RemoteBuildRunner 提供与 BuildRunner 相同的接口，构建队列可以直接用它代替本地构建。
+#                协议：每一帧为 1 字节类型（J: JSON消息，D: 数据块）+ 4 字节长度 + 内容；数据流以空数据块结束。
+
+import hmac
+import json
+import os
+import secrets
+import select
+import shutil
+import socket
+import socketserver
+import struct
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app_cache import cache_dir
+from build_cache import PLAN_SKIP
+from build_config import CONFIG_DEFAULTS, BuildConfig, build_command
+from build_runner import BuildRunner
+from data_scanner import DEFAULT_DATA_EXCLUDES, make_data_stage, scan_data_entry
+from resource_limits import build_slots
+from shared_cache import make_shared_cache
+from spec_file import make_spec_file
+from upx_cache import make_upx_pass
+
+DEFAULT_AGENT_PORT = 8765
+# 连接代理、查询负载的超时时间（秒）
+CONNECT_TIMEOUT = 5.0
+STATUS_TIMEOUT = 3.0
+# 等待取消或下一帧时的轮询间隔（秒）
+POLL_INTERVAL = 0.2
+# 数据块大小
+CHUNK_SIZE = 256 * 1024
+# 单个JSON消息的最大长度，防止异常的请求占用大量内存
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+# 返回产物时附带的 spec 目录在包内的名称
+SPEC_ARCNAME = ".easypack-spec"
+# 代理所在机器上不需要的字段：解释器和模块路径由代理按环境名确定，UPX在代理的 PATH 中查找
+LOCAL_FIELDS = ("python_executable", "paths", "upx_dir")
+
+_HEADER = struct.Struct("!cI")
+KIND_MESSAGE = b"J"
+KIND_DATA = b"D"
+
+
+class AgentError(Exception):
+    """构建代理不可用、拒绝了任务或通信中断"""
+
+
+def parse_agents(text):
+    """把 "host:port, host2" 形式的代理列表解析为 [(host, port)]，省略端口时使用默认端口"""
+    agents = []
+    for item in text.replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, sep, port = item.rpartition(":")
+        if not sep:
+            host, port = item, str(DEFAULT_AGENT_PORT)
+        if not host or not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"无效的构建代理地址: {item}")
+        agents.append((host.strip("[]"), int(port)))
+    return agents
+
+
+# --- 帧协议 ---
+
+class _Connection:
+    """按帧收发的连接；is_cancelled 返回True时，阻塞中的接收会抛出 AgentError"""
+
+    def __init__(self, sock, is_cancelled=lambda: False):
+        self.sock = sock
+        self.is_cancelled = is_cancelled
+
+    def _send(self, frame):
+        # 接收时的短超时只用于响应取消，发送始终阻塞到全部写出，避免对方处理较慢时写出半个帧
+        timeout = self.sock.gettimeout()
+        self.sock.settimeout(None)
+        try:
+            self.sock.sendall(frame)
+        finally:
+            self.sock.settimeout(timeout)
+
+    def send_message(self, message):
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8')
+        self._send(_HEADER.pack(KIND_MESSAGE, len(data)) + data)
+
+    def send_data(self, data):
+        self._send(_HEADER.pack(KIND_DATA, len(data)) + data)
+
+    def _recv_exact(self, size):
+        buffer = bytearray()
+        while len(buffer) < size:
+            if self.is_cancelled():
+                raise AgentError("已取消")
+            try:
+                chunk = self.sock.recv(min(size - len(buffer), CHUNK_SIZE))
+            except socket.timeout:
+                continue
+            if not chunk:
+                raise AgentError("连接已断开")
+            buffer += chunk
+        return bytes(buffer)
+
+    def recv_frame(self):
+        kind, size = _HEADER.unpack(self._recv_exact(_HEADER.size))
+        if kind not in (KIND_MESSAGE, KIND_DATA) or (kind == KIND_MESSAGE and size > MAX_MESSAGE_SIZE):
+            raise AgentError("无效的数据帧")
+        payload = self._recv_exact(size)
+        return kind, json.loads(payload.decode('utf-8')) if kind == KIND_MESSAGE else payload
+
+    def recv_message(self):
+        kind, payload = self.recv_frame()
+        if kind != KIND_MESSAGE:
+            raise AgentError("期望消息，收到了数据块")
+        return payload
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class _DataWriter:
+    """把写入的内容按数据块发送，供 tarfile 的流式写入使用；close 时发送结束标记"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        if self.connection.is_cancelled():
+            raise AgentError("已取消")
+        self.buffer += data
+        self.total += len(data)
+        while len(self.buffer) >= CHUNK_SIZE:
+            self.connection.send_data(bytes(self.buffer[:CHUNK_SIZE]))
+            del self.buffer[:CHUNK_SIZE]
+        return len(data)
+
+    def close(self):
+        if self.buffer:
+            self.connection.send_data(bytes(self.buffer))
+            self.buffer.clear()
+        self.connection.send_data(b"")
+
+
+class _DataReader:
+    """从连接中读取数据块直到结束标记，供 tarfile 的流式读取使用"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = b""
+        self.finished = False
+        self.total = 0
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            kind, payload = self.connection.recv_frame()
+            if kind != KIND_DATA:
+                raise AgentError("数据流中出现了意外的消息")
+            if not payload:
+                self.finished = True
+            self.buffer += payload
+            self.total += len(payload)
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def drain(self):
+        """读完剩余的数据块（tarfile 读到结束块后可能不再读取末尾的填充）"""
+        while not self.finished:
+            self.read(CHUNK_SIZE)
+
+
+def _extract(archive, target):
+    """解包到 target，拒绝绝对路径、.. 以及指向目录之外的链接"""
+    if hasattr(tarfile, "data_filter"):
+        archive.extractall(target, filter="data")
+        return
+    root = os.path.realpath(target)
+    for member in archive:
+        path = os.path.realpath(os.path.join(root, member.name))
+        link = os.path.realpath(os.path.join(os.path.dirname(path), member.linkname)) if member.issym() else path
+        if member.islnk():
+            link = os.path.realpath(os.path.join(root, member.linkname))
+        if os.path.commonpath([root, path]) != root or os.path.commonpath([root, link]) != root:
+            raise AgentError(f"压缩包中包含不安全的路径: {member.name}")
+        if member.isdev():
+            continue
+        archive.extract(member, root)
+
+
+# --- 构建输入 ---
+
+def plan_inputs(config):
+    """
+    确定需要上传的构建输入：脚本所在目录、图标、附加数据，以及 spec 模式下的 spec 目录。
+    项目目录中的文件在包内保持原来的相对位置（spec 中的路径相对于 spec 目录，这样在代理上仍然有效）；
+    项目之外的图标和附加数据放在 inputs/ 下，附加数据在本机按模式过滤后上传。
+    返回 (代理使用的配置, [(本机路径, 包内路径, 是否包含子目录)])，配置中的路径都相对于压缩包的根目录。
+    """
+    project_dir = os.path.dirname(os.path.abspath(config.script))
+    values = {field: getattr(config, field) for field in CONFIG_DEFAULTS if field not in LOCAL_FIELDS}
+    members = {}  # {包内路径: (本机路径, 是否包含子目录)}
+
+    def project_name(path):
+        rel_path = os.path.relpath(os.path.abspath(path), project_dir)
+        if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep) or os.path.isabs(rel_path):
+            return None
+        return "project" if rel_path == os.curdir else "project/" + rel_path.replace(os.sep, "/")
+
+    # 项目目录中的 output 只保留 spec 目录，其余都是构建结果
+    project = scan_data_entry(project_dir, exclude=DEFAULT_DATA_EXCLUDES + ("/output",))
+    for rel_path, _, _ in project.files:
+        members[f"project/{rel_path}"] = (os.path.join(project_dir, rel_path), False)
+    spec_dir = os.path.dirname(config.spec_path)
+    if config.spec_mode and os.path.isdir(spec_dir):
+        members[project_name(spec_dir)] = (spec_dir, True)
+    values["script"] = project_name(config.script)
+
+    if config.icon:
+        values["icon"] = project_name(config.icon) or f"inputs/icon/{os.path.basename(config.icon)}"
+        members[values["icon"]] = (config.icon, False)
+
+    data_files = []
+    for index, (source, dest, include, exclude) in enumerate(config.data_files):
+        name = project_name(source)
+        if name is None:
+            # 项目之外的数据在本机过滤，代理直接使用过滤后的文件
+            name = f"inputs/data/{index}/{os.path.basename(os.path.normpath(source))}"
+            data_files.append((name, dest, (), ()))
+        else:
+            data_files.append((name, dest, include, exclude))
+        members.setdefault(name, (source, False))
+        if os.path.isdir(source):
+            for rel_path, _, _ in scan_data_entry(source, include, exclude).files:
+                members.setdefault(f"{name}/{rel_path}", (os.path.join(source, rel_path), False))
+    values["data_files"] = data_files
+    return values, [(path, name, recursive) for name, (path, recursive) in members.items()]
+
+
+def pack_inputs(members, fileobj):
+    """把 plan_inputs 确定的文件以 tar.gz 流的形式写入 fileobj"""
+    with tarfile.open(fileobj=fileobj, mode="w|gz") as archive:
+        for path, name, recursive in members:
+            archive.add(path, name, recursive=recursive)
+
+
+def config_from_message(values, root, python_executable):
+    """由任务消息中的配置还原 BuildConfig，相对路径以 root 为基准"""
+    values = dict(values)
+    for field, default in CONFIG_DEFAULTS.items():
+        # JSON 中的列表还原为元组，命令片段的缓存要求参数可哈希
+        if isinstance(default, tuple) and field in values:
+            values[field] = tuple(tuple(item) if isinstance(item, list) else item for item in values[field])
+    values["script"] = os.path.join(root, values["script"])
+    if values.get("icon"):
+        values["icon"] = os.path.join(root, values["icon"])
+    values["data_files"] = tuple((os.path.join(root, source), dest, tuple(include), tuple(exclude))
+                                 for source, dest, include, exclude in values.get("data_files", ()))
+    values["python_executable"] = python_executable
+    return BuildConfig(**values)
+
+
+# --- 代理 ---
+
+class BuildAgent:
+    """
+    构建代理：接收任务并在本机构建。同时进行的构建数由 capacity 限制，超出的任务在代理上排队。
+    envs 为 {环境名: 环境路径或解释器}，不在其中的名称交给 resolve_env 解析（如Conda环境名）；
+    空的环境名使用运行代理的解释器。
+    """
+
+    def __init__(self, token, envs=None, capacity=None, resolve_env=None, work_dir=None):
+        self.token = token
+        self.envs = dict(envs or {})
+        self.capacity = capacity or max(1, (os.cpu_count() or 2) // 2)
+        self.resolve_env = resolve_env
+        self.work_dir = work_dir or os.path.join(cache_dir(), "agent")
+        self.running = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+        self.server = None
+        build_slots.set_capacity(self.capacity)
+
+    def python_for(self, env_name):
+        """返回环境对应的、已安装PyInstaller的解释器"""
+        if not env_name:
+            return sys.executable
+        target = self.envs.get(env_name)
+        if target is None and self.resolve_env is not None:
+            target = self.resolve_env(env_name)
+        if target is None:
+            raise AgentError(f"代理上没有环境 '{env_name}'")
+        if os.path.isfile(target):
+            return target
+        from env_probe import EnvProbeError, probe_env
+        try:
+            info = probe_env(target)
+        except EnvProbeError as e:
+            raise AgentError(f"探测环境 '{env_name}' 失败: {e}")
+        if not info.get("pyinstaller_version"):
+            raise AgentError(f"代理上的环境 '{env_name}' 中未安装PyInstaller")
+        return info["executable"]
+
+    def status(self):
+        return {"type": "status", "running": self.running, "capacity": self.capacity,
+                "completed": self.completed, "envs": sorted(self.envs)}
+
+    def serve(self, host="127.0.0.1", port=DEFAULT_AGENT_PORT, on_ready=None):
+        """在 host:port 上接受任务，直到 shutdown 被调用；port 为0时自动选择端口"""
+        agent = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                agent.handle(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+            server.daemon_threads = True
+            self.server = server
+            if on_ready is not None:
+                on_ready(server.server_address[:2])
+            server.serve_forever(poll_interval=0.5)
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+    def handle(self, sock):
+        connection = _Connection(sock)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            request = connection.recv_message()
+            if not hmac.compare_digest(str(request.get("token", "")), self.token):
+                connection.send_message({"type": "error", "message": "令牌无效"})
+                return
+            if request.get("action") == "status":
+                connection.send_message(self.status())
+            elif request.get("action") == "build":
+                self._build(connection, request)
+            else:
+                connection.send_message({"type": "error", "message": "未知的请求"})
+        except (AgentError, OSError, ValueError):
+            pass  # 客户端断开或请求无效，丢弃这个连接
+        finally:
+            connection.close()
+
+    def _build(self, connection, request):
+        try:
+            python_executable = self.python_for(request.get("env", ""))
+        except AgentError as e:
+            connection.send_message({"type": "error", "message": str(e)})
+            return
+        with self._lock:
+            self.running += 1
+        try:
+            os.makedirs(self.work_dir, exist_ok=True)
+            root = tempfile.mkdtemp(prefix="job-", dir=self.work_dir)
+            try:
+                connection.send_message({"type": "accepted"})
+                connection.sock.settimeout(None)
+                reader = _DataReader(connection)
+                with tarfile.open(fileobj=reader, mode="r|gz") as archive:
+                    _extract(archive, root)
+                reader.drain()
+                config = config_from_message(request["config"], root, python_executable)
+            except (tarfile.TarError, KeyError, TypeError, ValueError) as e:
+                connection.send_message({"type": "error", "message": f"无效的构建任务: {e}"})
+                return
+            try:
+                self._run(connection, config)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _run(self, connection, config):
+        command, error = build_command(config)
+        if error:
+            connection.send_message({"type": "log", "text": f"错误: {error}\n"})
+            connection.send_message({"type": "exit", "code": 2})
+            return
+
+        runner = None
+
+        def send_log(text):
+            try:
+                connection.send_message({"type": "log", "text": text})
+            except OSError:
+                runner.cancel()  # 客户端已断开
+
+        upx_pass = make_upx_pass(config)
+        runner = BuildRunner(command, config.python_executable, send_log, data_stage=make_data_stage(config),
+                             spec_file=make_spec_file(config), upx_pass=upx_pass,
+                             shared_cache=make_shared_cache(None, upx_pass))
+        done = threading.Event()
+        watcher = threading.Thread(target=self._watch_disconnect, args=(connection.sock, runner, done), daemon=True)
+        watcher.start()
+        try:
+            return_code = runner.run()
+        finally:
+            done.set()
+            watcher.join()
+        if runner.is_cancelled:
+            return
+        # 产物名称以代理为准（例如单文件产物在Windows上带 .exe）
+        connection.send_message({"type": "exit", "code": return_code, "phase_summary": runner.phase_summary,
+                                 "artifact": os.path.basename(config.artifact_path)})
+        if return_code == 0:
+            writer = _DataWriter(connection)
+            with tarfile.open(fileobj=writer, mode="w|gz") as archive:
+                archive.add(config.artifact_path, os.path.basename(config.artifact_path))
+                if config.spec_mode and os.path.isdir(os.path.dirname(config.spec_path)):
+                    archive.add(os.path.dirname(config.spec_path), SPEC_ARCNAME)
+            writer.close()
+
+    @staticmethod
+    def _watch_disconnect(sock, runner, done):
+        """构建期间客户端不再发送任何内容；连接变为可读即表示客户端已断开（取消了构建）"""
+        while not done.is_set():
+            readable, _, _ = select.select([sock], [], [], 0.5)
+            if readable:
+                try:
+                    if not sock.recv(1, socket.MSG_PEEK):
+                        runner.cancel()
+                        return
+                except OSError:
+                    runner.cancel()
+                    return
+                time.sleep(0.5)
+
+
+# --- 客户端 ---
+
+class AgentClient:
+    """一个构建代理的地址和令牌"""
+
+    def __init__(self, host, port, token):
+        self.host = host
+        self.port = port
+        self.token = token
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    def connect(self, is_cancelled=lambda: False, timeout=CONNECT_TIMEOUT):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        except OSError as e:
+            raise AgentError(f"无法连接: {e}")
+        return _Connection(sock, is_cancelled)
+
+    def status(self):
+        """查询代理的负载：{"running", "capacity", ...}"""
+        connection = self.connect(timeout=STATUS_TIMEOUT)
+        try:
+            connection.send_message({"token": self.token, "action": "status"})
+            reply = connection.recv_message()
+        except (OSError, ValueError) as e:
+            raise AgentError(f"无响应: {e}")
+        finally:
+            connection.close()
+        if reply.get("type") != "status":
+            raise AgentError(reply.get("message", "响应无效"))
+        return reply
+
+
+class AgentPool:
+    """
+    一组构建代理。acquire 查询所有代理的负载，选择（运行中 + 正在派发）/容量 最小的一个；
+    可在多个构建线程中同时使用，派发中的任务计入负载，同时开始的任务不会都选中同一个代理。
+    """
+
+    def __init__(self, agents, token):
+        self.clients = [AgentClient(host, port, token) for host, port in agents]
+        self._starting = {}  # {地址: 已选中但代理尚未接受的任务数}
+        self._lock = threading.Lock()
+
+    def _query(self):
+        def query(client):
+            try:
+                return client, client.status(), None
+            except AgentError as e:
+                return client, None, e
+        with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
+            return list(executor.map(query, self.clients))
+
+    def acquire(self, on_output=lambda text: None):
+        """选择最空闲的代理，返回 (AgentClient, 状态)；全部不可用时抛出 AgentError"""
+        with self._lock:
+            candidates = []
+            for client, status, error in self._query():
+                if error is not None:
+                    on_output(f"跳过构建代理 {client.address}: {error}\n")
+                    continue
+                running = status["running"] + self._starting.get(client.address, 0)
+                candidates.append((running / max(1, status["capacity"]), running, client, status))
+            if not candidates:
+                raise AgentError("没有可用的构建代理")
+            _, running, client, status = min(candidates, key=lambda item: item[:2])
+            self._starting[client.address] = self._starting.get(client.address, 0) + 1
+        on_output(f"分配到构建代理 {client.address}（运行中 {running}/{status['capacity']}）\n")
+        return client
+
+    def accepted(self, client):
+        """代理已接受（或拒绝）任务，之后它自己报告的负载中已包含该任务"""
+        with self._lock:
+            self._starting[client.address] -= 1
+
+
+class RemoteBuildRunner:
+    """
+    把一次构建交给 AgentPool 中最空闲的代理执行，接口与 BuildRunner 相同。
+    启用增量构建时先在本机判断，输入未变化则不派发；成功后产物替换本机 dist 中的同名产物。
+    """
+
+    def __init__(self, config, env_name, agents, on_output, incremental=None):
+        self.config = config
+        self.env_name = env_name
+        self.agents = agents
+        self.on_output = on_output
+        self.incremental = incremental
+        self.is_cancelled = False
+        self.skipped = False
+        self.memory_exceeded = False
+        self.phase_summary = None
+
+    def run(self):
+        """执行构建并返回退出代码，出错时返回-1"""
+        try:
+            if self.incremental is not None:
+                plan, reason = self.incremental.plan()
+                self.on_output(f"增量构建: {reason}\n")
+                if plan == PLAN_SKIP:
+                    self.skipped = True
+                    return 0
+            client = self.agents.acquire(self.on_output)
+            return_code = self._run_on(client)
+            if return_code == 0 and not self.is_cancelled and self.incremental is not None:
+                self.incremental.commit()
+            return return_code
+        except AgentError as e:
+            if self.is_cancelled:
+                self.on_output("\n--- 用户已取消构建 ---\n")
+            else:
+                self.on_output(f"错误: {e}\n")
+            return -1
+        except Exception as e:
+            self.on_output(f"\n--- 发生意外错误: ---\n{str(e)}\n")
+            return -1
+
+    def _run_on(self, client):
+        try:
+            values, members = plan_inputs(self.config)
+            connection = client.connect(lambda: self.is_cancelled)
+            try:
+                connection.sock.settimeout(POLL_INTERVAL)
+                connection.send_message({"token": client.token, "action": "build", "env": self.env_name,
+                                         "config": values})
+                # 先确认代理接受任务（环境存在），再上传输入
+                reply = connection.recv_message()
+            except BaseException:
+                connection.close()
+                raise
+        finally:
+            self.agents.accepted(client)
+        try:
+            if reply.get("type") != "accepted":
+                raise AgentError(f"构建代理 {client.address} 拒绝了任务: {reply.get('message', '')}")
+            return self._exchange(connection, client, members)
+        finally:
+            connection.close()
+
+    def _exchange(self, connection, client, members):
+        start = time.monotonic()
+        writer = _DataWriter(connection)
+        pack_inputs(members, writer)
+        writer.close()
+        self.on_output(f"已上传构建输入 {writer.total / 2 ** 20:.1f} MB，耗时 {time.monotonic() - start:.1f} 秒\n")
+
+        while True:
+            message = connection.recv_message()
+            if message.get("type") == "log":
+                self.on_output(message["text"])
+            elif message.get("type") == "exit":
+                break
+            else:
+                raise AgentError(f"构建代理 {client.address}: {message.get('message', '响应无效')}")
+        self.phase_summary = message.get("phase_summary")
+        return_code = message["code"]
+        if return_code == 0:
+            self._receive_artifact(connection, message["artifact"])
+        return return_code
+
+    def _receive_artifact(self, connection, name):
+        """接收产物并替换 dist 中的同名产物"""
+        start = time.monotonic()
+        os.makedirs(self.config.dist_path, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".easypack-remote-", dir=self.config.dist_path)
+        try:
+            reader = _DataReader(connection)
+            with tarfile.open(fileobj=reader, mode="r|gz") as archive:
+                _extract(archive, staging)
+            reader.drain()
+            received = os.path.join(staging, name)
+            if not os.path.lexists(received):
+                raise AgentError("构建代理没有返回产物")
+            target = os.path.join(self.config.dist_path, name)
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            elif os.path.lexists(target):
+                os.remove(target)
+            os.replace(received, target)
+            # 本机还没有 spec 时保留代理生成的 spec（其中的路径相对于 spec 目录，在本机同样有效）
+            spec_dir = os.path.join(staging, SPEC_ARCNAME)
+            if os.path.isdir(spec_dir) and not os.path.exists(self.config.spec_path):
+                shutil.copytree(spec_dir, os.path.dirname(self.config.spec_path), dirs_exist_ok=True)
+                self.on_output(f"已保存构建代理生成的spec文件: {self.config.spec_path}\n")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.on_output(f"已下载产物 {reader.total / 2 ** 20:.1f} MB，耗时 {time.monotonic() - start:.1f} 秒\n")
+
+    def cancel(self):
+        """请求取消构建；断开连接后代理会终止构建"""
+        self.is_cancelled = True
+
+
+def run_agent(host, port, token=None, envs=None, capacity=None, resolve_env=None):
+    """命令行中运行构建代理，直到 Ctrl+C"""
+    token = token or os.environ.get("EASYPACK_AGENT_TOKEN") or secrets.token_hex(16)
+    agent = BuildAgent(token, envs, capacity, resolve_env)
+
+    def on_ready(address):
+        print(f"构建代理已启动: {address[0]}:{address[1]}，同时构建数 {agent.capacity}，令牌: {token}", flush=True)
+
+    try:
+        agent.serve(host, port, on_ready)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"错误: 无法启动构建代理: {e}", file=sys.stderr)
+        return 2
+    return 0
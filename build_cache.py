@@ -0,0 +1,253 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_cache.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 增量构建缓存，根据输入内容的哈希决定跳过构建、增量构建还是完整重建。
+
+import ast
+import hashlib
+import json
+import os
+
+from build_config import build_command
+from data_scanner import scan_data_entry
+from upx_cache import uses_upx_pass
+
+# 构建决策
+PLAN_SKIP = "skip"
+PLAN_INCREMENTAL = "incremental"
+PLAN_FULL = "full"
+
+# 指纹中除项目源码外的组成部分；其中任意一项变化都需要完整重建
+_NON_SOURCE_PARTS = ("options", "data", "icon", "env")
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _sha256_json(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class FileHasher:
+    """
+    带缓存的文件哈希计算器。
+    以 (大小, 修改时间) 作为文件未变化的依据，未变化的文件直接复用上次的哈希和导入分析结果。
+    """
+
+    def __init__(self, entries=None):
+        self._old = entries or {}
+        self.entries = {}
+
+    def _entry(self, path):
+        stamp = _file_stamp(path)
+        entry = self.entries.get(path)
+        if entry is None:
+            old = self._old.get(path)
+            entry = dict(old) if old and old.get("stamp") == stamp else {"stamp": stamp}
+            self.entries[path] = entry
+        return entry
+
+    def hash(self, path):
+        entry = self._entry(path)
+        if "sha" not in entry:
+            entry["sha"] = _sha256_file(path)
+        return entry["sha"]
+
+    def local_imports(self, path, root):
+        """返回 path 导入的、位于项目根目录 root 中的模块文件"""
+        entry = self._entry(path)
+        if "deps" not in entry:
+            entry["deps"] = _resolve_local_imports(path, root)
+        return entry["deps"]
+
+
+def _module_files(base_dir, dotted):
+    """把点分模块名解析为 base_dir 下存在的 .py 文件（包括途经的包的 __init__.py）"""
+    files = []
+    parts = [p for p in dotted.split('.') if p]
+    for i in range(1, len(parts) + 1):
+        path = os.path.join(base_dir, *parts[:i])
+        for candidate in (path + ".py", os.path.join(path, "__init__.py")):
+            if os.path.isfile(candidate):
+                files.append(os.path.normpath(candidate))
+    return files
+
+
+def _resolve_local_imports(path, root):
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+    deps = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                deps.extend(_module_files(root, alias.name))
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_dir = os.path.dirname(path)
+                for _ in range(node.level - 1):
+                    base_dir = os.path.dirname(base_dir)
+            else:
+                base_dir = root
+            module = node.module or ""
+            deps.extend(_module_files(base_dir, module))
+            for alias in node.names:
+                deps.extend(_module_files(base_dir, f"{module}.{alias.name}" if module else alias.name))
+    return sorted(set(deps))
+
+
+def collect_project_sources(script, hasher):
+    """从主脚本出发，沿着导入关系收集项目目录内的所有源文件"""
+    root = os.path.dirname(os.path.abspath(script))
+    start = os.path.normpath(os.path.abspath(script))
+    sources = {start}
+    pending = [start]
+    while pending:
+        for dep in hasher.local_imports(pending.pop(), root):
+            if dep not in sources:
+                sources.add(dep)
+                pending.append(dep)
+    return sorted(sources)
+
+
+def _hash_path(path, hasher, include=(), exclude=()):
+    """文件返回其内容哈希；目录返回其下经过滤的所有文件（相对路径+内容哈希）的汇总哈希"""
+    if os.path.isfile(path):
+        return hasher.hash(path)
+    if not os.path.isdir(path):
+        return None
+    scan = scan_data_entry(path, include, exclude)
+    return _sha256_json({rel_path: hasher.hash(os.path.join(path, rel_path)) for rel_path, _, _ in scan.files})
+
+
+def env_package_set(env_path, site_packages=()):
+    """环境中已安装的包：conda-meta 中的记录和 site-packages 中的 dist-info/egg-info"""
+    packages = []
+    for directory, suffixes in [(os.path.join(env_path, "conda-meta"), (".json",))] + \
+                               [(sp, (".dist-info", ".egg-info")) for sp in site_packages]:
+        try:
+            packages.extend(name for name in os.listdir(directory) if name.endswith(suffixes))
+        except OSError:
+            pass
+    return sorted(packages)
+
+
+class IncrementalBuild:
+    """
+    一次构建的增量缓存上下文。
+    指纹由项目源码、附加数据、图标、完整的打包选项和环境的包集合组成：
+    全部未变化且产物存在时跳过构建；只有源码变化时复用 build 工作目录（不加 --clean）；
+    其他情况完整重建（加 --clean）。
+    """
+
+    def __init__(self, state_path, artifact_path, script, data_entries, icon, options,
+                 env_path, site_packages, full_command, incremental_command, spec_path=None):
+        self.state_path = state_path
+        self.artifact_path = artifact_path
+        self.script = script
+        self.data_entries = data_entries
+        self.icon = icon
+        self.options = options
+        self.env_path = env_path
+        self.site_packages = site_packages
+        self.full_command = full_command
+        self.incremental_command = incremental_command
+        self.spec_path = spec_path  # spec 模式下的 spec 文件，其内容也计入打包选项
+        self._fingerprint = None
+        self._hasher = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def compute_fingerprint(self, previous_files=None):
+        hasher = FileHasher(previous_files)
+        sources = {path: hasher.hash(path) for path in collect_project_sources(self.script, hasher)}
+        data = [[source, dest, _hash_path(source, hasher, include, exclude)]
+                for source, dest, include, exclude in self.data_entries]
+        fingerprint = {
+            "sources": _sha256_json(sources),
+            "data": _sha256_json(data),
+            "icon": hasher.hash(self.icon) if self.icon and os.path.isfile(self.icon) else None,
+            "options": _sha256_json(self.options if self.spec_path is None
+                                    else [self.options, hasher.hash(self.spec_path)]),
+            "env": _sha256_json(env_package_set(self.env_path, self.site_packages)) if self.env_path else None,
+        }
+        return fingerprint, hasher
+
+    def plan(self):
+        """比较本次与上次成功构建的指纹，返回 (决策, 说明)"""
+        state = self._load_state()
+        self._fingerprint, self._hasher = self.compute_fingerprint(state.get("files"))
+        previous = state.get("fingerprint")
+        if not previous:
+            return PLAN_FULL, "没有找到上次构建的记录，执行完整构建"
+
+        changed = [part for part, value in self._fingerprint.items() if previous.get(part) != value]
+        if not changed:
+            if os.path.exists(self.artifact_path):
+                return PLAN_SKIP, "输入未发生变化，复用已有产物"
+            return PLAN_FULL, "产物不存在，执行完整构建"
+        if not any(part in _NON_SOURCE_PARTS for part in changed):
+            return PLAN_INCREMENTAL, "只有项目源码发生变化，复用 build 工作目录"
+        return PLAN_FULL, f"以下输入发生变化: {', '.join(changed)}，执行完整构建"
+
+    def command_for(self, plan):
+        return self.full_command if plan == PLAN_FULL else self.incremental_command
+
+    def commit(self):
+        """构建成功后记录本次的指纹和文件哈希"""
+        if self._fingerprint is None:
+            return
+        state = {"fingerprint": self._fingerprint, "files": self._hasher.entries}
+        tmp_path = self.state_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            pass
+
+
+def make_incremental_build(config, env_path=None, site_packages=()):
+    """根据构建配置（BuildConfig）创建增量构建上下文，配置无效时返回None"""
+    full_command, error = build_command(config, clean=True)
+    if error:
+        return None
+    incremental_command, _ = build_command(config, clean=False)
+    options = incremental_command
+    if uses_upx_pass(config):
+        # 构建后的UPX压缩不体现在命令中，其设置也计入打包选项
+        options = [incremental_command, list(config.upx_exclude), config.upx_dir]
+    return IncrementalBuild(
+        state_path=os.path.join(config.output_dir, f".easypack_build_{config.app_name}.json"),
+        artifact_path=config.artifact_path,
+        script=config.script,
+        data_entries=list(config.data_files),
+        icon=config.icon,
+        options=options,
+        env_path=env_path,
+        site_packages=list(site_packages),
+        full_command=full_command,
+        incremental_command=incremental_command,
+        spec_path=config.spec_path if config.spec_mode else None,
+    )
@@ -0,0 +1,383 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_config.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 不依赖Qt的构建配置模型，负责由配置生成PyInstaller命令。
+
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+
+from resource_limits import ResourceLimits, parse_cpu_list
+from upx_cache import find_upx, upx_supported
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# 配置字段及其默认值
+CONFIG_DEFAULTS = {
+    "python_executable": "",
+    "script": "",
+    "name": "",
+    "icon": "",
+    "onefile": True,
+    "noconsole": True,
+    "clean": False,
+    "paths": "",
+    "hidden_imports": (),
+    "exclude_modules": (),
+    "data_files": (),  # ((源路径, 目标路径, 包含模式, 排除模式), ...)，模式为元组
+    "launch_hook": False,  # 加入启动分析钩子
+    "output_subdir": "",  # 输出目录下的子目录，多环境矩阵构建时每个环境一个
+    "spec_mode": False,  # 由 spec 文件构建：spec 只生成一次，之后直接交给PyInstaller
+    "upx": False,  # 用UPX压缩二进制文件
+    "upx_dir": "",  # UPX所在目录，为空时在 PATH 中查找
+    "upx_exclude": (),  # 不压缩的二进制文件，PurePath.match 模式（如 vcruntime140.dll）
+}
+
+# 启动分析的运行时钩子，只在设置了 EASYPACK_LAUNCH_PROFILE 环境变量时生效
+LAUNCH_HOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "launch_hook.py")
+
+# 文件存在性检查结果的缓存时间（秒），避免在网络驱动器上反复访问文件系统
+EXISTS_CACHE_TTL = 5.0
+_exists_cache = {}
+
+
+def cached_exists(path):
+    """带短期缓存的 os.path.exists"""
+    now = time.monotonic()
+    cached = _exists_cache.get(path)
+    if cached is not None and now - cached[1] < EXISTS_CACHE_TTL:
+        return cached[0]
+    exists = os.path.exists(path)
+    _exists_cache[path] = (exists, now)
+    return exists
+
+
+def env_output_subdir(env_name):
+    """多环境构建时每个环境的输出子目录名，只保留适合作为目录名的字符"""
+    return re.sub(r"[^\w.-]+", "_", env_name).strip("_") or "env"
+
+
+def artifact_stats(path):
+    """产物的总大小（MB）和文件数：单文件模式为一个可执行文件，单目录模式为整个程序目录"""
+    if os.path.isfile(path):
+        return round(os.path.getsize(path) / 2 ** 20, 2), 1
+    size = 0
+    count = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(dirpath, filename))
+            count += 1
+    return round(size / 2 ** 20, 2), count
+
+
+def data_stage_dir(build_path, app_name, index, source):
+    """按模式过滤的附加数据条目的暂存目录，位于PyInstaller工作目录旁边（--clean 不会删除它）"""
+    return os.path.join(build_path, f"{app_name}_data", f"{index}_{os.path.basename(os.path.normpath(source))}")
+
+
+class ConfigError(Exception):
+    """配置文件无效"""
+
+
+class BuildConfig:
+    """一次PyInstaller构建的全部选项"""
+
+    def __init__(self, **values):
+        unknown = set(values) - set(CONFIG_DEFAULTS)
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        for field, default in CONFIG_DEFAULTS.items():
+            setattr(self, field, values.get(field, default))
+
+    @property
+    def app_name(self):
+        """程序名称，未填写时使用脚本文件名"""
+        return self.name or os.path.splitext(os.path.basename(self.script))[0]
+
+    @property
+    def output_dir(self):
+        """脚本同级的 output 目录（或其中的 output_subdir 子目录），所有PyInstaller生成的文件都放在这里"""
+        output_dir = os.path.join(os.path.dirname(self.script), "output")
+        return os.path.join(output_dir, self.output_subdir) if self.output_subdir else output_dir
+
+    @property
+    def dist_path(self):
+        return os.path.join(self.output_dir, "dist")
+
+    @property
+    def build_path(self):
+        return os.path.join(self.output_dir, "build")
+
+    @property
+    def spec_path(self):
+        """spec 模式使用的 spec 文件，与普通构建每次重新生成的 output/<程序名>.spec 分开存放"""
+        return os.path.join(self.output_dir, "spec", f"{self.app_name}.spec")
+
+    @property
+    def artifact_path(self):
+        """最终产物的路径：单文件模式为可执行文件，单目录模式为程序目录"""
+        name = self.app_name
+        if self.onefile and sys.platform == 'win32':
+            name += ".exe"
+        return os.path.join(self.dist_path, name)
+
+    def copy(self, **changes):
+        values = {field: getattr(self, field) for field in CONFIG_DEFAULTS}
+        values.update(changes)
+        return BuildConfig(**values)
+
+    def validate(self):
+        """返回配置错误信息，没有错误时返回None"""
+        if not self.python_executable or not cached_exists(self.python_executable):
+            return "无效的Python解释器。请选择一个有效的Conda环境。"
+        if not self.script:
+            return "未选择主Python脚本。"
+        # 不支持UPX的平台上PyInstaller和构建后的压缩都会跳过UPX，不需要UPX程序
+        if self.upx and upx_supported() and find_upx(self.upx_dir) is None:
+            return f"未找到UPX（{self.upx_dir or 'PATH'}）。请安装UPX或指定其所在目录。"
+        return None
+
+
+# --- 命令片段 ---
+# 每个片段只依赖少数字段并各自缓存，某个字段变化时只需重新生成对应的片段
+
+@lru_cache(maxsize=32)
+def _base_fragment(python_executable, script, output_dir):
+    return (
+        f'"{python_executable}"', "-m", "PyInstaller", f'"{script}"',
+        f'--distpath="{os.path.join(output_dir, "dist")}"',
+        f'--workpath="{os.path.join(output_dir, "build")}"',
+        f'--specpath="{output_dir}"',
+    )
+
+
+@lru_cache(maxsize=32)
+def _spec_fragment(python_executable, spec_path, output_dir):
+    return (
+        f'"{python_executable}"', "-m", "PyInstaller", f'"{spec_path}"',
+        f'--distpath="{os.path.join(output_dir, "dist")}"',
+        f'--workpath="{os.path.join(output_dir, "build")}"',
+    )
+
+
+@lru_cache(maxsize=32)
+def _makespec_fragment(python_executable, script, spec_path):
+    return (
+        f'"{python_executable}"', "-m", "PyInstaller.utils.cliutils.makespec", f'"{script}"',
+        f'--specpath="{os.path.dirname(spec_path)}"',
+    )
+
+
+@lru_cache(maxsize=32)
+def _general_fragment(onefile, name, noconsole, clean, icon, paths):
+    fragment = ["-F" if onefile else "-D"]
+    if name:
+        fragment.extend(["--name", f'"{name}"'])
+    if noconsole:
+        fragment.append("--noconsole")
+    if clean:
+        fragment.append("--clean")
+    if icon:
+        fragment.extend(["--icon", f'"{icon}"'])
+    if paths:
+        fragment.extend(["--paths", f'"{paths}"'])
+    return tuple(fragment)
+
+
+@lru_cache(maxsize=32)
+def _data_fragment(data_files, build_path, app_name):
+    fragment = []
+    for index, (source, dest, include, exclude) in enumerate(data_files):
+        if include or exclude:
+            # 设置了过滤模式的条目改为添加构建前暂存的过滤结果
+            source = data_stage_dir(build_path, app_name, index, source)
+        fragment.extend(["--add-data", f'"{source}{os.pathsep}{dest}"'])
+    return tuple(fragment)
+
+
+@lru_cache(maxsize=32)
+def _hidden_imports_fragment(hidden_imports):
+    fragment = []
+    for imp in hidden_imports:
+        fragment.extend(["--hidden-import", imp])
+    return tuple(fragment)
+
+
+@lru_cache(maxsize=32)
+def _exclude_modules_fragment(exclude_modules):
+    fragment = []
+    for module in exclude_modules:
+        fragment.extend(["--exclude-module", module])
+    return tuple(fragment)
+
+
+@lru_cache(maxsize=32)
+def _upx_fragment(upx, onefile, upx_exclude):
+    # 单目录模式由EasyPack在构建后并行压缩（upx_cache.UpxPass），PyInstaller本身不压缩；
+    # 未启用UPX时同样显式加 --noupx，否则PyInstaller会自动使用 PATH 中的UPX
+    if not (upx and onefile):
+        return ("--noupx",)
+    fragment = []
+    for pattern in upx_exclude:
+        fragment.extend(["--upx-exclude", f'"{pattern}"'])
+    return tuple(fragment)
+
+
+@lru_cache(maxsize=32)
+def _upx_dir_fragment(upx, onefile, upx_dir):
+    # --upx-dir 不是生成 spec 的选项，普通构建和 spec 模式都单独加在构建命令上
+    return ("--upx-dir", f'"{upx_dir}"') if upx and onefile and upx_dir else ()
+
+
+@lru_cache(maxsize=4)
+def _hook_fragment(launch_hook):
+    return ("--runtime-hook", f'"{LAUNCH_HOOK_PATH}"') if launch_hook else ()
+
+
+def _option_fragments(config, clean):
+    """打包选项部分，普通构建和生成 spec 共用"""
+    return (
+        _general_fragment(config.onefile, config.name, config.noconsole, clean, config.icon, config.paths)
+        + _data_fragment(tuple(config.data_files), config.build_path, config.app_name)
+        + _hidden_imports_fragment(tuple(config.hidden_imports))
+        + _exclude_modules_fragment(tuple(config.exclude_modules))
+        + _hook_fragment(config.launch_hook)
+        + _upx_fragment(config.upx, config.onefile, tuple(config.upx_exclude))
+    )
+
+
+def build_command(config, clean=None):
+    """
+    由配置生成PyInstaller命令字符串，返回 (命令, 错误信息)。
+    clean为None时按配置决定是否加 --clean。spec 模式下直接由 spec 文件构建，打包选项已写在 spec 中。
+    """
+    error = config.validate()
+    if error:
+        return None, error
+
+    clean = config.clean if clean is None else clean
+    if config.spec_mode:
+        command = _spec_fragment(config.python_executable, config.spec_path, config.output_dir)
+        if clean:
+            command += ("--clean",)
+    else:
+        command = _base_fragment(config.python_executable, config.script, config.output_dir) \
+            + _option_fragments(config, clean)
+    command += _upx_dir_fragment(config.upx, config.onefile, config.upx_dir)
+    return " ".join(command), None
+
+
+def makespec_command(config):
+    """生成 spec 文件的命令（pyi-makespec），返回 (命令, 错误信息)"""
+    error = config.validate()
+    if error:
+        return None, error
+    command = _makespec_fragment(config.python_executable, config.script, config.spec_path) \
+        + _option_fragments(config, False)
+    return " ".join(command), None
+
+
+def _resolve_path(base_dir, path):
+    """配置文件中的相对路径以配置文件所在目录为基准"""
+    if not path:
+        return ""
+    return os.path.normpath(os.path.join(base_dir, os.path.expanduser(path)))
+
+
+def _string_list(value):
+    """列表或逗号分隔的字符串 -> 去掉空白项的元组"""
+    if isinstance(value, str):
+        value = value.split(',')
+    return tuple(item.strip() for item in value if item.strip())
+
+
+def _pop_resource_limits(data):
+    """从配置中取出资源限制相关的项，返回 ResourceLimits"""
+    try:
+        nice = int(data.pop("nice", 0))
+        memory_mb = int(data.pop("memory_limit_mb", 0))
+        cpus = data.pop("cpu_affinity", ())
+        if isinstance(cpus, str):
+            cpus = parse_cpu_list(cpus)
+        else:
+            cpus = parse_cpu_list(",".join(str(int(cpu)) for cpu in cpus))
+    except (TypeError, ValueError) as e:
+        raise ConfigError(f"资源限制配置无效: {e}")
+    if not 0 <= nice <= 19 or memory_mb < 0:
+        raise ConfigError("资源限制配置无效: nice 应在 0-19 之间，memory_limit_mb 不能为负数")
+    return ResourceLimits(nice, bool(data.pop("io_idle", False)), cpus, memory_mb)
+
+
+def load_config_file(path):
+    """
+    读取 TOML（或 JSON）格式的构建配置文件，返回 (BuildConfig, 附加设置)。
+    选项可以写在顶层，也可以写在 [build] 表中；附加设置包括 env（Conda环境名称或路径）、incremental、
+    shared_cache（是否使用共享构建缓存，未填写时为None，按保存的设置），
+    以及资源限制 nice、io_idle、cpu_affinity、memory_limit_mb（保存为 settings["limits"]）。
+    """
+    try:
+        if path.lower().endswith(".json"):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            if tomllib is None:
+                raise ConfigError("读取TOML配置需要 Python 3.11+ 或安装 tomli: pip install tomli")
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+    except OSError as e:
+        raise ConfigError(f"无法读取配置文件: {e}")
+    except ValueError as e:
+        raise ConfigError(f"配置文件格式错误: {e}")
+
+    data = dict(data.get("build", data))
+    base_dir = os.path.dirname(os.path.abspath(path))
+    settings = {
+        "env": data.pop("env", ""),
+        "incremental": bool(data.pop("incremental", True)),
+        "shared_cache": bool(data.pop("shared_cache")) if "shared_cache" in data else None,
+        "limits": _pop_resource_limits(data),
+    }
+
+    values = {}
+    for field in ("script", "icon", "upx_dir"):
+        if field in data:
+            values[field] = _resolve_path(base_dir, data.pop(field))
+    if "python" in data:
+        values["python_executable"] = _resolve_path(base_dir, data.pop("python"))
+    if "paths" in data:
+        paths = data.pop("paths")
+        if isinstance(paths, str):
+            paths = [paths]
+        values["paths"] = os.pathsep.join(_resolve_path(base_dir, p) for p in paths)
+    for field in ("hidden_imports", "exclude_modules", "upx_exclude"):
+        if field in data:
+            values[field] = _string_list(data.pop(field))
+    if "data" in data:
+        try:
+            values["data_files"] = tuple(
+                (_resolve_path(base_dir, entry["source"]), entry.get("dest") or os.path.basename(entry["source"]),
+                 _string_list(entry.get("include", ())), _string_list(entry.get("exclude", ())))
+                for entry in data.pop("data")
+            )
+        except (KeyError, TypeError, AttributeError):
+            raise ConfigError("data 中的每一项都需要包含 source（以及可选的 dest、include、exclude）")
+    for field in ("name", "onefile", "noconsole", "clean", "launch_hook", "spec_mode", "upx"):
+        if field in data:
+            values[field] = data.pop(field)
+
+    if data:
+        raise ConfigError(f"未知的配置项: {', '.join(sorted(data))}")
+    if not values.get("script"):
+        raise ConfigError("配置文件中缺少 script")
+    return BuildConfig(**values), settings
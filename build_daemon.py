@@ -0,0 +1,241 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_daemon.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 常驻构建进程的客户端。每个环境启动一个预先导入了PyInstaller的常驻进程
+#                （resources/build_daemon_server.py），构建请求通过本机端口发送给它，省去每次启动解释器、
+#                导入PyInstaller的开销。环境中的包发生变化时自动重启。只支持有 fork 的系统（Linux、macOS）。
+
+import json
+import os
+import secrets
+import select
+import signal
+import socket
+import subprocess
+import threading
+
+DAEMON_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "build_daemon_server.py")
+# 等待常驻进程启动（导入PyInstaller）的最长时间（秒）
+START_TIMEOUT = 60.0
+# 等待常驻进程接受构建请求的最长时间（秒）
+CONNECT_TIMEOUT = 10.0
+
+
+class DaemonError(Exception):
+    """常驻构建进程无法启动或无法连接"""
+
+
+def daemon_supported():
+    return hasattr(os, "fork")
+
+
+class DaemonProcess:
+    """
+    常驻进程中正在执行的一次构建。提供 BuildRunner 用到的 subprocess.Popen 接口子集：
+    stdout.readline()、poll()、wait()、terminate()、kill() 和 returncode。
+    """
+
+    def __init__(self, sock, pid):
+        self._sock = sock
+        self._file = sock.makefile('rb')
+        self.pid = pid
+        self.stdout = self
+        self.returncode = None
+        self._exit_code = None
+        self._terminated = False
+        self._done = threading.Event()
+
+    def readline(self):
+        """读取一行输出；读到退出代码或连接关闭后返回空字符串"""
+        if self._done.is_set():
+            return ''
+        raw = self._file.readline()
+        if not raw:
+            self._finish(None)
+            return ''
+        line = raw.decode('utf-8', errors='replace')
+        index = line.find("\0EXIT ")
+        if index >= 0:
+            self._finish(int(line[index + 6:]))
+            return line[:index]
+        return line
+
+    def _finish(self, exit_code):
+        self._exit_code = exit_code
+        self._file.close()
+        self._sock.close()
+        self._done.set()
+
+    def poll(self):
+        if self._done.is_set():
+            self._set_returncode()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired("PyInstaller", timeout)
+        self._set_returncode()
+        return self.returncode
+
+    def _set_returncode(self):
+        if self._exit_code is not None:
+            self.returncode = self._exit_code
+        else:
+            # 没有收到退出代码：被取消或构建进程异常退出
+            self.returncode = -signal.SIGTERM if self._terminated else -1
+
+    def _signal_group(self, sig):
+        try:
+            os.killpg(self.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def terminate(self):
+        self._terminated = True
+        self._signal_group(signal.SIGTERM)
+
+    def kill(self):
+        self._terminated = True
+        self._signal_group(signal.SIGKILL)
+
+
+class BuildDaemon:
+    """一个环境的常驻构建进程"""
+
+    def __init__(self, python_executable):
+        self.python_executable = python_executable
+        self.process = None
+        self.port = None
+        self.version = ""
+        self._token = secrets.token_hex(16)
+        self._watched = []  # 用于判断环境是否变化的路径
+        self._fingerprint = None
+
+    def start(self):
+        env = dict(os.environ, PYTHONUNBUFFERED="1", EASYPACK_DAEMON_TOKEN=self._token)
+        try:
+            # 标准输入保持打开；EasyPack退出时管道关闭，常驻进程随之退出
+            self.process = subprocess.Popen([self.python_executable, DAEMON_SCRIPT_PATH],
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL, env=env)
+        except OSError as e:
+            raise DaemonError(f"无法启动常驻构建进程: {e}")
+
+        readable, _, _ = select.select([self.process.stdout], [], [], START_TIMEOUT)
+        line = self.process.stdout.readline() if readable else b""
+        try:
+            hello = json.loads(line.decode('utf-8'))
+        except ValueError:
+            self.stop()
+            raise DaemonError("常驻构建进程启动失败")
+        if "error" in hello:
+            self.stop()
+            raise DaemonError(hello["error"])
+
+        self.port = hello["port"]
+        self.version = hello.get("version", "")
+        # PyInstaller所在的 site-packages 目录在安装/卸载包时会改变修改时间
+        self._watched = [hello["pyinstaller"], os.path.dirname(hello["pyinstaller"]), self.python_executable]
+        self._fingerprint = self._current_fingerprint()
+
+    def _current_fingerprint(self):
+        fingerprint = []
+        for path in self._watched:
+            try:
+                fingerprint.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                fingerprint.append(None)
+        return fingerprint
+
+    @property
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def is_stale(self):
+        """环境在常驻进程启动后发生了变化（安装、升级或卸载了包）"""
+        return self._current_fingerprint() != self._fingerprint
+
+    def spawn(self, args, cwd, env=None):
+        """发送一个构建请求，返回 DaemonProcess；env 为构建进程额外的环境变量"""
+        try:
+            sock = socket.create_connection(("127.0.0.1", self.port), timeout=CONNECT_TIMEOUT)
+        except OSError as e:
+            raise DaemonError(f"无法连接常驻构建进程: {e}")
+        try:
+            request = {"token": self._token, "args": list(args), "cwd": cwd, "env": env or {}}
+            sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+            # 第一行是执行构建的子进程ID，用于取消构建
+            line = b""
+            while not line.endswith(b"\n"):
+                byte = sock.recv(1)
+                if not byte:
+                    raise DaemonError("常驻构建进程拒绝了构建请求")
+                line += byte
+            if not line.startswith(b"\0PID "):
+                raise DaemonError("常驻构建进程的响应无效")
+            sock.settimeout(None)
+        except (OSError, DaemonError):
+            sock.close()
+            raise
+        return DaemonProcess(sock, int(line[5:]))
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+
+
+class DaemonManager:
+    """按解释器路径管理各环境的常驻构建进程，可在多个构建线程中同时使用"""
+
+    def __init__(self):
+        self._daemons = {}
+        self._lock = threading.Lock()
+
+    def get(self, python_executable, on_output=None):
+        """返回可用的常驻进程；尚未启动、已退出或环境已变化时（重新）启动"""
+        on_output = on_output or (lambda text: None)
+        with self._lock:
+            daemon = self._daemons.get(python_executable)
+            if daemon is not None and (not daemon.is_alive or daemon.is_stale):
+                on_output("环境已变化或常驻构建进程已退出，正在重启...\n" if daemon.is_alive
+                          else "常驻构建进程已退出，正在重启...\n")
+                daemon.stop()
+                daemon = None
+            if daemon is None:
+                on_output("正在启动常驻构建进程...\n")
+                daemon = BuildDaemon(python_executable)
+                daemon.start()
+                self._daemons[python_executable] = daemon
+            return daemon
+
+    def spawn(self, python_executable, args, cwd, on_output=None, env=None):
+        """在对应环境的常驻进程中执行一次构建；连接失败时重启常驻进程再试一次"""
+        try:
+            return self.get(python_executable, on_output).spawn(args, cwd, env)
+        except DaemonError:
+            self.stop(python_executable)
+            return self.get(python_executable, on_output).spawn(args, cwd, env)
+
+    def stop(self, python_executable):
+        with self._lock:
+            daemon = self._daemons.pop(python_executable, None)
+        if daemon is not None:
+            daemon.stop()
+
+    def stop_all(self):
+        with self._lock:
+            daemons = list(self._daemons.values())
+            self._daemons.clear()
+        for daemon in daemons:
+            daemon.stop()
@@ -0,0 +1,100 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_phases.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 从PyInstaller的输出中识别构建阶段（Analysis、PYZ、PKG、EXE、COLLECT等）并统计各阶段耗时。
+
+import json
+import re
+import time
+
+# PyInstaller 每个构建目标开始时输出的标记，例如:
+#   "1234 INFO: checking Analysis"、"1234 INFO: Building PYZ because PYZ-00.toc is non existent"
+_PHASE_RE = re.compile(r"\bINFO: (?:checking|Building|Running) (Analysis|PYZ|PKG|EXE|COLLECT|BUNDLE|MERGE)\b")
+# 目标需要重新生成时的标记；只有 "checking" 没有这一行说明该目标沿用了上次的结果
+_REBUILD_RE = re.compile(r"\bINFO: (?:Building|Running) (Analysis|PYZ|PKG|EXE|COLLECT|BUNDLE|MERGE)\b")
+_COMPLETE_RE = re.compile(r"\bINFO: Build complete!")
+
+# 第一个阶段开始之前的时间（解释器启动、导入PyInstaller、读取hook等）
+STARTUP_PHASE = "Startup"
+
+
+class PhaseTimer:
+    """
+    流式的阶段计时器：逐行输入构建输出，遇到阶段标记时结束上一个阶段并开始新阶段。
+    时间以收到该行的时刻为准（子进程输出不缓冲）。
+    """
+
+    def __init__(self, start_time=None):
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self.end_time = None
+        self.phases = []  # [{"name", "start", "end", "rebuilt"}, ...]，时间相对于 start_time
+        self.completed = False
+        self._open_phase(STARTUP_PHASE, self.start_time)
+        self.phases[0]["rebuilt"] = True
+
+    def _open_phase(self, name, now):
+        offset = now - self.start_time
+        if self.phases:
+            self.phases[-1]["end"] = offset
+        self.phases.append({"name": name, "start": offset, "end": None, "rebuilt": False})
+
+    def feed(self, line, now=None):
+        """处理一行输出"""
+        if "INFO: " not in line:
+            return
+        now = time.monotonic() if now is None else now
+        match = _PHASE_RE.search(line)
+        if match:
+            name = match.group(1)
+            # 同一目标的 "checking X" 和 "Building X because ..." 属于同一个阶段
+            if self.phases[-1]["name"] != name:
+                self._open_phase(name, now)
+            if _REBUILD_RE.search(line):
+                self.phases[-1]["rebuilt"] = True
+        elif _COMPLETE_RE.search(line):
+            self.completed = True
+
+    def finish(self, now=None):
+        """构建结束时调用，结束最后一个阶段"""
+        if self.end_time is not None:
+            return
+        now = time.monotonic() if now is None else now
+        self.end_time = now
+        self.phases[-1]["end"] = now - self.start_time
+
+    @property
+    def has_phases(self):
+        """是否识别到了PyInstaller的构建阶段（例如pip安装就没有）"""
+        return len(self.phases) > 1
+
+    def summary(self):
+        """结构化的耗时汇总，可直接导出为JSON"""
+        total = (self.end_time if self.end_time is not None else time.monotonic()) - self.start_time
+        phases = []
+        for phase in self.phases:
+            end = phase["end"] if phase["end"] is not None else total
+            phases.append({
+                "name": phase["name"],
+                "start": round(phase["start"], 3),
+                "duration": round(end - phase["start"], 3),
+                "rebuilt": phase["rebuilt"],
+            })
+        return {"total": round(total, 3), "completed": self.completed, "phases": phases}
+
+
+def format_summary(summary):
+    """把耗时汇总格式化为日志中显示的文本表格"""
+    total = summary["total"] or 1e-9
+    lines = ["--- 各阶段耗时 ---"]
+    for phase in summary["phases"]:
+        note = "" if phase["rebuilt"] else "  (沿用上次结果)"
+        lines.append(f"  {phase['name']:<10}{phase['duration']:>9.2f} 秒  {phase['duration'] / total:>6.1%}{note}")
+    lines.append(f"  {'Total':<10}{summary['total']:>9.2f} 秒")
+    return "\n".join(lines) + "\n"
+
+
+def save_summary(summary, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,325 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_runner.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 不依赖Qt的构建执行器，运行PyInstaller子进程并分批回调输出，GUI和命令行共用。
+
+import os
+import queue
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from build_cache import PLAN_SKIP
+from build_phases import PhaseTimer, format_summary
+from data_scanner import DataStageError
+from resource_limits import MEMORY_CHECK_INTERVAL, apply_limits, build_slots, can_watch_memory, tree_rss
+from spec_file import SpecError
+
+# 日志批量发送的时间间隔（秒）和单批大小上限（字符数）
+LOG_FLUSH_INTERVAL = 0.05
+LOG_FLUSH_SIZE = 64 * 1024
+# 取消构建时先请求整个进程树退出，超过这个时间（秒）仍未退出则强制结束
+CANCEL_GRACE_PERIOD = 5.0
+
+
+def _group_alive(pgid):
+    """进程组中是否还有进程"""
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _signal_tree(process, force):
+    """向进程及其所有子进程发送结束信号；force为True时强制结束"""
+    if sys.platform == 'win32':
+        subprocess.run(["taskkill", "/PID", str(process.pid), "/T"] + (["/F"] if force else []),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       creationflags=subprocess.CREATE_NO_WINDOW)
+    elif isinstance(process, subprocess.Popen):
+        # 子进程在自己的会话中启动，进程组ID即其PID
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    elif force:
+        process.kill()
+    else:
+        process.terminate()
+
+
+def terminate_tree(process, grace_period=CANCEL_GRACE_PERIOD):
+    """结束进程树：先请求退出，宽限期内仍有进程存活时强制结束"""
+    _signal_tree(process, force=False)
+    deadline = time.monotonic() + grace_period
+    while time.monotonic() < deadline:
+        exited = process.poll() is not None
+        if exited and (sys.platform == 'win32' or not _group_alive(process.pid)):
+            return
+        time.sleep(0.05)
+    _signal_tree(process, force=True)
+
+
+def partial_workpath(command_list):
+    """PyInstaller命令对应的工作目录（--workpath 下以程序名命名的子目录），不是PyInstaller命令时返回None"""
+    if command_list[1:3] != ["-m", "PyInstaller"] or len(command_list) < 4:
+        return None
+    workpath = None
+    name = os.path.splitext(os.path.basename(command_list[3]))[0]
+    for i, arg in enumerate(command_list):
+        if arg.startswith("--workpath="):
+            workpath = arg.split("=", 1)[1]
+        elif arg in ("--workpath", "--name", "-n") and i + 1 < len(command_list):
+            if arg == "--workpath":
+                workpath = command_list[i + 1]
+            else:
+                name = command_list[i + 1]
+    return os.path.join(workpath, name) if workpath else None
+
+
+def _read_lines(stream, line_queue):
+    """在读取线程中逐行读取子进程输出，读完后放入None作为结束标记"""
+    for line in iter(stream.readline, ''):
+        line_queue.put(line)
+    line_queue.put(None)
+
+
+class BuildRunner:
+    """
+    执行一条构建命令。
+    输出按时间或大小聚合成批次后通过 on_output 回调交给调用者；run 返回子进程的退出代码。
+    """
+
+    def __init__(self, command, python_executable, on_output, incremental=None, daemons=None, limits=None,
+                 data_stage=None, spec_file=None, upx_pass=None, shared_cache=None):
+        self.command = command
+        self.python_executable = python_executable
+        self.on_output = on_output
+        self.incremental = incremental  # 可选的 IncrementalBuild，用于决定跳过/增量/完整构建
+        self.daemons = daemons  # 可选的 DaemonManager，PyInstaller命令交给常驻构建进程执行
+        self.limits = limits  # 可选的 ResourceLimits，应用到构建进程
+        self.data_stage = data_stage  # 可选的 DataStage，构建前暂存按模式过滤的附加数据
+        self.spec_file = spec_file  # spec 模式下的 SpecFile，构建前按需生成 spec
+        self.upx_pass = upx_pass  # 可选的 UpxPass，构建成功后压缩单目录产物中的二进制文件
+        self.shared_cache = shared_cache  # 可选的 SharedCache，PyInstaller使用共享缓存目录，构建后统计并淘汰
+        self.is_cancelled = False  # 用于标记用户是否取消了构建
+        self.skipped = False  # 输入未变化而跳过了构建
+        self.memory_exceeded = False  # 因超出内存上限而被终止
+        self.phase_summary = None  # 构建结束后的各阶段耗时汇总（识别到PyInstaller阶段时）
+        self._line_queue = None
+
+    def run(self):
+        """执行构建并返回退出代码，出错时返回-1"""
+        try:
+            command = self.command
+            # spec 需要先于增量构建决策生成，spec 的内容也是构建输入的一部分
+            if self.spec_file is not None:
+                self.spec_file.prepare(self.on_output)
+            if self.incremental is not None:
+                plan, reason = self.incremental.plan()
+                self.on_output(f"增量构建: {reason}\n")
+                if plan == PLAN_SKIP:
+                    self.skipped = True
+                    return 0
+                command = self.incremental.command_for(plan)
+            if self.data_stage is not None:
+                self.data_stage.prepare(self.on_output)
+
+            self.on_output(f"执行命令:\n{command}\n\n")
+            command_list = shlex.split(command)
+
+            # PyInstaller构建受全局的同时构建数量上限约束（pip安装等其他命令不受限制）
+            is_build = command_list[1:3] == ["-m", "PyInstaller"]
+            if is_build and not build_slots.acquire(
+                    lambda: self.is_cancelled,
+                    lambda: self.on_output("已达到同时构建数量上限，等待其他构建完成...\n")):
+                self.on_output("\n--- 用户已取消构建 ---\n")
+                return -1
+            try:
+                if is_build and self.shared_cache is not None:
+                    command_list = self._prepare_shared_cache(command_list)
+                return_code = self._execute(command_list)
+                if return_code == 0 and not self.is_cancelled and self.upx_pass is not None:
+                    return_code = self._run_upx_pass()
+                if return_code == 0 and not self.is_cancelled and is_build and self.shared_cache is not None:
+                    # 有其他构建正在进行时不淘汰，避免删除它们正在使用的缓存
+                    self.shared_cache.finish(partial_workpath(command_list), self.on_output,
+                                             can_evict=build_slots.active <= 1)
+                # 产物完成（包括UPX压缩）后才记录指纹，压缩失败或取消时下次不会跳过构建
+                if return_code == 0 and not self.is_cancelled and self.incremental is not None:
+                    self.incremental.commit()
+                return return_code
+            finally:
+                if is_build:
+                    build_slots.release()
+
+        except (DataStageError, SpecError) as e:
+            self.on_output(f"错误: {e}\n")
+            return -1
+        except FileNotFoundError:
+            self.on_output(f"错误: 命令未找到。 '{self.python_executable}' 是一个有效的Python解释器吗?\n")
+            return -1
+        except Exception as e:
+            self.on_output(f"\n--- 发生意外错误: ---\n{str(e)}\n")
+            return -1
+
+    def _execute(self, command_list):
+        """启动进程（或交给常驻构建进程），转发输出直到结束，返回退出代码"""
+        # 在Windows上运行时隐藏子进程的控制台窗口
+        creation_flags = 0
+        if sys.platform == 'win32':
+            creation_flags = subprocess.CREATE_NO_WINDOW
+
+        # 让子进程（如pip）不缓冲标准输出，日志才能实时显示
+        env = dict(os.environ, PYTHONUNBUFFERED="1", **self._extra_env())
+
+        phase_timer = PhaseTimer()
+        process = self._spawn_in_daemon(command_list)
+        if process is None:
+            process = subprocess.Popen(
+                command_list,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                universal_newlines=True,
+                creationflags=creation_flags,
+                # 在新会话中启动，取消时可以结束整个进程组（包括PyInstaller启动的子进程）
+                start_new_session=sys.platform != 'win32',
+                env=env
+            )
+        watch_memory = self._apply_limits(process)
+        next_memory_check = time.monotonic() + MEMORY_CHECK_INTERVAL
+
+        # 由读取线程逐行读取输出，这里把行聚合成批次后再回调，避免每行一次回调淹没UI事件队列
+        line_queue = queue.Queue()
+        self._line_queue = line_queue
+        reader = threading.Thread(target=_read_lines, args=(process.stdout, line_queue), daemon=True)
+        reader.start()
+
+        chunk = []
+        chunk_size = 0
+        deadline = None  # 当前批次最迟的发送时间
+        while True:
+            if self.is_cancelled:
+                self._flush_chunk(chunk)
+                self.on_output("\n--- 正在取消构建... ---\n")
+                terminate_tree(process)
+                self.on_output("--- 用户已取消构建 ---\n")
+                break
+            if watch_memory and time.monotonic() >= next_memory_check:
+                next_memory_check = time.monotonic() + MEMORY_CHECK_INTERVAL
+                used_mb = tree_rss(process.pid) / 2 ** 20
+                if used_mb > self.limits.memory_mb:
+                    self._flush_chunk(chunk)
+                    self.on_output(f"\n--- 内存占用 {used_mb:.0f} MB 超出上限 {self.limits.memory_mb} MB，"
+                                   f"已终止构建 ---\n")
+                    self.memory_exceeded = True
+                    terminate_tree(process)
+                    break
+
+            timeout = LOG_FLUSH_INTERVAL if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                line = line_queue.get(timeout=timeout)
+            except queue.Empty:
+                line = ''
+            if line is None:  # 输出已读完
+                self._flush_chunk(chunk)
+                break
+
+            if line:
+                phase_timer.feed(line)
+                if not chunk:
+                    deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+                chunk.append(line)
+                chunk_size += len(line)
+            if chunk and (chunk_size >= LOG_FLUSH_SIZE or time.monotonic() >= deadline):
+                self._flush_chunk(chunk)
+                chunk = []
+                chunk_size = 0
+                deadline = None
+
+        process.wait()  # 等待进程完成
+        phase_timer.finish()
+        if phase_timer.has_phases:
+            self.phase_summary = phase_timer.summary()
+            self.on_output("\n" + format_summary(self.phase_summary))
+        if self.is_cancelled or self.memory_exceeded:
+            self._remove_partial_workpath(command_list)
+        return process.returncode
+
+    def _extra_env(self):
+        """构建进程额外需要的环境变量"""
+        return self.shared_cache.env if self.shared_cache is not None else {}
+
+    def _prepare_shared_cache(self, command_list):
+        """--clean 会清空PyInstaller的整个缓存目录，使用共享缓存时改为只清理本项目的工作目录"""
+        if self.shared_cache.redirect and "--clean" in command_list:
+            command_list = [arg for arg in command_list if arg != "--clean"]
+            self.on_output("共享缓存: 以清理本项目的构建目录代替 --clean，保留其他项目共用的缓存\n")
+            workpath = partial_workpath(command_list)
+            if workpath and os.path.isdir(workpath):
+                shutil.rmtree(workpath, ignore_errors=True)
+        self.shared_cache.begin(command_list, self.python_executable)
+        return command_list
+
+    def _run_upx_pass(self):
+        """压缩产物中的二进制文件，返回退出代码"""
+        self.on_output("\nUPX: 正在并行压缩二进制文件...\n")
+        if self.upx_pass.run(self.on_output, lambda: self.is_cancelled):
+            return 0
+        if self.is_cancelled:
+            self.on_output("--- 用户已取消构建 ---\n")
+            return -1
+        return 1
+
+    def _apply_limits(self, process):
+        """应用资源限制并输出说明，返回是否需要监控进程树的内存占用"""
+        if self.limits is None or self.limits.is_default:
+            return False
+        self.on_output(f"资源限制: {self.limits.describe()}\n")
+        for note in apply_limits(process.pid, self.limits):
+            self.on_output(f"  {note}\n")
+        return bool(self.limits.memory_mb) and can_watch_memory()
+
+    def _spawn_in_daemon(self, command_list):
+        """PyInstaller命令在启用常驻构建进程时交给它执行，失败时返回None，改为直接启动子进程"""
+        if self.daemons is None or command_list[1:3] != ["-m", "PyInstaller"]:
+            return None
+        try:
+            process = self.daemons.spawn(command_list[0], command_list[3:], os.getcwd(), self.on_output,
+                                         self._extra_env())
+        except Exception as e:
+            self.on_output(f"常驻构建进程不可用，改为直接启动: {e}\n")
+            return None
+        self.on_output("由常驻构建进程执行\n")
+        return process
+
+    def _remove_partial_workpath(self, command_list):
+        """删除被取消的构建留下的不完整工作目录，下次构建不会误用它"""
+        workpath = partial_workpath(command_list)
+        if workpath and os.path.isdir(workpath):
+            shutil.rmtree(workpath, ignore_errors=True)
+            self.on_output(f"已清理未完成的构建目录: {workpath}\n")
+
+    def _flush_chunk(self, chunk):
+        """把聚合的一批输出一次性交给回调"""
+        if chunk:
+            self.on_output(''.join(chunk))
+
+    def cancel(self):
+        """请求取消构建，立即唤醒等待输出的循环"""
+        self.is_cancelled = True
+        if self._line_queue is not None:
+            self._line_queue.put('')
@@ -6,97 +6,437 @@
 # Introduction： 后台构建工作模块，在独立线程中执行PyInstaller命令以防UI冻结。
 
 import os
-import re
-import shlex
-import subprocess
-import sys
-from PyQt6.QtCore import QObject, pyqtSignal
+import time
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
 
+from build_config import artifact_stats
+from build_runner import BuildRunner
+from conda_envs import get_conda_envs, load_cached_envs, save_cached_envs, scan_conda_envs
+from env_probe import EnvProbeError, probe_env
+from log_store import LogStore
 
-class BuildWorker(QObject):
+
+class RunnerWorker(QObject):
     """
-    处理PyInstaller构建过程的所有后端逻辑。
-    在单独的线程中运行，以保持UI响应。
+    在单独的线程中运行一个构建执行器（本地的 BuildRunner 或构建代理上的 RemoteBuildRunner），
+    把它的输出和返回码转为Qt信号，以保持UI响应。
     """
-    # 发送实时输出到UI的信号
+    # 发送实时输出到UI的信号（每次为一批按时间或大小聚合的若干行）
     progress_updated = pyqtSignal(str)
     # 报告完成状态（返回码）的信号
     finished = pyqtSignal(int)
 
-    def __init__(self, command, python_executable):
+    def __init__(self, make_runner, artifact_path=None):
         super().__init__()
+        # 执行器的输出回调需要本对象的信号，因此由子类传入以输出回调为参数的工厂函数
+        self.runner = make_runner(self.progress_updated.emit)
+        self.artifact_path = artifact_path
+        self.artifact_size = None  # 产物大小（MB），给出 artifact_path 时在构建成功后于工作线程中统计
+
+    @property
+    def is_cancelled(self):
+        return self.runner.is_cancelled
+
+    @property
+    def skipped(self):
+        return self.runner.skipped
+
+    @property
+    def phase_summary(self):
+        return self.runner.phase_summary
+
+    def run(self):
+        """在线程中执行的主方法"""
+        return_code = self.runner.run()
+        if return_code == 0 and not self.is_cancelled and self.artifact_path and os.path.exists(self.artifact_path):
+            self.artifact_size = artifact_stats(self.artifact_path)[0]
+        self.finished.emit(return_code)  # 发送完成信号和返回码
+
+    def cancel(self):
+        """向工作线程发送取消信号"""
+        self.runner.cancel()
+
+
+class BuildWorker(RunnerWorker):
+    """处理PyInstaller构建过程的所有后端逻辑，在本机执行构建命令"""
+
+    def __init__(self, command, python_executable, incremental=None, daemons=None, limits=None, data_stage=None,
+                 spec_file=None, upx_pass=None, shared_cache=None, artifact_path=None):
+        super().__init__(lambda on_output: BuildRunner(command, python_executable, on_output, incremental, daemons,
+                                                       limits, data_stage, spec_file, upx_pass, shared_cache),
+                         artifact_path)
         self.command = command
         self.python_executable = python_executable
-        self.is_cancelled = False  # 用于标记用户是否取消了构建
+
+
+class RemoteBuildWorker(RunnerWorker):
+    """把构建交给构建代理执行，信号和接口与 BuildWorker 相同"""
+
+    def __init__(self, config, env_name, agents, incremental=None, artifact_path=None):
+        from build_agent import RemoteBuildRunner
+        super().__init__(lambda on_output: RemoteBuildRunner(config, env_name, agents, on_output, incremental),
+                         artifact_path)
+
+
+# 构建任务的状态文本
+JOB_PENDING = "等待中"
+JOB_RUNNING = "构建中"
+JOB_SUCCESS = "成功"
+JOB_FAILED = "失败"
+JOB_CANCELLED = "已取消"
+
+
+def default_max_workers():
+    """默认并行构建数：CPU核心数的一半，至少为1"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class BuildJob:
+    """构建队列中的单个任务，记录命令、状态、日志和耗时"""
+
+    def __init__(self, job_id, name, env_name, command, python_executable, log_path=None, incremental=None,
+                 artifact_path=None, python_version="", limits=None, data_stage=None, spec_file=None,
+                 upx_pass=None, shared_cache=None, config=None):
+        self.job_id = job_id
+        self.name = name
+        self.env_name = env_name
+        self.command = command
+        self.python_executable = python_executable
+        self.status = JOB_PENDING
+        self.return_code = None
+        self.log_store = LogStore()
+        self.log_path = log_path
+        self.incremental = incremental
+        self.phase_summary = None  # 各阶段耗时汇总，构建结束后填入
+        self.artifact_path = artifact_path
+        self.artifact_size = None  # 产物大小（MB），构建成功后填入
+        self.python_version = python_version
+        self.limits = limits  # 可选的 ResourceLimits
+        self.data_stage = data_stage  # 可选的 DataStage
+        self.spec_file = spec_file  # spec 模式下的 SpecFile
+        self.upx_pass = upx_pass  # 可选的 UpxPass
+        self.shared_cache = shared_cache  # 可选的 SharedCache
+        self.config = config  # 构建配置（BuildConfig），分布式构建时发送给构建代理
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def duration(self):
+        """任务耗时（秒），未开始时为None"""
+        if self.start_time is None:
+            return None
+        end_time = self.end_time if self.end_time is not None else time.monotonic()
+        return end_time - self.start_time
+
+    @property
+    def is_done(self):
+        return self.status in (JOB_SUCCESS, JOB_FAILED, JOB_CANCELLED)
+
+
+class BuildQueue(QObject):
+    """
+    有界并发的构建调度器。
+    任务按加入顺序排队，最多同时运行 max_workers 个 BuildWorker，每个都在自己的 QThread 中。
+    """
+    # 任务状态变化（任务ID）
+    job_status_changed = pyqtSignal(int)
+    # 任务的实时输出（任务ID, 文本）
+    job_output = pyqtSignal(int, str)
+    # 队列全部完成（总耗时, 各任务耗时之和）
+    queue_finished = pyqtSignal(float, float)
+
+    def __init__(self, max_workers=None):
+        super().__init__()
+        self.max_workers = max_workers or default_max_workers()
+        self.jobs = {}
+        self._next_id = 1
+        self._running = {}  # {任务ID: BuildWorker}
+        self._threads = set()  # 保持线程对象存活，直到线程真正退出
+        self._started_jobs = []  # 本轮调度中启动过的任务
+        self._queue_start = None
+        self.daemons = None  # 启用常驻构建进程时为 DaemonManager
+        self.agents = None  # 启用分布式构建时为 AgentPool，任务交给其中最空闲的构建代理
+
+    def add_job(self, name, env_name, command, python_executable, log_path=None, incremental=None,
+                artifact_path=None, python_version="", limits=None, data_stage=None, spec_file=None,
+                upx_pass=None, shared_cache=None, config=None):
+        """加入一个新任务并返回它；如果队列正在运行，会立即参与调度"""
+        job = BuildJob(self._next_id, name, env_name, command, python_executable, log_path, incremental,
+                       artifact_path, python_version, limits, data_stage, spec_file, upx_pass, shared_cache,
+                       config)
+        self.jobs[job.job_id] = job
+        self._next_id += 1
+        if self.is_running:
+            self._dispatch()
+        return job
+
+    def remove_job(self, job_id):
+        """移除尚未开始或已结束的任务，运行中的任务不能移除"""
+        if job_id in self._running:
+            return False
+        self.jobs.pop(job_id, None)
+        return True
+
+    def clear_finished(self):
+        for job_id in [j.job_id for j in self.jobs.values() if j.is_done]:
+            del self.jobs[job_id]
+
+    @property
+    def is_running(self):
+        return self._queue_start is not None
+
+    def start(self):
+        """开始调度所有等待中的任务"""
+        if self.is_running or not any(j.status == JOB_PENDING for j in self.jobs.values()):
+            return
+        self._queue_start = time.monotonic()
+        self._started_jobs = []
+        self._dispatch()
+
+    def cancel_all(self):
+        """取消所有等待中和运行中的任务"""
+        for job in self.jobs.values():
+            if job.status == JOB_PENDING:
+                job.status = JOB_CANCELLED
+                self.job_status_changed.emit(job.job_id)
+        for worker in self._running.values():
+            worker.cancel()
+
+    def _dispatch(self):
+        """在并发上限内启动等待中的任务"""
+        for job in self.jobs.values():
+            if len(self._running) >= self.max_workers:
+                break
+            if job.status == JOB_PENDING:
+                self._start_job(job)
+
+        if not self._running:
+            self._finish_queue()
+
+    def _start_job(self, job):
+        thread = QThread()
+        if self.agents is not None and job.config is not None:
+            worker = RemoteBuildWorker(job.config, job.env_name, self.agents, job.incremental, job.artifact_path)
+        else:
+            worker = BuildWorker(job.command, job.python_executable, job.incremental, self.daemons, job.limits,
+                                 job.data_stage, job.spec_file, job.upx_pass, job.shared_cache, job.artifact_path)
+        worker.moveToThread(thread)
+
+        job_id = job.job_id
+        worker.progress_updated.connect(lambda text: self._on_job_output(job_id, text))
+        worker.finished.connect(lambda code: self._on_job_finished(job_id, code))
+        thread.started.connect(worker.run)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(lambda: self._threads.discard(thread))
+        thread.finished.connect(thread.deleteLater)
+
+        job.status = JOB_RUNNING
+        job.start_time = time.monotonic()
+        job.log_store.open(job.log_path)
+        self._running[job_id] = worker
+        self._threads.add(thread)
+        self._started_jobs.append(job)
+        self.job_status_changed.emit(job_id)
+        thread.start()
+
+    def _on_job_output(self, job_id, text):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.log_store.append_text(text)
+        self.job_output.emit(job_id, text)
+
+    def _on_job_finished(self, job_id, return_code):
+        worker = self._running.pop(job_id)
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.end_time = time.monotonic()
+            job.return_code = return_code
+            job.phase_summary = worker.phase_summary
+            job.artifact_size = worker.artifact_size
+            job.log_store.close()
+            if worker.is_cancelled:
+                job.status = JOB_CANCELLED
+            else:
+                job.status = JOB_SUCCESS if return_code == 0 else JOB_FAILED
+            self.job_status_changed.emit(job_id)
+        self._dispatch()
+
+    def _finish_queue(self):
+        if self._queue_start is None:
+            return
+        wall_time = time.monotonic() - self._queue_start
+        serial_time = sum(j.duration for j in self._started_jobs if j.duration is not None)
+        self._queue_start = None
+        self.queue_finished.emit(wall_time, serial_time)
+
+
+class CondaEnvLoader(QObject):
+    """
+    在后台线程中发现Conda环境。
+    先发送缓存结果；缓存失效时直接读取环境列表文件，只有读不到任何环境时才调用 conda 命令。
+    """
+    # 发现的环境字典 {名称: 路径}，可能发送多次，每次都是完整列表
+    envs_found = pyqtSignal(dict)
+    finished = pyqtSignal()
+
+    def run(self):
+        cached_envs, is_fresh = load_cached_envs()
+        if cached_envs:
+            self.envs_found.emit(cached_envs)
+        if is_fresh:
+            self.finished.emit()
+            return
+
+        envs, sources = scan_conda_envs()
+        if not envs:
+            envs = get_conda_envs()
+        if envs != cached_envs:
+            self.envs_found.emit(envs)
+        save_cached_envs(envs, sources)
+        self.finished.emit()
+
+
+class EnvProbeWorker(QObject):
+    """在后台线程中探测环境的解释器路径、Python版本、site-packages 和 PyInstaller 版本"""
+    # 探测成功（环境路径, 探测结果）
+    probed = pyqtSignal(str, dict)
+    # 探测失败（环境路径, 错误信息）
+    failed = pyqtSignal(str, str)
+    finished = pyqtSignal()
+
+    def __init__(self, env_path, use_cache=True):
+        super().__init__()
+        self.env_path = env_path
+        self.use_cache = use_cache
 
     def run(self):
-        """在线程中执行的主方法"""
         try:
-            self.progress_updated.emit(f"执行命令:\n{self.command}\n\n")
-            command_list = shlex.split(self.command)
-
-            # 在Windows上运行时隐藏子进程的控制台窗口
-            creation_flags = 0
-            if sys.platform == 'win32':
-                creation_flags = subprocess.CREATE_NO_WINDOW
-
-            process = subprocess.Popen(
-                command_list,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1,
-                universal_newlines=True,
-                creationflags=creation_flags
-            )
-
-            # 实时读取和报告输出
-            for line in iter(process.stdout.readline, ''):
-                if self.is_cancelled:
-                    process.terminate()  # 终止进程
-                    self.progress_updated.emit("\n--- 用户已取消构建 ---\n")
-                    break
-                self.progress_updated.emit(line)
-
-            process.wait()  # 等待进程完成
-            self.finished.emit(process.returncode)  # 发送完成信号和返回码
-
-        except FileNotFoundError:
-            self.progress_updated.emit(f"错误: 命令未找到。 '{self.python_executable}' 是一个有效的Python解释器吗?\n")
-            self.finished.emit(-1)
+            self.probed.emit(self.env_path, probe_env(self.env_path, self.use_cache))
+        except EnvProbeError as e:
+            self.failed.emit(self.env_path, str(e))
+        self.finished.emit()
+
+
+class DaemonStartWorker(QObject):
+    """在后台线程中预先启动环境的常驻构建进程，第一次构建也无需等待"""
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, daemons, python_executable):
+        super().__init__()
+        self.daemons = daemons
+        self.python_executable = python_executable
+
+    def run(self):
+        from build_daemon import DaemonError
+        try:
+            self.daemons.get(self.python_executable)
+        except DaemonError as e:
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class LaunchProfileWorker(QObject):
+    """在后台线程中多次启动生成的程序，测量冷启动和热启动耗时"""
+    progress = pyqtSignal(str)
+    profiled = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, artifact_path, runs, collect_imports):
+        super().__init__()
+        self.artifact_path = artifact_path
+        self.runs = runs
+        self.collect_imports = collect_imports
+        self.is_cancelled = False
+
+    def run(self):
+        from launch_profiler import profile_launch
+        try:
+            report = profile_launch(self.artifact_path, self.runs, self.collect_imports,
+                                    on_output=self.progress.emit, is_cancelled=lambda: self.is_cancelled)
+            if not self.is_cancelled:
+                self.profiled.emit(report)
         except Exception as e:
-            self.progress_updated.emit(f"\n--- 发生意外错误: ---\n{str(e)}\n")
-            self.finished.emit(-1)
+            self.failed.emit(str(e))
+        self.finished.emit()
 
     def cancel(self):
-        """向工作线程发送取消信号"""
+        """停止启动分析，正在运行的程序会被结束"""
         self.is_cancelled = True
 
 
-def get_conda_envs():
-    """获取系统中所有Conda环境的字典 {名称: 路径}"""
-    envs = {}
-    try:
-        creation_flags = 0
-        if sys.platform == 'win32':
-            creation_flags = subprocess.CREATE_NO_WINDOW
-
-        proc = subprocess.run(
-            ["conda", "env", "list"],
-            capture_output=True, text=True, check=True, encoding='utf-8',
-            creationflags=creation_flags
-        )
-        # 正则表达式用于匹配环境名称和路径
-        env_pattern = re.compile(r"^(\S+)\s+\*?\s+(.+)$")
-        for line in proc.stdout.splitlines():
-            if not line.startswith('#') and line.strip():
-                match = env_pattern.match(line)
-                if match:
-                    name, path = match.groups()
-                    envs[name.strip()] = os.path.normpath(path.strip())
-        return envs
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # 如果conda命令失败，返回空字典
-        return {}
\ No newline at end of file
+class BundleAnalyzeWorker(QObject):
+    """在后台线程中分析构建目录中的 TOC、xref 和 warn 文件"""
+    # 分析结果（BundleReport）
+    analyzed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, build_dir, script, excluded):
+        super().__init__()
+        self.build_dir = build_dir
+        self.script = script
+        self.excluded = excluded
+
+    def run(self):
+        from bundle_analyzer import analyze_build
+        try:
+            self.analyzed.emit(analyze_build(self.build_dir, self.script, self.excluded))
+        except Exception as e:
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class ImportScanWorker(QObject):
+    """在后台线程中扫描项目源码，查找需要作为隐藏导入的动态导入"""
+    # 扫描结果（ScanResult）
+    scanned = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def run(self):
+        # 导入分析依赖进程池模块，导入开销较大，首次使用时才导入以加快启动
+        from import_scanner import scan_project
+        try:
+            self.scanned.emit(scan_project(self.script))
+        except Exception as e:
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class DataScanWorker(QObject):
+    """在后台线程中扫描附加数据，统计过滤后的文件数和总大小"""
+    # (扫描的附加数据条目, 与条目一一对应的 DataScan 或错误信息)
+    scanned = pyqtSignal(object, object)
+    finished = pyqtSignal()
+
+    def __init__(self, data_files):
+        super().__init__()
+        self.data_files = data_files
+
+    def run(self):
+        from data_scanner import scan_data_files
+        self.scanned.emit(self.data_files, scan_data_files(self.data_files))
+        self.finished.emit()
+
+
+class SharedCacheWorker(QObject):
+    """在后台线程中统计共享缓存的占用和命中；clear为True时先清空"""
+    updated = pyqtSignal(object)
+    finished = pyqtSignal()
+
+    def __init__(self, clear=False):
+        super().__init__()
+        self.clear = clear
+
+    def run(self):
+        from shared_cache import cache_stats, clear_cache
+        if self.clear:
+            clear_cache()
+        self.updated.emit(cache_stats())
+        self.finished.emit()
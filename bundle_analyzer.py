@@ -0,0 +1,283 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : bundle_analyzer.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 产物体积分析。读取 output/build 中PyInstaller生成的 TOC、xref 和 warn 文件，
+#                按大小排列模块、二进制文件和数据文件，给出导入链，并建议可以 --exclude-module 的模块。
+
+import ast
+import html
+import os
+import re
+from collections import deque
+
+# 一般用不到、经常被其他包顺带导入的标准库
+STDLIB_CANDIDATES = {
+    "tkinter": "Tk 图形界面库",
+    "unittest": "单元测试框架",
+    "doctest": "文档测试",
+    "pydoc": "文档生成工具",
+    "pdb": "调试器",
+    "test": "Python 自身的测试套件",
+    "lib2to3": "Python 2 到 3 的转换工具",
+    "idlelib": "IDLE 编辑器",
+    "turtle": "海龟绘图",
+    "turtledemo": "海龟绘图示例",
+    "distutils": "旧的打包工具",
+    "ensurepip": "pip 安装工具",
+    "venv": "虚拟环境工具",
+    "xmlrpc": "XML-RPC 客户端/服务器",
+    "pydoc_data": "pydoc 的数据文件",
+}
+# 常见的体积较大、通常只是被可选地导入的第三方包
+HEAVY_OPTIONAL = {
+    "matplotlib": "绘图库",
+    "scipy": "科学计算库",
+    "pandas": "数据分析库",
+    "IPython": "交互式解释器",
+    "jedi": "代码补全库",
+    "notebook": "Jupyter Notebook",
+    "sphinx": "文档生成工具",
+    "docutils": "文档处理工具",
+    "pytest": "测试框架",
+    "setuptools": "打包工具",
+    "pkg_resources": "setuptools 的资源 API",
+    "PIL": "Pillow 图像库",
+    "PyQt5": "Qt5 绑定",
+    "PySide2": "Qt5 绑定",
+    "PySide6": "Qt6 绑定",
+    "PyQt6": "Qt6 绑定",
+}
+# 没有被项目直接导入、且体积超过此值（MB）的包也会列为建议（默认不勾选）
+LARGE_PACKAGE_MB = 10
+# 报告中每类列出的条目数
+TOP_N = 15
+
+# 不计入体积的条目类型（归档本身、选项、依赖引用等）
+_SKIP_TYPES = {"PYZ", "PKG", "EXECUTABLE", "OPTION", "DEPENDENCY", "SYMLINK", "SPLASH"}
+_TOC_TYPES = _SKIP_TYPES | {"PYMODULE", "PYSOURCE", "EXTENSION", "BINARY", "DATA", "ZIPFILE"}
+
+_NODE_RE = re.compile(
+    r'<div class="node">\s*<a name="(?P<name>[^"]+)"></a>\s*'
+    r'(?:<a target="code" href="(?P<href>[^"]*)"[^>]*>)?.*?'
+    r'<span class="moduletype">(?P<type>[^<]*)</span>(?P<body>.*?)(?=<div class="node">|\Z)',
+    re.S
+)
+_SECTION_RE = re.compile(r'<div class="import">\s*(imports|imported by):(.*?)</div>', re.S)
+_LINK_RE = re.compile(r'<a href="#([^"]+)">')
+_WARN_RE = re.compile(r"^(missing|excluded) module named (\S+) - imported by (.*)$")
+
+
+def load_toc(path):
+    """读取TOC文件（Python字面量），失败时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return ast.literal_eval(f.read())
+    except (OSError, ValueError, SyntaxError):
+        return None
+
+
+def iter_toc_entries(data):
+    """在任意嵌套的TOC结构中找出 (目标名称, 源路径, 类型) 三元组"""
+    if isinstance(data, tuple) and len(data) == 3 and isinstance(data[0], str) and data[2] in _TOC_TYPES:
+        yield data
+        return
+    if isinstance(data, (list, tuple)):
+        for item in data:
+            yield from iter_toc_entries(item)
+
+
+def parse_xref(path):
+    """解析 xref-<name>.html，返回 {模块名: {"type", "path", "imports", "imported_by"}}"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return {}
+    graph = {}
+    for match in _NODE_RE.finditer(text):
+        node = {"type": match.group("type").strip(), "path": html.unescape(match.group("href") or ""),
+                "imports": [], "imported_by": []}
+        for section, links in _SECTION_RE.findall(match.group("body")):
+            key = "imports" if section == "imports" else "imported_by"
+            node[key] = [html.unescape(name) for name in _LINK_RE.findall(links)]
+        graph[html.unescape(match.group("name"))] = node
+    return graph
+
+
+def parse_warnings(path):
+    """解析 warn-<name>.txt，返回 {模块名: ("missing"/"excluded", 导入者描述)}"""
+    warnings = {}
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = _WARN_RE.match(line.strip())
+                if match:
+                    warnings[match.group(2).strip("'")] = (match.group(1), match.group(3))
+    except OSError:
+        pass
+    return warnings
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+def _extension_module(dest_name):
+    """把扩展模块的目标路径转换为模块名，例如 PyQt6/QtCore.abi3.so -> PyQt6.QtCore"""
+    parts = dest_name.replace('\\', '/').split('/')
+    parts = [p for p in parts[:-1] if p != "lib-dynload"] + [parts[-1].split('.')[0]]
+    return '.'.join(parts)
+
+
+def _owner_package(dest_name):
+    """二进制和数据文件归属的顶层包：目标路径的第一级目录；直接位于根目录的归为"(根目录)" """
+    parts = dest_name.replace('\\', '/').split('/')
+    return parts[0] if len(parts) > 1 else "(根目录)"
+
+
+def import_chain(graph, roots, target):
+    """从根节点（脚本）出发沿导入关系做广度优先搜索，返回到 target 的最短导入链"""
+    parents = {root: None for root in roots if root in graph}
+    pending = deque(parents)
+    while pending:
+        name = pending.popleft()
+        if name == target:
+            chain = []
+            while name is not None:
+                chain.append(name)
+                name = parents[name]
+            return chain[::-1]
+        for child in graph[name]["imports"]:
+            if child not in parents and child in graph:
+                parents[child] = name
+                pending.append(child)
+    return []
+
+
+class BundleReport:
+    """一次产物分析的结果"""
+
+    def __init__(self, modules, binaries, datas, packages, suggestions, warnings, total_size):
+        self.modules = modules  # [(模块名, 大小)]，按大小降序
+        self.binaries = binaries  # [(目标名称, 大小, 所属包)]
+        self.datas = datas  # [(目标名称, 大小, 所属包)]
+        self.packages = packages  # [(顶层包, 大小, 导入链)]
+        self.suggestions = suggestions  # [(模块名, 说明, 大小, 导入链, 默认勾选)]
+        self.warnings = warnings  # 导入了已排除模块的 top-level 导入 [(模块名, 导入者描述)]
+        self.total_size = total_size
+
+
+def analyze_build(build_dir, script, excluded=()):
+    """分析 build/<程序名> 目录，script 为主脚本路径，excluded 为当前已排除的模块"""
+    name = os.path.basename(build_dir.rstrip(os.sep))
+    entries = {}
+    for toc_name in ("PYZ-00.toc", "PKG-00.toc", "COLLECT-00.toc"):
+        data = load_toc(os.path.join(build_dir, toc_name))
+        if data is None:
+            continue
+        for dest_name, source, typecode in iter_toc_entries(data):
+            if typecode not in _SKIP_TYPES:
+                entries.setdefault((dest_name, typecode), source)
+    if not entries:
+        raise FileNotFoundError(f"在 {build_dir} 中没有找到可用的TOC文件，请先完成一次构建")
+
+    graph = parse_xref(os.path.join(build_dir, f"xref-{name}.html"))
+    warnings = parse_warnings(os.path.join(build_dir, f"warn-{name}.txt"))
+
+    modules, binaries, datas = [], [], []
+    package_sizes = {}
+    for (dest_name, typecode), source in entries.items():
+        size = _file_size(source)
+        if typecode in ("PYMODULE", "PYSOURCE"):
+            modules.append((dest_name, size))
+            package = dest_name.split('.')[0]
+        elif typecode == "EXTENSION":
+            module = _extension_module(dest_name)
+            binaries.append((dest_name, size, module.split('.')[0]))
+            package = module.split('.')[0]
+        elif typecode == "BINARY":
+            package = _owner_package(dest_name)
+            binaries.append((dest_name, size, package))
+        else:
+            package = _owner_package(dest_name)
+            datas.append((dest_name, size, package))
+        package_sizes[package] = package_sizes.get(package, 0) + size
+
+    script_node = os.path.basename(script)
+    roots = [script_node] if script_node in graph else [n for n, node in graph.items() if node["type"] == "Script"]
+    project_dir = os.path.dirname(os.path.abspath(script))
+
+    # 项目自身的模块直接导入的顶层包
+    direct = set()
+    for node_name, node in graph.items():
+        path = node["path"]
+        if node_name == script_node or (path and os.path.abspath(path).startswith(project_dir + os.sep)):
+            direct.update(child.split('.')[0] for child in node["imports"])
+
+    packages = []
+    for package, size in sorted(package_sizes.items(), key=lambda item: item[1], reverse=True):
+        packages.append((package, size, import_chain(graph, roots, package)))
+
+    excluded = set(excluded)
+    suggestions = []
+    for package, size, chain in packages:
+        if package in excluded or package in direct or not chain:
+            continue
+        if package in STDLIB_CANDIDATES:
+            suggestions.append((package, f"标准库 {STDLIB_CANDIDATES[package]}，项目代码未直接导入", size, chain, True))
+        elif package in HEAVY_OPTIONAL:
+            suggestions.append((package, f"{HEAVY_OPTIONAL[package]}，项目代码未直接导入", size, chain, True))
+        elif size >= LARGE_PACKAGE_MB * 2 ** 20:
+            suggestions.append((package, "体积较大，只被其他包导入，排除前请确认运行时用不到", size, chain, False))
+
+    # 已排除的模块（在 warn 文件中记为 missing 或 excluded）如果被 top-level 导入，运行时很可能出错
+    excluded_warnings = [
+        (module, importers) for module, (_, importers) in warnings.items()
+        if module.split('.')[0] in excluded and "top-level" in importers
+    ]
+
+    by_size = lambda item: item[1]
+    return BundleReport(
+        modules=sorted(modules, key=by_size, reverse=True),
+        binaries=sorted(binaries, key=by_size, reverse=True),
+        datas=sorted(datas, key=by_size, reverse=True),
+        packages=packages,
+        suggestions=suggestions,
+        warnings=excluded_warnings,
+        total_size=sum(package_sizes.values()),
+    )
+
+
+def format_size(size):
+    if size >= 2 ** 20:
+        return f"{size / 2 ** 20:.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+def format_chain(chain):
+    return " → ".join(chain)
+
+
+def format_report(report, top_n=TOP_N):
+    """把分析结果格式化为日志文本"""
+    lines = [f"--- 产物体积分析（未压缩总计 {format_size(report.total_size)}）---"]
+    sections = [
+        ("按顶层包", [(p, s, format_chain(c)) for p, s, c in report.packages]),
+        ("最大的模块", [(m, s, "") for m, s in report.modules]),
+        ("最大的二进制文件", [(d, s, p) for d, s, p in report.binaries]),
+        ("最大的数据文件", [(d, s, p) for d, s, p in report.datas]),
+    ]
+    for title, rows in sections:
+        if not rows:
+            continue
+        lines.append(f"{title}:")
+        for name, size, note in rows[:top_n]:
+            lines.append(f"  {format_size(size):>10}  {name}" + (f"    ({note})" if note else ""))
+    for module, importers in report.warnings:
+        lines.append(f"警告: 已排除的 {module} 被 top-level 导入: {importers}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,159 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : conda_envs.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： Conda环境发现模块，优先直接读取环境列表文件，并按文件修改时间缓存结果。
+
+import os
+import re
+import subprocess
+import sys
+
+from app_cache import load_json, save_json
+
+ENVS_CACHE_FILE = "conda_envs.json"
+# conda 记录所有已创建环境的文件
+ENVIRONMENTS_TXT = os.path.join(os.path.expanduser("~"), ".conda", "environments.txt")
+# 未设置环境变量时尝试的常见安装位置
+_DEFAULT_ROOT_NAMES = ("anaconda3", "miniconda3", "miniforge3", "mambaforge")
+
+
+def _is_env(path):
+    """带有 conda-meta 目录的才是Conda环境"""
+    return os.path.isdir(os.path.join(path, "conda-meta"))
+
+
+def _root_from_env(env_path):
+    """如果环境位于 <root>/envs/<name> 下，返回 root"""
+    parent = os.path.dirname(env_path)
+    if os.path.basename(parent).lower() == "envs":
+        return os.path.dirname(parent)
+    return None
+
+
+def _read_environments_txt():
+    try:
+        with open(ENVIRONMENTS_TXT, 'r', encoding='utf-8') as f:
+            return [os.path.normpath(line.strip()) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def _conda_roots(listed_envs):
+    """推测本机的Conda安装根目录（base环境）"""
+    candidates = []
+    conda_exe = os.environ.get("CONDA_EXE")
+    if conda_exe:
+        # <root>/bin/conda, <root>/Scripts/conda.exe 或 <root>/condabin/conda.bat
+        candidates.append(os.path.dirname(os.path.dirname(conda_exe)))
+    for var in ("_CONDA_ROOT", "CONDA_ROOT"):
+        if os.environ.get(var):
+            candidates.append(os.environ[var])
+    prefix = os.environ.get("CONDA_PREFIX")
+    if prefix:
+        candidates.append(_root_from_env(prefix) or prefix)
+    candidates.extend(_root_from_env(env) for env in listed_envs)
+    home = os.path.expanduser("~")
+    candidates.extend(os.path.join(home, name) for name in _DEFAULT_ROOT_NAMES)
+
+    roots = []
+    for candidate in candidates:
+        if not candidate:
+            continue
+        candidate = os.path.normpath(candidate)
+        if candidate not in roots and _is_env(candidate):
+            roots.append(candidate)
+    return roots
+
+
+def _source_paths(roots):
+    """决定缓存是否有效的文件和目录：环境列表文件和各个 envs 目录"""
+    return [ENVIRONMENTS_TXT] + [os.path.join(root, "envs") for root in roots]
+
+
+def _source_mtimes(paths):
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+def scan_conda_envs():
+    """
+    不启动conda进程，直接读取 environments.txt 和各安装根目录下的 envs 目录来发现环境。
+    返回 ({名称: 路径}, {来源路径: 修改时间})。
+    """
+    listed_envs = _read_environments_txt()
+    roots = _conda_roots(listed_envs)
+
+    env_paths = []
+    for root in roots:
+        env_paths.append(root)
+        try:
+            with os.scandir(os.path.join(root, "envs")) as entries:
+                env_paths.extend(sorted(entry.path for entry in entries if entry.is_dir()))
+        except OSError:
+            pass
+    env_paths.extend(listed_envs)
+
+    envs = {}
+    seen = set()
+    for path in env_paths:
+        path = os.path.normpath(path)
+        key = os.path.normcase(path)
+        if key in seen or not _is_env(path):
+            continue
+        seen.add(key)
+        name = "base" if roots and path == roots[0] else os.path.basename(path)
+        if name in envs:
+            name = f"{name} ({path})"
+        envs[name] = path
+    return envs, _source_mtimes(_source_paths(roots))
+
+
+def load_cached_envs():
+    """
+    读取缓存的环境列表。
+    返回 (环境字典, 是否仍然有效)；当记录的来源文件修改时间都没有变化时，缓存有效。
+    """
+    cache = load_json(ENVS_CACHE_FILE)
+    if not isinstance(cache, dict) or not isinstance(cache.get("envs"), dict):
+        return {}, False
+    sources = cache.get("sources") or {}
+    is_fresh = bool(sources) and _source_mtimes(list(sources)) == sources
+    return cache["envs"], is_fresh
+
+
+def save_cached_envs(envs, sources):
+    save_json(ENVS_CACHE_FILE, {"envs": envs, "sources": sources})
+
+
+def get_conda_envs():
+    """通过 conda env list 获取系统中所有Conda环境的字典 {名称: 路径}"""
+    envs = {}
+    try:
+        creation_flags = 0
+        if sys.platform == 'win32':
+            creation_flags = subprocess.CREATE_NO_WINDOW
+
+        proc = subprocess.run(
+            ["conda", "env", "list"],
+            capture_output=True, text=True, check=True, encoding='utf-8',
+            creationflags=creation_flags
+        )
+        # 正则表达式用于匹配环境名称和路径
+        env_pattern = re.compile(r"^(\S+)\s+\*?\s+(.+)$")
+        for line in proc.stdout.splitlines():
+            if not line.startswith('#') and line.strip():
+                match = env_pattern.match(line)
+                if match:
+                    name, path = match.groups()
+                    envs[name.strip()] = os.path.normpath(path.strip())
+        return envs
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        # 如果conda命令失败，返回空字典
+        return {}
@@ -0,0 +1,246 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : data_scanner.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 附加数据的扫描与暂存。按包含/排除模式并行扫描数据目录（os.scandir），
+#                把过滤后的文件以硬链接的方式暂存到 output/build/<程序名>_data 下，再交给 --add-data，
+#                避免把 .git、__pycache__、虚拟环境等无关文件打包进程序。
+
+import fnmatch
+import json
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from build_config import data_stage_dir
+from bundle_analyzer import format_size
+
+# 添加数据目录时默认填入的排除模式
+DEFAULT_DATA_EXCLUDES = (".git", ".hg", ".svn", "__pycache__", "*.pyc", ".venv", "venv", ".tox",
+                         ".pytest_cache", ".mypy_cache", ".DS_Store")
+# 每个扫描任务最多处理的目录数
+SCAN_BATCH_SIZE = 64
+
+
+def _scan_workers():
+    # 扫描主要在等待文件系统，线程数可以比CPU核心数多
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def split_patterns(text):
+    """把逗号分隔的模式字符串拆成元组"""
+    return tuple(p.strip() for p in text.split(',') if p.strip())
+
+
+class PathFilter:
+    """
+    包含/排除模式。不含 "/" 的模式匹配文件或目录名（如 "*.png"、"__pycache__"），
+    含 "/" 的模式匹配相对于数据目录的路径（如 "docs/*.md"）。
+    排除模式对目录和文件都生效（排除的目录不再进入扫描）；包含模式只对文件生效，为空时包含所有文件。
+    """
+
+    def __init__(self, include=(), exclude=()):
+        self.include = self._compile(include)
+        self.exclude = self._compile(exclude)
+
+    @staticmethod
+    def _compile(patterns):
+        flags = re.IGNORECASE if sys.platform == 'win32' else 0
+        name_patterns = [fnmatch.translate(p.rstrip("/")) for p in patterns if "/" not in p.rstrip("/")]
+        path_patterns = [fnmatch.translate(p.strip("/")) for p in patterns if "/" in p.rstrip("/")]
+        return tuple(re.compile("|".join(group), flags) if group else None
+                     for group in (name_patterns, path_patterns))
+
+    @staticmethod
+    def _matches(compiled, name, rel_path):
+        name_regex, path_regex = compiled
+        return bool((name_regex and name_regex.match(name)) or (path_regex and path_regex.match(rel_path)))
+
+    def excludes(self, name, rel_path):
+        return self._matches(self.exclude, name, rel_path)
+
+    def includes_file(self, name, rel_path):
+        if self.include == (None, None):
+            return True
+        return self._matches(self.include, name, rel_path)
+
+
+class DataScan:
+    """一个附加数据条目的扫描结果"""
+
+    def __init__(self, source, files, excluded):
+        self.source = source
+        self.files = files  # [(相对路径, 大小, 修改时间), ...]，按相对路径排序
+        self.excluded = excluded  # 被过滤掉的文件和目录数
+        self.total_size = sum(size for _, size, _ in files)
+
+    @property
+    def file_count(self):
+        return len(self.files)
+
+    def describe(self):
+        text = f"{self.file_count} 个文件，{format_size(self.total_size)}"
+        if self.excluded:
+            text += f"（已排除 {self.excluded} 项）"
+        return text
+
+
+def _scan_dirs(directories, path_filter):
+    """扫描一批目录，返回 (文件列表, 需要继续扫描的子目录, 排除数)"""
+    files, subdirs, excluded = [], [], 0
+    for path, rel_dir in directories:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if path_filter.excludes(entry.name, rel_path):
+                    excluded += 1
+                elif entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, rel_path))
+                elif not entry.is_file():
+                    continue
+                elif path_filter.includes_file(entry.name, rel_path):
+                    st = entry.stat()
+                    files.append((rel_path, st.st_size, st.st_mtime_ns))
+                else:
+                    excluded += 1
+    return files, subdirs, excluded
+
+
+def scan_data_entry(source, include=(), exclude=(), max_workers=None):
+    """
+    扫描一个附加数据条目（文件或目录）。
+    待扫描的目录分批交给线程池并行扫描，每批最多 SCAN_BATCH_SIZE 个目录，减少线程间调度的开销。
+    """
+    path_filter = PathFilter(include, exclude)
+    if os.path.isfile(source):
+        name = os.path.basename(source)
+        if path_filter.excludes(name, name) or not path_filter.includes_file(name, name):
+            return DataScan(source, [], 1)
+        st = os.stat(source)
+        return DataScan(source, [(name, st.st_size, st.st_mtime_ns)], 0)
+    if not os.path.isdir(source):
+        raise FileNotFoundError(f"附加数据不存在: {source}")
+
+    workers = max_workers or _scan_workers()
+    files, excluded = [], 0
+    todo = [(source, "")]
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while todo or pending:
+            free = workers - len(pending)
+            if todo and free > 0:
+                size = min(SCAN_BATCH_SIZE, -(-len(todo) // free))
+                for _ in range(free):
+                    if not todo:
+                        break
+                    pending.add(executor.submit(_scan_dirs, todo[:size], path_filter))
+                    del todo[:size]
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_files, subdirs, batch_excluded = future.result()
+                files.extend(batch_files)
+                excluded += batch_excluded
+                todo.extend(subdirs)
+    files.sort()
+    return DataScan(source, files, excluded)
+
+
+def scan_data_files(data_files):
+    """扫描所有附加数据条目，返回与条目一一对应的 DataScan 或错误信息"""
+    results = []
+    for source, _, include, exclude in data_files:
+        try:
+            results.append(scan_data_entry(source, include, exclude))
+        except OSError as e:
+            results.append(str(e))
+    return results
+
+
+def _link_files(source_dir, stage_dir, rel_paths):
+    """
+    优先创建硬链接（不占额外空间、几乎不耗时），跨磁盘或文件系统不支持时复制。返回复制的文件数。
+    """
+    copied = 0
+    for rel_path in rel_paths:
+        source, target = os.path.join(source_dir, rel_path), os.path.join(stage_dir, rel_path)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+            copied += 1
+    return copied
+
+
+def stage_data(scan, stage_dir, max_workers=None):
+    """
+    把扫描结果中的文件以硬链接的形式暂存到 stage_dir，返回 (是否复用了上次的暂存目录, 复制的文件数)。
+    文件列表（含大小和修改时间）与上次相同时直接复用。
+    """
+    manifest_path = stage_dir + ".json"
+    manifest = {"source": os.path.abspath(scan.source), "files": [list(f) for f in scan.files]}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == manifest and os.path.isdir(stage_dir):
+                return True, 0
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    os.makedirs(stage_dir)
+    source_dir = scan.source if os.path.isdir(scan.source) else os.path.dirname(scan.source)
+    for directory in sorted({os.path.dirname(rel_path) for rel_path, _, _ in scan.files} - {""}):
+        os.makedirs(os.path.join(stage_dir, directory), exist_ok=True)
+    # 按线程数把文件分成几批并行处理
+    workers = max_workers or _scan_workers()
+    rel_paths = [rel_path for rel_path, _, _ in scan.files]
+    size = max(1, -(-len(rel_paths) // workers))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        copied = sum(executor.map(lambda start: _link_files(source_dir, stage_dir, rel_paths[start:start + size]),
+                                  range(0, len(rel_paths), size)))
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return False, copied
+
+
+class DataStageError(Exception):
+    """附加数据无法暂存"""
+
+
+class DataStage:
+    """一次构建中需要按模式过滤的附加数据条目，构建前由 BuildRunner 调用 prepare 暂存"""
+
+    def __init__(self, entries):
+        self.entries = entries  # [(源路径, 包含模式, 排除模式, 暂存目录), ...]
+
+    def prepare(self, on_output):
+        for source, include, exclude, stage_dir in self.entries:
+            try:
+                scan = scan_data_entry(source, include, exclude)
+            except OSError as e:
+                raise DataStageError(str(e))
+            if not scan.files:
+                raise DataStageError(f"附加数据 {source} 经过滤后没有任何文件")
+            try:
+                reused, copied = stage_data(scan, stage_dir)
+            except OSError as e:
+                raise DataStageError(f"无法暂存附加数据 {source}: {e}")
+            if reused:
+                action = "复用暂存目录"
+            elif copied:
+                action = f"已暂存（其中 {copied} 个文件无法创建硬链接，已复制）"
+            else:
+                action = "已暂存"
+            on_output(f"附加数据 {source}: {scan.describe()}，{action}\n")
+
+
+def make_data_stage(config):
+    """根据构建配置创建附加数据暂存任务；没有设置过滤模式的条目直接交给 --add-data，全部如此时返回None"""
+    entries = [
+        (source, include, exclude, data_stage_dir(config.build_path, config.app_name, index, source))
+        for index, (source, _, include, exclude) in enumerate(config.data_files)
+        if include or exclude
+    ]
+    return DataStage(entries) if entries else None
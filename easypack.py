@@ -0,0 +1,203 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : easypack.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 命令行入口，无界面构建模式不会导入PyQt6。用法: python -m easypack build config.toml
+
+import argparse
+import os
+import signal
+import sys
+
+from build_agent import DEFAULT_AGENT_PORT, AgentPool, RemoteBuildRunner, parse_agents, run_agent
+from build_cache import make_incremental_build
+from build_config import ConfigError, build_command, load_config_file
+from build_phases import save_summary
+from build_runner import BuildRunner
+from conda_envs import load_cached_envs, scan_conda_envs
+from data_scanner import make_data_stage
+from spec_file import CONFLICT_KEEP, CONFLICT_REGENERATE, make_spec_file
+from upx_cache import make_upx_pass
+from shared_cache import cache_stats, clear_cache, load_settings, make_shared_cache, save_settings
+from env_probe import EnvProbeError, probe_env
+
+
+def resolve_env(env):
+    """把Conda环境名称或路径解析为环境路径，找不到时返回None"""
+    if os.path.isdir(env):
+        return os.path.abspath(env)
+    envs, _ = load_cached_envs()
+    if env not in envs:
+        envs, _ = scan_conda_envs()
+    return envs.get(env)
+
+
+def _write_output(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def run_build(config_path, incremental=None, clean=False, phases_json=None, regenerate_spec=False, agents=None,
+              agent_token=None):
+    """
+    按配置文件执行一次构建，返回PyInstaller的退出代码；phases_json 为各阶段耗时的导出路径。
+    spec 模式下手动修改过的 spec 默认保留，regenerate_spec 为True时按配置重新生成。
+    agents 为构建代理列表（"host:port, ..."）时，交给其中最空闲的代理在同名环境中构建。
+    """
+    try:
+        config, settings = load_config_file(config_path)
+    except ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    if clean:
+        config.clean = True
+    if agents:
+        return _run_remote_build(config, settings, agents, agent_token, phases_json)
+
+    env_path = None
+    site_packages = []
+    if settings["env"]:
+        env_path = resolve_env(settings["env"])
+        if env_path is None:
+            print(f"错误: 未找到Conda环境 '{settings['env']}'", file=sys.stderr)
+            return 2
+        try:
+            info = probe_env(env_path)
+        except EnvProbeError as e:
+            print(f"错误: 探测环境失败: {e}", file=sys.stderr)
+            return 2
+        if not info.get("pyinstaller_version"):
+            print(f"错误: 环境 '{settings['env']}' 中未安装PyInstaller", file=sys.stderr)
+            return 2
+        site_packages = info["site_packages"]
+        if not config.python_executable:
+            config.python_executable = info["executable"]
+        if not config.paths:
+            config.paths = os.pathsep.join(site_packages)
+    elif not config.python_executable:
+        # 未指定环境和解释器时使用当前解释器
+        config.python_executable = sys.executable
+
+    command, error = build_command(config)
+    if error:
+        print(f"错误: {error}", file=sys.stderr)
+        return 2
+
+    use_incremental = settings["incremental"] if incremental is None else incremental
+    incremental_build = None
+    if use_incremental and not config.clean:
+        incremental_build = make_incremental_build(config, env_path, site_packages)
+
+    upx_pass = make_upx_pass(config)
+    runner = BuildRunner(command, config.python_executable, _write_output, incremental_build,
+                         limits=settings["limits"], data_stage=make_data_stage(config),
+                         spec_file=make_spec_file(config, CONFLICT_REGENERATE if regenerate_spec else CONFLICT_KEEP),
+                         upx_pass=upx_pass, shared_cache=make_shared_cache(settings["shared_cache"], upx_pass))
+    # Ctrl+C 时请求取消，由执行器终止整个进程树。信号处理函数运行在主线程中，主线程可能正持有输出队列的锁，
+    # 所以这里只设置取消标记而不调用 cancel()，执行循环最迟在一个日志批次间隔后响应
+    signal.signal(signal.SIGINT, lambda signum, frame: setattr(runner, "is_cancelled", True))
+    return _finish_build(runner, config, phases_json)
+
+
+def _run_remote_build(config, settings, agents, agent_token, phases_json):
+    """由构建代理执行构建；解释器和模块路径由代理按环境名确定，本机不需要该环境"""
+    try:
+        agent_list = parse_agents(agents)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    if not config.script or not os.path.isfile(config.script):
+        print("错误: 未选择主Python脚本。", file=sys.stderr)
+        return 2
+    token = agent_token or os.environ.get("EASYPACK_AGENT_TOKEN", "")
+    runner = RemoteBuildRunner(config, settings["env"], AgentPool(agent_list, token), _write_output)
+    signal.signal(signal.SIGINT, lambda signum, frame: runner.cancel())
+    return _finish_build(runner, config, phases_json)
+
+
+def _finish_build(runner, config, phases_json):
+    """执行构建，输出结果并按需导出各阶段耗时"""
+    return_code = runner.run()
+    if runner.skipped:
+        _write_output(f"\n--- 未检测到输入变化，已跳过构建: {config.artifact_path} ---\n")
+    elif return_code == 0 and not runner.is_cancelled:
+        _write_output(f"\n--- 构建成功! 输出: {config.artifact_path} ---\n")
+    elif not runner.is_cancelled:
+        _write_output(f"\n--- 构建失败，退出代码: {return_code}. ---\n")
+    if phases_json and runner.phase_summary is not None:
+        try:
+            save_summary(runner.phase_summary, phases_json)
+        except OSError as e:
+            print(f"错误: 无法写入阶段耗时: {e}", file=sys.stderr)
+    return return_code
+
+
+def manage_cache(limit_mb=None, clear=False):
+    """查看共享构建缓存的占用和命中统计，可以修改大小上限或清空"""
+    if limit_mb is not None:
+        if limit_mb <= 0:
+            print("错误: 缓存上限必须大于0", file=sys.stderr)
+            return 2
+        save_settings(load_settings()["enabled"], limit_mb)
+    if clear:
+        clear_cache()
+    print(cache_stats().describe())
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="easypack", description="EasyPack - PyInstaller 打包工具")
+    subparsers = parser.add_subparsers(dest="command")
+
+    build_parser = subparsers.add_parser("build", help="按配置文件无界面构建")
+    build_parser.add_argument("config", help="TOML（或JSON）格式的构建配置文件")
+    build_parser.add_argument("--clean", action="store_true", help="强制完整重建 (--clean)")
+    incremental_group = build_parser.add_mutually_exclusive_group()
+    incremental_group.add_argument("--incremental", dest="incremental", action="store_true", default=None,
+                                   help="启用增量构建（默认按配置文件）")
+    incremental_group.add_argument("--no-incremental", dest="incremental", action="store_false",
+                                   help="禁用增量构建")
+    build_parser.add_argument("--phases-json", metavar="PATH", help="把各阶段耗时导出为JSON文件")
+    build_parser.add_argument("--regenerate-spec", action="store_true",
+                              help="spec 模式下按配置重新生成手动修改过的 spec（原文件备份为 .bak）")
+
+    cache_parser = subparsers.add_parser("cache", help="查看或管理共享构建缓存")
+    cache_parser.add_argument("--limit-mb", type=int, metavar="MB", help="设置缓存大小上限（MB）")
+    cache_parser.add_argument("--clear", action="store_true", help="清空共享缓存和统计")
+
+    build_parser.add_argument("--agents", metavar="HOST:PORT,...", help="交给构建代理中最空闲的一个构建")
+    build_parser.add_argument("--agent-token", metavar="TOKEN",
+                              help="构建代理的令牌（默认读取 EASYPACK_AGENT_TOKEN 环境变量）")
+
+    agent_parser = subparsers.add_parser("agent", help="作为构建代理运行，接收其他EasyPack派发的构建任务")
+    agent_parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认只接受本机连接，0.0.0.0 为所有网卡）")
+    agent_parser.add_argument("--port", type=int, default=DEFAULT_AGENT_PORT, help="监听端口，0 为自动选择")
+    agent_parser.add_argument("--token", help="客户端需要提供的令牌（默认读取 EASYPACK_AGENT_TOKEN，否则随机生成）")
+    agent_parser.add_argument("--capacity", type=int, help="同时构建数上限（默认为CPU核心数的一半）")
+    agent_parser.add_argument("--env", action="append", default=[], metavar="NAME=PATH",
+                              help="可用的环境（环境目录或解释器路径），可重复；其他名称按Conda环境名查找")
+
+    gui_parser = subparsers.add_parser("gui", help="启动图形界面（默认）")
+    gui_parser.add_argument("--profile-startup", action="store_true", help="输出启动各阶段的耗时")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        return run_build(args.config, args.incremental, args.clean, args.phases_json, args.regenerate_spec,
+                         args.agents, args.agent_token)
+    if args.command == "cache":
+        return manage_cache(args.limit_mb, args.clear)
+    if args.command == "agent":
+        envs = dict(item.partition("=")[::2] for item in args.env)
+        return run_agent(args.host, args.port, args.token, envs, args.capacity, resolve_env)
+
+    if getattr(args, "profile_startup", False):
+        os.environ["EASYPACK_PROFILE_STARTUP"] = "1"
+    # 只有图形界面模式才导入PyQt6
+    from main import MainAppController
+    MainAppController().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : env_probe.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 环境探测模块，一次子进程调用获取解释器信息，并按环境缓存结果。
+
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from app_cache import load_json, save_json
+
+PROBE_CACHE_FILE = "env_probe.json"
+# 并行探测多个环境（矩阵构建、构建代理）时，保护缓存文件的读取-修改-写入
+_cache_lock = threading.Lock()
+
+# 在目标环境的解释器中执行的探测脚本，只使用标准库，输出一行JSON
+PROBE_SCRIPT = r"""
+import json, os, platform, site, sys, sysconfig
+dirs = []
+try:
+    dirs.extend(site.getsitepackages())
+except AttributeError:
+    pass
+for key in ("purelib", "platlib"):
+    path = sysconfig.get_paths().get(key)
+    if path:
+        dirs.append(path)
+site_packages = []
+for path in dirs:
+    path = os.path.normpath(path)
+    name = os.path.basename(path).lower()
+    if name in ("site-packages", "dist-packages") and os.path.isdir(path) and path not in site_packages:
+        site_packages.append(path)
+try:
+    from importlib.metadata import version
+    pyinstaller_version = version("pyinstaller")
+except Exception:
+    pyinstaller_version = None
+print(json.dumps({
+    "executable": sys.executable,
+    "python_version": "%d.%d.%d" % sys.version_info[:3],
+    "architecture": platform.architecture()[0],
+    "site_packages": site_packages,
+    "pyinstaller_version": pyinstaller_version,
+}))
+"""
+
+
+class EnvProbeError(Exception):
+    """环境探测失败"""
+
+
+def env_python(env_path):
+    """按平台布局推测环境中的Python解释器路径"""
+    if sys.platform == 'win32':
+        return os.path.join(env_path, "python.exe")
+    return os.path.join(env_path, "bin", "python")
+
+
+def _env_stamp(env_path, site_packages=()):
+    """
+    环境的变更标记：conda-meta 目录的修改时间（conda安装/卸载包时变化），
+    以及各 site-packages 目录的修改时间（pip安装/卸载包时变化）。
+    """
+    stamp = []
+    for path in [os.path.join(env_path, "conda-meta")] + list(site_packages):
+        try:
+            stamp.append(os.stat(path).st_mtime)
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def get_cached_probe(env_path):
+    """返回仍然有效的缓存探测结果，没有或已失效时返回None"""
+    entry = (load_json(PROBE_CACHE_FILE) or {}).get(env_path)
+    if not entry:
+        return None
+    info = entry.get("info") or {}
+    if entry.get("stamp") != _env_stamp(env_path, info.get("site_packages", [])):
+        return None
+    return info
+
+
+def find_cached_probe(python_executable):
+    """按解释器路径查找缓存的探测结果（不检查是否过期），没有时返回None"""
+    target = os.path.normcase(os.path.abspath(python_executable))
+    for entry in (load_json(PROBE_CACHE_FILE) or {}).values():
+        info = entry.get("info") or {}
+        if info.get("executable") and os.path.normcase(os.path.abspath(info["executable"])) == target:
+            return info
+    return None
+
+
+def probe_env(env_path, use_cache=True):
+    """
+    探测环境，返回包含 executable、python_version、architecture、site_packages、pyinstaller_version 的字典。
+    整个过程只启动一个子进程，结果按环境缓存。
+    """
+    if use_cache:
+        info = get_cached_probe(env_path)
+        if info is not None:
+            return info
+
+    python_exe = env_python(env_path)
+    try:
+        proc = subprocess.run(
+            [python_exe, "-c", PROBE_SCRIPT],
+            capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=60,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise EnvProbeError(f"无法运行 '{python_exe}': {e}")
+    if proc.returncode != 0:
+        raise EnvProbeError(proc.stderr.strip() or f"探测进程退出代码: {proc.returncode}")
+    try:
+        info = json.loads(proc.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        raise EnvProbeError(f"无法解析探测结果: {proc.stdout.strip()}")
+
+    stamp = _env_stamp(env_path, info["site_packages"])
+    with _cache_lock:
+        cache = load_json(PROBE_CACHE_FILE) or {}
+        cache[env_path] = {"stamp": stamp, "info": info}
+        save_json(PROBE_CACHE_FILE, cache)
+    return info
@@ -0,0 +1,199 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : import_scanner.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 静态导入分析，在进程池中用ast解析项目源码，找出动态导入并建议 --hidden-import。
+
+import ast
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from app_cache import load_json, save_json
+
+SCAN_CACHE_FILE = "import_scan.json"
+# 扫描项目时跳过的目录
+SKIP_DIRS = {"output", "build", "dist", "__pycache__", ".git", ".hg", ".svn", ".idea", ".vscode",
+             ".venv", "venv", "env", ".tox", ".nox", "node_modules", "site-packages"}
+# 待解析文件少于此数量时直接在当前进程中解析，避免进程池的启动开销
+MIN_FILES_FOR_POOL = 16
+
+# 插件入口点字符串，例如 "name = pkg.module:attr" 或 "pkg.module:attr"
+_ENTRY_POINT_RE = re.compile(
+    r"^\s*(?:(?P<name>[\w.-]+)\s*=\s*)?(?P<module>[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)\s*:\s*[A-Za-z_][\w.]*\s*$"
+)
+_MODULE_NAME_RE = re.compile(r"^[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*$")
+
+
+def _const_str(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _call_name(func):
+    """返回被调用对象的名称，例如 importlib.import_module 或 __import__"""
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _resolve_relative(name, package):
+    """把 '.sub' 这样的相对模块名按包名解析为绝对模块名"""
+    level = len(name) - len(name.lstrip('.'))
+    if not level:
+        return name
+    if not package:
+        return None
+    parts = package.split('.')
+    if level > len(parts):
+        return None
+    base = parts[:len(parts) - level + 1]
+    rest = name[level:]
+    return '.'.join(base + ([rest] if rest else []))
+
+
+def scan_file(path, package=""):
+    """
+    解析单个源文件，返回 {"static": [...], "dynamic": [[模块名, 行号], ...]}。
+    package 为该文件所在的包名，用于解析相对的动态导入。
+    """
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return {"static": [], "dynamic": []}
+
+    static = set()
+    dynamic = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            static.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level:
+                static.add(node.module)
+                static.update(f"{node.module}.{alias.name}" for alias in node.names)
+        elif isinstance(node, ast.Call) and node.args:
+            func_name = _call_name(node.func)
+            first = _const_str(node.args[0])
+            if first is None:
+                continue
+            if func_name == "import_module":
+                anchor = _const_str(node.args[1]) if len(node.args) > 1 else None
+                for keyword in node.keywords:
+                    if keyword.arg == "package":
+                        anchor = _const_str(keyword.value)
+                module = _resolve_relative(first, anchor or package)
+                if module:
+                    dynamic.append([module, node.lineno])
+            elif func_name == "__import__" and _MODULE_NAME_RE.match(first):
+                dynamic.append([first, node.lineno])
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and ':' in node.value:
+            match = _ENTRY_POINT_RE.match(node.value)
+            # 没有 "name =" 前缀时，要求模块名带点，以减少 "key:value" 一类字符串的误报
+            if match and (match.group("name") or '.' in match.group("module")):
+                dynamic.append([match.group("module"), node.lineno])
+    return {"static": sorted(static), "dynamic": dynamic}
+
+
+def _scan_file_args(args):
+    return scan_file(*args)
+
+
+def iter_project_files(root):
+    """遍历项目目录下的所有 .py 文件，跳过输出目录、虚拟环境和版本控制目录"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.endswith((".py", ".pyw")):
+                yield os.path.join(dirpath, filename)
+
+
+def _package_of(path, root):
+    """根据文件相对于项目根目录的位置推断其所在的包名"""
+    rel_dir = os.path.relpath(os.path.dirname(path), root)
+    if rel_dir == os.curdir:
+        return ""
+    return '.'.join(rel_dir.split(os.sep))
+
+
+def _sha256_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ScanResult:
+    """一次项目扫描的结果"""
+
+    def __init__(self, suggestions, file_count, parsed_count):
+        self.suggestions = suggestions  # {模块名: [(文件路径, 行号), ...]}
+        self.file_count = file_count
+        self.parsed_count = parsed_count
+
+    @property
+    def cached_count(self):
+        return self.file_count - self.parsed_count
+
+
+def scan_project(script, max_workers=None):
+    """
+    扫描脚本所在目录的整个本地包树，返回 ScanResult。
+    每个文件的解析结果按 (大小, 修改时间) 缓存；修改时间变化但内容哈希不变时同样复用。
+    需要解析的文件较多时在进程池中并行解析。
+    """
+    root = os.path.dirname(os.path.abspath(script))
+    cache = load_json(SCAN_CACHE_FILE) or {}
+    results = {}
+    to_parse = []
+    new_cache = {}
+    for path in iter_project_files(root):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = cache.get(path)
+        if entry and entry.get("stamp") == stamp:
+            results[path] = entry["result"]
+            new_cache[path] = entry
+            continue
+        sha = _sha256_file(path)
+        if entry and entry.get("sha") == sha:
+            results[path] = entry["result"]
+            new_cache[path] = {"stamp": stamp, "sha": sha, "result": entry["result"]}
+            continue
+        to_parse.append((path, stamp, sha))
+
+    jobs = [(path, _package_of(path, root)) for path, _, _ in to_parse]
+    if len(jobs) >= MIN_FILES_FOR_POOL:
+        # 扫描在GUI的后台线程中进行，多线程进程中 fork 可能使子进程死锁，因此总是用 spawn 启动子进程
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            parsed = list(pool.map(_scan_file_args, jobs, chunksize=8))
+    else:
+        parsed = [scan_file(*job) for job in jobs]
+    for (path, stamp, sha), result in zip(to_parse, parsed):
+        results[path] = result
+        new_cache[path] = {"stamp": stamp, "sha": sha, "result": result}
+
+    # 保留其他项目的缓存条目，只替换本项目目录下的
+    root_prefix = os.path.join(root, "")
+    for path, entry in cache.items():
+        if not path.startswith(root_prefix):
+            new_cache.setdefault(path, entry)
+    save_json(SCAN_CACHE_FILE, new_cache)
+
+    static_imports = set()
+    for result in results.values():
+        static_imports.update(result["static"])
+    suggestions = {}
+    for path, result in results.items():
+        for module, lineno in result["dynamic"]:
+            # 已经被静态导入的模块PyInstaller能自己找到
+            if module not in static_imports:
+                suggestions.setdefault(module, []).append((path, lineno))
+    return ScanResult(dict(sorted(suggestions.items())), len(results), len(to_parse))
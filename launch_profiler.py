@@ -0,0 +1,229 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : launch_profiler.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 启动耗时分析。多次运行打包出的程序，测量冷启动和热启动的就绪时间，
+#                带有启动分析钩子时还能拆分出引导程序/解压耗时，并列出最慢的导入。
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark import summarize
+
+# 等待程序就绪的最长时间（秒）
+DEFAULT_LAUNCH_TIMEOUT = 60.0
+# 轮询钩子结果文件的间隔（秒）
+POLL_INTERVAL = 0.01
+# 报告中列出的最慢导入数量
+TOP_IMPORTS = 15
+
+
+def launch_executable(artifact_path):
+    """单文件模式的产物本身就是可执行文件；单目录模式为目录中与目录同名的可执行文件"""
+    if os.path.isfile(artifact_path):
+        return artifact_path
+    name = os.path.basename(artifact_path.rstrip(os.sep))
+    if sys.platform == 'win32':
+        name += ".exe"
+    return os.path.join(artifact_path, name)
+
+
+def can_evict_cache():
+    return hasattr(os, "posix_fadvise")
+
+
+def evict_from_cache(path):
+    """
+    让系统丢弃产物文件的页缓存，使下一次启动从磁盘读取（模拟冷启动）。
+    只在支持 posix_fadvise 的系统上有效，不需要管理员权限。
+    """
+    if not can_evict_cache():
+        return
+    paths = [path] if os.path.isfile(path) else [
+        os.path.join(dirpath, filename) for dirpath, _, filenames in os.walk(path) for filename in filenames
+    ]
+    for file_path in paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _read_result(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def launch_once(executable, collect_imports=False, timeout=DEFAULT_LAUNCH_TIMEOUT, is_cancelled=None):
+    """
+    启动一次程序并等待其就绪，返回 {time_to_ready, before_hook, after_hook, ready_by, imports}（单位为秒）。
+    带钩子的程序就绪后会自行退出；没有钩子时以进程退出作为就绪，超时或取消时结束进程。
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+    fd, result_path = tempfile.mkstemp(prefix="easypack_launch_", suffix=".json")
+    os.close(fd)
+    os.remove(result_path)
+    env = dict(os.environ, EASYPACK_LAUNCH_PROFILE=result_path, EASYPACK_LAUNCH_PROFILE_EXIT="1")
+    if collect_imports:
+        env["EASYPACK_LAUNCH_IMPORTS"] = "1"
+
+    spawn_time = time.time()
+    process = subprocess.Popen([executable], env=env, cwd=os.path.dirname(executable),
+                               stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = None
+    exit_time = None
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline and not is_cancelled():
+            result = _read_result(result_path)
+            if result is not None and result.get("ready") is not None:
+                break
+            if process.poll() is not None:
+                exit_time = time.time()
+                result = _read_result(result_path)
+                break
+            time.sleep(POLL_INTERVAL)
+        if is_cancelled() and process.poll() is None:
+            process.kill()
+        try:
+            # 就绪后程序会自行退出，等待它完成清理（单文件模式会删除解压目录）
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    finally:
+        if os.path.exists(result_path):
+            os.remove(result_path)
+
+    if result is not None and result.get("ready") is not None:
+        return {
+            "time_to_ready": result["ready"] - spawn_time,
+            "before_hook": result["hook"] - spawn_time,
+            "after_hook": result["ready"] - result["hook"],
+            "ready_by": result["ready_by"],
+            "return_code": process.returncode,
+            "imports": result.get("imports") or [],
+        }
+    return {
+        "time_to_ready": (exit_time - spawn_time) if exit_time is not None else None,
+        "before_hook": None,
+        "after_hook": None,
+        "ready_by": "exit" if exit_time is not None else "timeout",
+        "return_code": process.returncode,
+        "imports": [],
+    }
+
+
+def _slowest_imports(runs):
+    """汇总多次运行的导入耗时，按累计耗时的中位数排序"""
+    by_module = {}
+    for run in runs:
+        for name, self_us, cumulative_us in run["imports"]:
+            by_module.setdefault(name, ([], []))
+            by_module[name][0].append(self_us)
+            by_module[name][1].append(cumulative_us)
+    rows = []
+    for name, (self_times, cumulative_times) in by_module.items():
+        rows.append({"module": name,
+                     "self_ms": round(summarize(self_times)["median"] / 1000, 2),
+                     "cumulative_ms": round(summarize(cumulative_times)["median"] / 1000, 2)})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:TOP_IMPORTS]
+
+
+def _phase_stats(runs):
+    return {key: summarize([run[key] for run in runs])
+            for key in ("time_to_ready", "before_hook", "after_hook")}
+
+
+def profile_launch(artifact_path, runs=5, collect_imports=False, timeout=DEFAULT_LAUNCH_TIMEOUT,
+                   on_output=None, is_cancelled=None):
+    """
+    冷启动：每次启动前丢弃产物的页缓存（不支持时只有第一次启动算冷启动）；
+    热启动：先不计时地启动一次，再连续启动 runs 次。返回包含统计和原始数据的字典。
+    """
+    on_output = on_output or (lambda text: None)
+    is_cancelled = is_cancelled or (lambda: False)
+    executable = launch_executable(artifact_path)
+    if not os.path.isfile(executable):
+        raise FileNotFoundError(f"找不到可执行文件: {executable}")
+
+    cold_runs = runs if can_evict_cache() else 1
+    report = {"executable": executable, "onefile": os.path.isfile(artifact_path),
+              "cold_evicted": can_evict_cache(), "cold": [], "warm": []}
+
+    def run_series(kind, count, evict):
+        for i in range(1, count + 1):
+            if is_cancelled():
+                return
+            if evict:
+                evict_from_cache(artifact_path)
+            run = launch_once(executable, collect_imports, timeout, is_cancelled)
+            if is_cancelled():
+                return
+            report[kind].append(run)
+            ready = f"{run['time_to_ready']:.3f} 秒" if run["time_to_ready"] is not None else "超时"
+            detail = ""
+            if run["before_hook"] is not None:
+                detail = f" (引导/解压 {run['before_hook']:.3f} 秒 + 导入及初始化 {run['after_hook']:.3f} 秒)"
+            on_output(f"{'冷' if kind == 'cold' else '热'}启动 {i}/{count}: {ready}{detail}\n")
+
+    run_series("cold", cold_runs, evict=True)
+    if not is_cancelled():
+        on_output("热启动预热...\n")
+        launch_once(executable, False, timeout, is_cancelled)
+    run_series("warm", runs, evict=False)
+
+    completed = {kind: [run for run in report[kind] if run["time_to_ready"] is not None]
+                 for kind in ("cold", "warm")}
+    report["stats"] = {kind: _phase_stats(completed[kind]) for kind in ("cold", "warm")}
+    report["has_hook"] = any(run["before_hook"] is not None for run in completed["cold"] + completed["warm"])
+    report["slowest_imports"] = _slowest_imports(completed["warm"]) if collect_imports else []
+    for kind in ("cold", "warm"):
+        for run in report[kind]:
+            run.pop("imports", None)
+    return report
+
+
+def format_report(report):
+    """把启动分析结果格式化为日志文本"""
+    lines = ["--- 启动耗时分析 ---", f"  程序: {report['executable']}"]
+    if not report["cold_evicted"]:
+        lines.append("  (本系统无法丢弃页缓存，冷启动只统计第一次启动)")
+    if not report["has_hook"]:
+        lines.append("  (程序未包含启动分析钩子，以进程退出作为就绪；GUI程序请在构建时勾选“启动分析钩子”)")
+    labels = {"time_to_ready": "就绪耗时", "before_hook": "引导/解压", "after_hook": "导入及初始化"}
+    for kind, title in (("cold", "冷启动"), ("warm", "热启动")):
+        stats = report["stats"][kind]
+        if stats["time_to_ready"] is None:
+            lines.append(f"  {title}: 没有成功就绪的启动")
+            continue
+        lines.append(f"  {title} ({len(report[kind])} 次):")
+        for key, label in labels.items():
+            if stats[key] is not None:
+                lines.append(f"    {label:<8} 中位数 {stats[key]['median']:.3f} 秒  p95 {stats[key]['p95']:.3f} 秒")
+    if report["slowest_imports"]:
+        lines.append("  最慢的导入（热启动中位数，累计/自身，毫秒）:")
+        for row in report["slowest_imports"]:
+            lines.append(f"    {row['cumulative_ms']:>9.1f} {row['self_ms']:>9.1f}  {row['module']}")
+    return "\n".join(lines) + "\n"
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
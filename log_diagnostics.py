@@ -0,0 +1,156 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : log_diagnostics.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 从构建输出中逐行提取诊断信息：缺失的模块、找不到的隐藏导入、hook错误、二进制依赖问题以及其他
+#                警告和错误。每条诊断记录所在的日志行号；缺失模块可以一键加入隐藏导入。
+
+import os
+import re
+
+# 诊断类型
+KIND_MISSING_MODULE = "缺失模块"
+KIND_HIDDEN_IMPORT = "隐藏导入未找到"
+KIND_HOOK = "hook错误"
+KIND_BINARY = "二进制依赖"
+KIND_ERROR = "错误"
+KIND_WARNING = "警告"
+KINDS = (KIND_MISSING_MODULE, KIND_HIDDEN_IMPORT, KIND_HOOK, KIND_BINARY, KIND_ERROR, KIND_WARNING)
+
+# PyInstaller 的日志行，例如 "1234 WARNING: Library not found: ..."
+_LEVEL_RE = re.compile(r"^(?:\d+\s+)?(WARNING|ERROR|CRITICAL): (.*)$")
+# 用户指定的隐藏导入找不到时为 ERROR；hook 中声明的隐藏导入找不到时为 WARNING，只是hook的建议，通常可以忽略
+_HIDDEN_IMPORT_RE = re.compile(r"""Hidden import ['"]([\w.]+)['"] not found""")
+_LIBRARY_RE = re.compile(r"Library not found: could not resolve '([^']+)'|Library (\S+) required via ctypes not found|"
+                         r"lib not found: (\S+)")
+_COLLECT_SUBMODULES_RE = re.compile(r"Failed to collect submodules for '([\w.]+)'")
+_NO_MODULE_RE = re.compile(r"No module named '([\w.]+)'")
+_WARNFILE_RE = re.compile(r"\bINFO: Warnings written to (.+)$")
+_MISSING_RE = re.compile(r"^missing module named '?([\w.]+)'? - imported by (.*)$")
+_IMPORTER_RE = re.compile(r"([^,(]+?) \(([^)]*)\)")
+_TRACEBACK_START = "Traceback (most recent call last):"
+# EasyPack自己输出的错误，例如 "错误: 附加数据不存在"
+_EASYPACK_ERROR_PREFIX = "错误: "
+
+
+class Diagnostic:
+    """一条诊断：日志行号、类型、相关模块（或库）、说明，以及可以一键加入隐藏导入的模块"""
+
+    def __init__(self, line, kind, module, message, hidden_import=""):
+        self.line = line
+        self.kind = kind
+        self.module = module
+        self.message = message
+        self.hidden_import = hidden_import
+
+
+def _user_importers(importers, project_dir):
+    """warn 文件中的导入者里属于用户代码的部分：主脚本（以路径出现）或项目目录中的模块"""
+    result = []
+    for name, kinds in _IMPORTER_RE.findall(importers):
+        name = name.strip()
+        top_level = name.split(".")[0]
+        if os.sep in name or "/" in name or name.endswith(".py") or (project_dir and (
+                os.path.isfile(os.path.join(project_dir, top_level + ".py")) or
+                os.path.isdir(os.path.join(project_dir, top_level)))):
+            result.append(f"{os.path.basename(name)} ({kinds})")
+    return result
+
+
+def parse_warnfile(path, project_dir, line):
+    """
+    读取PyInstaller的 warn-<名称>.txt。大部分缺失模块只被标准库或第三方库按条件导入（如 Windows 专有模块），
+    只为被用户代码导入的模块生成诊断，其余合并为一条说明。
+    """
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            entries = [_MISSING_RE.match(text.rstrip('\n')) for text in f]
+    except OSError:
+        return []
+    diagnostics = []
+    ignored = 0
+    for match in filter(None, entries):
+        module, importers = match.groups()
+        user_importers = _user_importers(importers, project_dir)
+        if user_importers:
+            diagnostics.append(Diagnostic(line, KIND_MISSING_MODULE, module,
+                                          f"被 {', '.join(user_importers)} 导入，但PyInstaller找不到该模块", module))
+        else:
+            ignored += 1
+    if ignored:
+        diagnostics.append(Diagnostic(line, KIND_WARNING, "",
+                                      f"另有 {ignored} 个缺失模块只被标准库或第三方库导入，通常无需处理"
+                                      f"（详见 {os.path.basename(path)}）"))
+    return diagnostics
+
+
+class LogDiagnostics:
+    """
+    流式的诊断提取器：按顺序输入日志行及其行号，返回新发现的诊断。
+    跨批次的 Traceback 会在读到异常所在的行后作为一条诊断输出。
+    """
+
+    def __init__(self, project_dir=""):
+        self.project_dir = project_dir  # 用于区分 warn 文件中用户代码和第三方库的导入
+        self.diagnostics = []
+        self._traceback_line = None  # 正在读取的 Traceback 的起始行号
+        self._traceback_in_hook = False
+
+    def feed(self, lines, first_line):
+        """处理从 first_line 行开始的若干行，返回其中新发现的诊断"""
+        found = []
+        for offset, text in enumerate(lines):
+            found.extend(self._feed_line(text, first_line + offset))
+        self.diagnostics.extend(found)
+        return found
+
+    def _feed_line(self, text, line):
+        if self._traceback_line is not None:
+            if text.startswith((" ", "\t")) or not text.strip():
+                self._traceback_in_hook = self._traceback_in_hook or "hook-" in text
+                return []
+            return [self._finish_traceback(text)]
+        if text.startswith(_TRACEBACK_START):
+            self._traceback_line = line
+            self._traceback_in_hook = False
+            return []
+
+        match = _WARNFILE_RE.search(text)
+        if match:
+            return parse_warnfile(match.group(1).strip(), self.project_dir, line)
+        if text.startswith(_EASYPACK_ERROR_PREFIX):
+            return [Diagnostic(line, KIND_ERROR, "", text[len(_EASYPACK_ERROR_PREFIX):])]
+        match = _LEVEL_RE.match(text)
+        if match is None:
+            return []
+        level, message = match.groups()
+        return [self._classify(line, level, message)]
+
+    @staticmethod
+    def _classify(line, level, message):
+        match = _HIDDEN_IMPORT_RE.search(message)
+        if match:
+            note = "" if level != "WARNING" else "（hook 建议的隐藏导入，通常可以忽略）"
+            return Diagnostic(line, KIND_HIDDEN_IMPORT, match.group(1), message + note)
+        match = _LIBRARY_RE.search(message)
+        if match:
+            return Diagnostic(line, KIND_BINARY, next(filter(None, match.groups())), message)
+        match = _COLLECT_SUBMODULES_RE.search(message)
+        if match:
+            # 导入包时缺少的模块通常是它动态导入的依赖
+            missing = _NO_MODULE_RE.search(message)
+            return Diagnostic(line, KIND_HOOK, match.group(1), message, missing.group(1) if missing else "")
+        if "hook" in message.lower():
+            return Diagnostic(line, KIND_HOOK, "", message)
+        return Diagnostic(line, KIND_WARNING if level == "WARNING" else KIND_ERROR, "", message)
+
+    def _finish_traceback(self, text):
+        line, self._traceback_line = self._traceback_line, None
+        missing = _NO_MODULE_RE.search(text)
+        if self._traceback_in_hook:
+            return Diagnostic(line, KIND_HOOK, missing.group(1) if missing else "", text,
+                              missing.group(1) if missing else "")
+        if missing:
+            return Diagnostic(line, KIND_MISSING_MODULE, missing.group(1), text, missing.group(1))
+        return Diagnostic(line, KIND_ERROR, "", text)
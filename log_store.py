@@ -0,0 +1,127 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : log_store.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 有界的构建日志存储，内存中只保留最近的若干行，完整日志写入磁盘并可按页读回。
+
+import os
+import time
+from collections import deque
+from itertools import islice
+
+# 内存中保留的最大行数
+DEFAULT_MAX_LINES = 5000
+# 磁盘日志每隔多少行记录一次字节偏移，用于快速定位较早的内容
+INDEX_STEP = 1000
+
+
+def split_log_text(text):
+    """把一段输出拆分为日志行，去掉首尾多余的换行"""
+    text = text.strip('\r\n')
+    return text.splitlines() if text else []
+
+
+def build_log_path(output_dir, name):
+    """返回 output/logs 下带时间戳的日志文件路径"""
+    now = time.time()
+    timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}"
+    return os.path.join(output_dir, "logs", f"{name}_{timestamp}.log")
+
+
+class LogStore:
+    """
+    构建日志存储。
+    最近的 max_lines 行保存在环形缓冲区中；如果指定了日志文件，所有行会边接收边写入磁盘，
+    并按 INDEX_STEP 行建立稀疏的字节偏移索引，这样无论日志多大，常驻内存都保持不变。
+    """
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES):
+        self.max_lines = max_lines
+        self.lines = deque(maxlen=max_lines)
+        self.line_count = 0
+        self.log_path = None
+        self._file = None
+        self._file_pos = 0
+        self._offsets = [0]  # 第 k*INDEX_STEP 行在文件中的字节偏移
+
+    def open(self, log_path=None):
+        """清空存储并开始写入新的日志文件（log_path为None时只保留内存中的内容）"""
+        self.close()
+        self.lines.clear()
+        self.line_count = 0
+        self.log_path = log_path
+        self._file_pos = 0
+        self._offsets = [0]
+        if log_path:
+            try:
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                self._file = open(log_path, 'wb')
+            except OSError:
+                self.log_path = None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def first_buffered_line(self):
+        """内存缓冲区中第一行的行号"""
+        return self.line_count - len(self.lines)
+
+    @property
+    def first_available_line(self):
+        """能够读回的最早行号：有磁盘日志时为0，否则为缓冲区的第一行"""
+        return 0 if self.log_path else self.first_buffered_line
+
+    def append_text(self, text):
+        """追加一段输出，返回拆分出的日志行"""
+        lines = split_log_text(text)
+        self.append_lines(lines)
+        return lines
+
+    def append_lines(self, lines):
+        if not lines:
+            return
+        if self._file is not None:
+            encoded_lines = []
+            for line in lines:
+                if self.line_count and self.line_count % INDEX_STEP == 0:
+                    self._offsets.append(self._file_pos)
+                encoded = line.encode('utf-8', 'replace') + b'\n'
+                encoded_lines.append(encoded)
+                self._file_pos += len(encoded)
+                self.line_count += 1
+            self._file.write(b''.join(encoded_lines))
+            self._file.flush()
+        else:
+            self.line_count += len(lines)
+        self.lines.extend(lines)
+
+    def read_lines(self, start, end):
+        """读取 [start, end) 范围内的行，较早的部分从磁盘读回"""
+        start = max(start, self.first_available_line)
+        end = min(end, self.line_count)
+        if start >= end:
+            return []
+
+        first_buffered = self.first_buffered_line
+        result = []
+        if start < first_buffered:
+            result.extend(self._read_from_disk(start, min(end, first_buffered)))
+        if end > first_buffered:
+            buffer_start = max(start, first_buffered) - first_buffered
+            result.extend(islice(self.lines, buffer_start, end - first_buffered))
+        return result
+
+    def _read_from_disk(self, start, end):
+        block = start // INDEX_STEP
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offsets[block])
+                for _ in range(start - block * INDEX_STEP):
+                    f.readline()
+                return [f.readline().decode('utf-8', 'replace').rstrip('\n') for _ in range(end - start)]
+        except OSError:
+            return []
@@ -5,33 +5,101 @@
 # @Software : PyCharm Professional 2025.1.2
 # Introduction： 程序主入口，负责创建应用、连接UI和后台逻辑。
 
+import startup_profiler
 import sys
 import subprocess
 import os
-from PyQt6.QtWidgets import QApplication, QMessageBox, QLineEdit, QCheckBox, QRadioButton, QComboBox
-from PyQt6.QtCore import QThread
+from PyQt6.QtWidgets import QApplication, QMessageBox
+from PyQt6.QtCore import QEvent, QObject, QThread, QTimer
 
 from ui_components import PyInstallerGUI
-from builder import BuildWorker, get_conda_envs
+from builder import (BuildWorker, BuildQueue, CondaEnvLoader, EnvProbeWorker, ImportScanWorker, LaunchProfileWorker,
+                     BundleAnalyzeWorker, DaemonStartWorker, DataScanWorker, SharedCacheWorker, JOB_RUNNING)
+from build_cache import make_incremental_build
+from build_config import build_command, env_output_subdir
+from build_phases import save_summary
+from data_scanner import make_data_stage
+from spec_file import CONFLICT_KEEP, SPEC_CONFLICT, SpecFile, make_spec_file, spec_status
+from upx_cache import make_upx_pass
+from shared_cache import load_settings, make_shared_cache, save_settings
+from env_probe import EnvProbeError, get_cached_probe, probe_env
+from log_diagnostics import LogDiagnostics
+from log_store import build_log_path
+
+# 命令预览的防抖间隔（毫秒）
+PREVIEW_DEBOUNCE_MS = 150
+# 编辑附加数据过滤模式时重新统计文件数的防抖间隔（毫秒）
+DATA_SCAN_DEBOUNCE_MS = 400
+
+startup_profiler.mark("导入模块")
+
+
+class FirstPaintFilter(QObject):
+    """在窗口第一次绘制时调用回调，用于启动耗时分析"""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and self.callback is not None:
+            callback, self.callback = self.callback, None
+            callback()
+        return False
 
 
 class MainAppController:
     def __init__(self):
         self.app = QApplication(sys.argv)
+        startup_profiler.mark("创建QApplication")
+        # 主窗口在创建子控件之前就设置了亮色主题，避免再次应用样式表时重新计算所有控件的样式
         self.view = PyInstallerGUI()
-        # 默认启动时使用亮色主题
-        self.view.apply_theme(is_dark=False)
+        startup_profiler.mark("构建主窗口")
 
         self.conda_envs = {}
+        self.env_info = None  # 当前环境的探测结果
+        self.last_phase_summary = None  # 上次构建的各阶段耗时
+        self.log_diagnostics = None  # 从构建日志中提取诊断信息，每次构建重新创建
+        self.build_daemons = None  # 启用常驻构建进程时为 DaemonManager
         self.build_thread = None
         self.build_worker = None
+        self.launch_profile_worker = None
+        self._worker_threads = set()  # 后台任务线程，保持引用直到线程退出
+
+        # 构建队列，以及刷新运行中任务耗时的定时器
+        self.build_queue = BuildQueue()
+        self.view.parallel_spin.setValue(self.build_queue.max_workers)
+        self.queue_timer = QTimer()
+        self.queue_timer.setInterval(1000)
+        self.queue_timer.timeout.connect(self._refresh_running_jobs)
+
+        # 命令预览的防抖定时器
+        self.preview_timer = QTimer()
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.data_scan_timer = QTimer()
+        self.data_scan_timer.setSingleShot(True)
+        self.data_scan_timer.setInterval(DATA_SCAN_DEBOUNCE_MS)
+
+        shared_cache_settings = load_settings()
+        self.view.shared_cache_check.setChecked(shared_cache_settings["enabled"])
+        self.view.shared_cache_limit_spin.setValue(shared_cache_settings["limit_mb"])
 
         self._connect_signals()
-        self._load_initial_data()
+        startup_profiler.mark("初始化控制器")
+
+        self._first_painted = False
+        self._envs_loaded = False
+        if startup_profiler.enabled:
+            self.paint_filter = FirstPaintFilter(self._on_first_paint)
+            self.view.installEventFilter(self.paint_filter)
 
     def run(self):
         """启动并显示GUI"""
         self.view.show()
+        startup_profiler.mark("显示窗口")
+        # 窗口显示之后再在后台加载初始数据，避免阻塞启动
+        QTimer.singleShot(0, self._load_initial_data)
         sys.exit(self.app.exec())
 
     def _connect_signals(self):
@@ -41,23 +109,34 @@ class MainAppController:
         self.view.build_button.clicked.connect(self.start_build)
         self.view.cancel_button.clicked.connect(self.cancel_build)
         self.view.dark_mode_check.toggled.connect(self.view.apply_theme)
+        self.view.daemon_check.toggled.connect(self.on_daemon_toggled)
+        self.app.aboutToQuit.connect(self._stop_build_daemons)
         self.view.open_output_dir_button.clicked.connect(self.open_output_directory)
+        self.view.export_phases_button.clicked.connect(self.export_phase_summary)
+        self.view.profile_launch_button.clicked.connect(self.profile_launch)
+        self.view.analyze_bundle_button.clicked.connect(self.analyze_bundle)
+        self.view.export_queue_phases_button.clicked.connect(self.export_queue_phase_summaries)
+        self.view.scan_imports_requested.connect(self.scan_hidden_imports)
+        self.view.shared_cache_check.toggled.connect(self.save_shared_cache_settings)
+        self.view.shared_cache_limit_spin.editingFinished.connect(self.save_shared_cache_settings)
+        self.view.clear_shared_cache_button.clicked.connect(self.clear_shared_cache)
 
-        # 连接所有输入控件，使其在内容变化时能实时更新命令预览
-        widgets_to_connect = self.view.findChildren(
-            (QLineEdit, QCheckBox, QRadioButton, QComboBox)
-        )
-        for widget in widgets_to_connect:
-            if isinstance(widget, QLineEdit):
-                widget.textChanged.connect(self._safe_update_command_preview)
-            elif isinstance(widget, (QCheckBox, QRadioButton)):
-                widget.toggled.connect(self._safe_update_command_preview)
-            elif isinstance(widget, QComboBox):
-                widget.currentIndexChanged.connect(self._safe_update_command_preview)
-
-        # 连接表格数据变化的信号 - 使用安全的更新方法
-        self.view.data_table.model().rowsInserted.connect(self._safe_update_command_preview)
-        self.view.data_table.model().rowsRemoved.connect(self._safe_update_command_preview)
+        # 构建队列相关的信号
+        self.view.enqueue_button.clicked.connect(self.enqueue_build)
+        self.view.matrix_button.clicked.connect(self.build_env_matrix)
+        self.view.remove_job_button.clicked.connect(self.remove_queued_job)
+        self.view.start_queue_button.clicked.connect(self.start_queue)
+        self.view.cancel_queue_button.clicked.connect(self.cancel_queue)
+        self.view.queue_table.itemSelectionChanged.connect(self.on_queue_selection_changed)
+        self.build_queue.job_status_changed.connect(self.on_queue_job_status_changed)
+        self.build_queue.job_output.connect(self.on_queue_job_output)
+        self.build_queue.queue_finished.connect(self.on_queue_finished)
+
+        # 配置变化时不立即刷新命令预览，而是用短暂的防抖定时器合并连续的修改（例如连续输入）
+        self.view.config_changed.connect(self.preview_timer.start)
+        self.preview_timer.timeout.connect(self._safe_update_command_preview)
+        self.view.data_files_changed.connect(self.data_scan_timer.start)
+        self.data_scan_timer.timeout.connect(self.scan_data_files)
 
     def _safe_update_command_preview(self):
         """安全地更新命令预览，捕获可能的异常"""
@@ -67,80 +146,496 @@ class MainAppController:
             # 静默处理异常，避免程序崩溃
             print(f"更新命令预览时出错: {e}")
 
+    def _start_worker_thread(self, worker):
+        """在新线程中运行一个带有 run 方法和 finished 信号的后台任务"""
+        thread = QThread()
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(lambda: self._worker_threads.discard((thread, worker)))
+        thread.finished.connect(thread.deleteLater)
+        self._worker_threads.add((thread, worker))
+        thread.start()
+
     def _load_initial_data(self):
-        """加载初始数据，例如获取Conda环境列表"""
-        self.conda_envs = get_conda_envs()
+        """加载初始数据：在后台线程中发现Conda环境，结果陆续填入下拉框"""
+        env_loader = CondaEnvLoader()
+        env_loader.envs_found.connect(self.on_envs_found)
+        env_loader.finished.connect(self.on_env_loading_finished)
+        self._start_worker_thread(env_loader)
+        self.refresh_shared_cache_stats()
+
+    def on_envs_found(self, envs):
+        """收到（部分或更新后的）环境列表时刷新下拉框"""
+        self.conda_envs = envs
+        self.view.populate_conda_envs(envs)
+
+    def _on_first_paint(self):
+        startup_profiler.mark("首次绘制")
+        self._first_painted = True
+        if self._envs_loaded:
+            startup_profiler.report()
+
+    def on_env_loading_finished(self):
+        startup_profiler.mark("环境列表就绪")
+        self._envs_loaded = True
+        if self._first_painted or not startup_profiler.enabled:
+            startup_profiler.report()
         if not self.conda_envs:
             self.view.show_message("警告", "未能找到任何Conda环境。", "warning")
-        else:
-            self.view.populate_conda_envs(self.conda_envs)
+
+    def _current_env_path(self):
+        return self.conda_envs.get(self.view.conda_env_combo.currentText())
 
     def on_env_changed(self, index):
-        """当Conda环境下拉框选项改变时被调用"""
+        """当Conda环境下拉框选项改变时被调用，优先使用缓存的探测结果，否则在后台探测"""
+        self.env_info = None
         env_name = self.view.conda_env_combo.itemText(index)
-        if env_name in self.conda_envs:
-            self.view.update_paths_from_env(self.conda_envs[env_name])
-        else:  # 处理空选项
-            self.view.python_executable = None
-            self.view.paths_edit.clear()
+        env_path = self.conda_envs.get(env_name)
+        if not env_path:  # 处理空选项
+            self.view.clear_env_info()
+            return
+
+        info = get_cached_probe(env_path)
+        if info is not None:
+            self.on_env_probed(env_path, info)
+            return
+        self.view.set_env_probing(env_path)
+        self._probe_env_in_background(env_path, use_cache=False)
+
+    def _probe_env_in_background(self, env_path, use_cache=True):
+        probe_worker = EnvProbeWorker(env_path, use_cache)
+        probe_worker.probed.connect(self.on_env_probed)
+        probe_worker.failed.connect(self.on_env_probe_failed)
+        self._start_worker_thread(probe_worker)
+
+    def on_env_probed(self, env_path, info):
+        """环境探测完成；如果用户已切换到其他环境则忽略结果"""
+        if env_path != self._current_env_path():
+            return
+        self.env_info = info
+        self.view.apply_env_info(info)
+        self._warm_build_daemon()
+
+    def on_env_probe_failed(self, env_path, error):
+        if env_path != self._current_env_path():
+            return
+        self.view.clear_env_info()
+        self.view.log_to_console(f"探测环境失败: {error}", color='red')
+
+    def scan_hidden_imports(self):
+        """在后台扫描项目源码中的动态导入"""
+        script = self.view.script_path_edit.text()
+        if not script or not os.path.isfile(script):
+            self.view.show_message("配置错误", "请先选择主Python脚本。", "error")
+            return
+        self.view.set_import_scan_running(True)
+        scan_worker = ImportScanWorker(script)
+        scan_worker.scanned.connect(self.on_imports_scanned)
+        scan_worker.failed.connect(lambda error: self.view.show_message("错误", f"分析失败:\n{error}", "error"))
+        scan_worker.finished.connect(lambda: self.view.set_import_scan_running(False))
+        self._start_worker_thread(scan_worker)
+
+    def scan_data_files(self):
+        """在后台统计附加数据过滤后的文件数和总大小，显示在附加数据表格中"""
+        data_files = self.view.config.data_files
+        if data_files:
+            scan_worker = DataScanWorker(data_files)
+            scan_worker.scanned.connect(self.view.show_data_stats)
+            self._start_worker_thread(scan_worker)
+
+    def on_imports_scanned(self, result):
+        """显示动态导入分析结果，把用户勾选的模块加入隐藏导入"""
+        self.view.log_to_console(
+            f"导入分析完成: 共 {result.file_count} 个文件，解析 {result.parsed_count} 个，"
+            f"复用缓存 {result.cached_count} 个。"
+        )
+        existing = set(self.view.get_hidden_imports())
+        suggestions = []
+        for module, locations in result.suggestions.items():
+            if module in existing:
+                continue
+            path, lineno = locations[0]
+            more = f" 等 {len(locations)} 处" if len(locations) > 1 else ""
+            suggestions.append((module, f"{module}    ({os.path.basename(path)}:{lineno}{more})"))
+        if not suggestions:
+            self.view.show_message("导入分析", "没有发现需要添加的隐藏导入。", "info")
+            return
+        selected = self.view.ask_suggestions(
+            "建议的隐藏导入",
+            "以下模块通过 importlib.import_module、__import__ 或插件入口点字符串动态导入，"
+            "PyInstaller 无法自动发现。勾选需要添加为 --hidden-import 的模块:",
+            suggestions
+        )
+        if selected:
+            self.view.add_hidden_imports(selected)
 
     def start_build(self):
         """开始构建过程"""
         command, error = self.view.get_pyinstaller_command()
+        if not error:
+            limits, error = self.view.get_resource_limits()
         if error:
             self.view.show_message("配置错误", error, "error")
             return
 
         python_exe = self.view.python_executable
-        try:
-            # 检查目标环境中是否已安装PyInstaller
-            subprocess.check_output([python_exe, "-m", "pip", "show", "pyinstaller"], stderr=subprocess.STDOUT,
-                                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            reply = self.view.show_message(
-                "未找到PyInstaller",
-                f"在所选环境中未找到PyInstaller。\n\n是否立即安装?",
-                level="question"
-            )
-            if reply == QMessageBox.StandardButton.Yes:
-                self.install_pyinstaller(python_exe)
+        if not self._ensure_pyinstaller():
+            return
+
+        spec_file, confirmed = self._make_spec_file()
+        if not confirmed:
             return
 
-        self.view.output_console.clear()
+        self.view.output_console.start_log(self._log_path_for_current_script())
+        self.view.clear_diagnostics()
+        self.log_diagnostics = LogDiagnostics(os.path.dirname(self.view.config.script))
+        upx_pass = make_upx_pass(self.view.config)
+        self._run_build_worker(command, python_exe, self.on_build_finished, self._make_incremental_build(),
+                               self.build_daemons, limits, make_data_stage(self.view.config), spec_file,
+                               upx_pass, self._make_shared_cache(upx_pass))
+
+    def _make_spec_file(self):
+        """
+        spec 模式下为当前配置创建 SpecFile，返回 (SpecFile或None, 是否继续构建)。
+        打包选项已变化而 spec 已被手动修改时，询问保留还是重新生成。
+        """
+        config = self.view.config
+        if not config.spec_mode:
+            return None, True
+        on_conflict = CONFLICT_KEEP
+        if spec_status(config)[0] == SPEC_CONFLICT:
+            on_conflict = self.view.ask_spec_conflict(config.spec_path)
+            if on_conflict is None:
+                return None, False
+        return SpecFile(config, on_conflict), True
+
+    def _make_shared_cache(self, upx_pass):
+        return make_shared_cache(self.view.shared_cache_check.isChecked(), upx_pass)
+
+    def _make_incremental_build(self):
+        """根据当前配置创建增量构建上下文；未启用增量构建或勾选了 --clean 时返回None"""
+        if not self.view.incremental_check.isChecked() or self.view.clean_check.isChecked():
+            return None
+        site_packages = self.env_info.get("site_packages", []) if self.env_info else []
+        return make_incremental_build(self.view.config, self._current_env_path(), site_packages)
+
+    def _run_build_worker(self, command, python_exe, on_finished, incremental=None, daemons=None, limits=None,
+                          data_stage=None, spec_file=None, upx_pass=None, shared_cache=None):
+        """在后台线程中运行命令，输出实时显示在日志窗口中（构建和安装共用）"""
         self.view.set_build_state(is_building=True)
 
         # 设置工作线程
         self.build_thread = QThread()
-        self.build_worker = BuildWorker(command, python_exe)
+        self.build_worker = BuildWorker(command, python_exe, incremental, daemons, limits, data_stage, spec_file,
+                                        upx_pass, shared_cache)
         self.build_worker.moveToThread(self.build_thread)
 
         # 连接工作线程的信号
-        self.build_worker.progress_updated.connect(self.view.log_to_console)
-        self.build_worker.finished.connect(self.on_build_finished)
+        self.build_worker.progress_updated.connect(self.on_build_output)
+        self.build_worker.finished.connect(on_finished)
         self.build_thread.started.connect(self.build_worker.run)
         self.build_thread.finished.connect(self.build_thread.deleteLater)
         self.build_worker.finished.connect(self.build_thread.quit)
 
         self.build_thread.start()
 
+    def on_build_output(self, text):
+        """构建输出写入日志窗口，同时提取其中的警告、缺失模块等诊断信息"""
+        lines = self.view.log_to_console(text)
+        if self.log_diagnostics is not None and lines:
+            first_line = self.view.output_console.store.line_count - len(lines)
+            self.view.add_diagnostics(self.log_diagnostics.feed(lines, first_line))
+
+    def on_daemon_toggled(self, enabled):
+        """启用时为当前环境预先启动常驻构建进程；关闭时结束所有常驻进程"""
+        if enabled:
+            from build_daemon import DaemonManager
+            self.build_daemons = DaemonManager()
+            self._warm_build_daemon()
+        else:
+            self._stop_build_daemons()
+            self.build_daemons = None
+        self.build_queue.daemons = self.build_daemons
+
+    def _warm_build_daemon(self):
+        """当前环境已安装PyInstaller时，在后台启动它的常驻构建进程"""
+        if self.build_daemons is None or not self.env_info or not self.env_info.get("pyinstaller_version"):
+            return
+        daemon_worker = DaemonStartWorker(self.build_daemons, self.env_info["executable"])
+        daemon_worker.failed.connect(
+            lambda error: self.view.log_to_console(f"常驻构建进程启动失败: {error}", color='orange'))
+        self._start_worker_thread(daemon_worker)
+
+    def _stop_build_daemons(self):
+        if self.build_daemons is not None:
+            self.build_daemons.stop_all()
+
+    def save_shared_cache_settings(self):
+        save_settings(self.view.shared_cache_check.isChecked(), self.view.shared_cache_limit_spin.value())
+
+    def refresh_shared_cache_stats(self, clear=False):
+        """在后台统计共享缓存（clear为True时先清空），结果显示在常规选项中"""
+        worker = SharedCacheWorker(clear)
+        worker.updated.connect(self.view.show_shared_cache_stats)
+        self._start_worker_thread(worker)
+
+    def clear_shared_cache(self):
+        if not self.view.build_button.isEnabled() or self.build_queue.is_running:
+            self.view.show_message("提示", "请在构建完成后再清空共享缓存。", "warning")
+            return
+        reply = self.view.show_message("清空共享缓存", "确定删除所有项目共用的构建缓存吗？", level="question")
+        if reply == QMessageBox.StandardButton.Yes:
+            self.refresh_shared_cache_stats(clear=True)
+
+    def _ensure_pyinstaller(self):
+        """
+        根据环境探测结果检查是否已安装PyInstaller，未安装时询问是否安装。
+        探测结果已缓存时不会启动任何子进程。
+        """
+        if self.env_info is None:
+            # 后台探测尚未完成，同步探测一次（结果会被缓存）
+            env_path = self._current_env_path()
+            try:
+                self.env_info = probe_env(env_path)
+            except EnvProbeError as e:
+                self.view.show_message("错误", f"探测环境失败:\n{e}", "error")
+                return False
+            self.view.apply_env_info(self.env_info)
+
+        if self.env_info.get("pyinstaller_version"):
+            return True
+        reply = self.view.show_message(
+            "未找到PyInstaller",
+            f"在所选环境中未找到PyInstaller。\n\n是否立即安装?",
+            level="question"
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.install_pyinstaller(self.view.python_executable)
+        return False
+
+    def _log_path_for_current_script(self):
+        """当前脚本对应的日志文件路径（位于 output/logs 下）"""
+        script = self.view.script_path_edit.text()
+        return build_log_path(os.path.join(os.path.dirname(script), "output"), self.view.get_app_name())
+
+    def enqueue_build(self):
+        """将当前配置作为一个任务加入构建队列"""
+        command, error = self.view.get_pyinstaller_command()
+        if not error:
+            limits, error = self.view.get_resource_limits()
+        if error:
+            self.view.show_message("配置错误", error, "error")
+            return
+
+        python_exe = self.view.python_executable
+        if not self._ensure_pyinstaller():
+            return
+        spec_file, confirmed = self._make_spec_file()
+        if not confirmed:
+            return
+
+        upx_pass = make_upx_pass(self.view.config)
+        job = self.build_queue.add_job(self.view.get_app_name(), self.view.conda_env_combo.currentText(),
+                                       command, python_exe, self._log_path_for_current_script(),
+                                       self._make_incremental_build(), self.view.get_artifact_path(),
+                                       self.env_info.get("python_version", ""), limits,
+                                       make_data_stage(self.view.config), spec_file,
+                                       upx_pass, self._make_shared_cache(upx_pass), self.view.config.copy())
+        self.view.add_queue_row(job)
+        self.view.output_tabs.setCurrentIndex(1)
+
+    def build_env_matrix(self):
+        """选择多个Conda环境，用当前配置在每个环境中并行构建，各自输出到 output/<环境名>/"""
+        if not self.view.config.script or not os.path.isfile(self.view.config.script):
+            self.view.show_message("配置错误", "请先选择主Python脚本。", "error")
+            return
+        if not self.conda_envs:
+            self.view.show_message("警告", "未能找到任何Conda环境。", "warning")
+            return
+        limits, error = self.view.get_resource_limits()
+        if error:
+            self.view.show_message("配置错误", error, "error")
+            return
+        current = self.view.conda_env_combo.currentText()
+        env_names = self.view.ask_suggestions(
+            "多环境构建",
+            "选择要构建的Conda环境。每个环境使用当前配置并行构建，输出到 output/<环境名>/ 目录，"
+            "完成后在构建队列中对比各环境的耗时、产物大小和退出代码:",
+            [(name, f"{name}    ({path})", name == current) for name, path in self.conda_envs.items()]
+        )
+        if not env_names:
+            return
+
+        # 先在后台探测所有选中的环境（有缓存时很快），全部完成后再加入队列
+        self.view.matrix_button.setEnabled(False)
+        results = {}
+
+        def on_result(env_name, result):
+            results[env_name] = result
+            if len(results) == len(env_names):
+                self._enqueue_env_matrix([(name, self.conda_envs[name], results[name]) for name in env_names],
+                                         limits)
+
+        for env_name in env_names:
+            probe_worker = EnvProbeWorker(self.conda_envs[env_name])
+            probe_worker.probed.connect(lambda _, info, env_name=env_name: on_result(env_name, info))
+            probe_worker.failed.connect(lambda _, error, env_name=env_name: on_result(env_name, error))
+            self._start_worker_thread(probe_worker)
+
+    def _enqueue_env_matrix(self, envs, limits=None):
+        """envs 为 [(环境名, 环境路径, 探测结果或错误信息)]，为每个可用的环境加入一个构建任务并开始队列"""
+        self.view.matrix_button.setEnabled(True)
+        base_config = self.view.config
+        # 模块路径是从当前环境自动检测的，换成各环境自己的 site-packages；用户手动填写的则保留
+        detected_paths = os.pathsep.join(self.env_info["site_packages"]) if self.env_info else ""
+        keep_paths = bool(base_config.paths) and base_config.paths != detected_paths
+        incremental = self.view.incremental_check.isChecked() and not self.view.clean_check.isChecked()
+
+        added = 0
+        for env_name, env_path, info in envs:
+            if isinstance(info, str):
+                self.view.log_to_console(f"跳过环境 {env_name}: 探测失败: {info}", color='red')
+                continue
+            if not info.get("pyinstaller_version"):
+                self.view.log_to_console(f"跳过环境 {env_name}: 未安装PyInstaller", color='orange')
+                continue
+            config = base_config.copy(
+                python_executable=info["executable"],
+                paths=base_config.paths if keep_paths else os.pathsep.join(info["site_packages"]),
+                output_subdir=env_output_subdir(env_name),
+            )
+            command, error = build_command(config)
+            if error:
+                self.view.log_to_console(f"跳过环境 {env_name}: {error}", color='red')
+                continue
+            upx_pass = make_upx_pass(config)
+            job = self.build_queue.add_job(
+                config.app_name, env_name, command, config.python_executable,
+                build_log_path(config.output_dir, config.app_name),
+                make_incremental_build(config, env_path, info["site_packages"]) if incremental else None,
+                config.artifact_path, info.get("python_version", ""), limits, make_data_stage(config),
+                # 手动修改过的 spec 在矩阵构建中保留，不逐个环境询问
+                make_spec_file(config), upx_pass, self._make_shared_cache(upx_pass), config
+            )
+            self.view.add_queue_row(job)
+            added += 1
+
+        if added:
+            self.view.output_tabs.setCurrentIndex(1)
+            self.start_queue()
+
+    def remove_queued_job(self):
+        """从队列中移除选中的任务（运行中的任务除外）"""
+        job_id = self.view.selected_queue_job_id()
+        if job_id is None:
+            return
+        if self.build_queue.remove_job(job_id):
+            self.view.remove_queue_row(job_id)
+        else:
+            self.view.show_message("提示", "无法移除正在运行的任务。", "warning")
+
+    def start_queue(self):
+        """按设定的并行数开始调度队列中的任务"""
+        if self.build_queue.is_running:
+            return
+        agents_text = self.view.agents_edit.text().strip()
+        if agents_text:
+            from build_agent import AgentPool, parse_agents
+            try:
+                self.build_queue.agents = AgentPool(parse_agents(agents_text), self.view.agent_token_edit.text())
+            except ValueError as e:
+                self.view.show_message("配置错误", str(e), "error")
+                return
+        else:
+            self.build_queue.agents = None
+        self.build_queue.max_workers = self.view.parallel_spin.value()
+        self.view.queue_summary_label.clear()
+        self.view.set_queue_state(is_running=True)
+        self.queue_timer.start()
+        self.build_queue.start()
+        if not self.build_queue.is_running:
+            # 没有等待中的任务
+            self.queue_timer.stop()
+            self.view.set_queue_state(is_running=False)
+
+    def cancel_queue(self):
+        """取消队列中所有等待中和运行中的任务"""
+        self.build_queue.cancel_all()
+
+    def _refresh_running_jobs(self):
+        for job in self.build_queue.jobs.values():
+            if job.status == JOB_RUNNING:
+                self.view.update_queue_row(job)
+
+    def export_queue_phase_summaries(self):
+        """把队列中已完成任务的结果（耗时、产物大小、退出代码）和各阶段耗时一起导出"""
+        jobs = [
+            {"name": job.name, "env": job.env_name, "python_version": job.python_version, "status": job.status,
+             "return_code": job.return_code, "duration": round(job.duration, 3),
+             "artifact_size_mb": job.artifact_size, "phases": job.phase_summary}
+            for job in self.build_queue.jobs.values() if job.phase_summary is not None
+        ]
+        if not jobs:
+            self.view.show_message("提示", "队列中还没有可导出耗时的已完成任务。", "info")
+            return
+        self._save_phase_summary({"jobs": jobs}, "queue_phases.json")
+
+    def on_queue_selection_changed(self):
+        job = self.build_queue.jobs.get(self.view.selected_queue_job_id())
+        self.view.show_job_log(job.log_store if job else None)
+
+    def on_queue_job_status_changed(self, job_id):
+        job = self.build_queue.jobs.get(job_id)
+        if job:
+            self.view.update_queue_row(job)
+
+    def on_queue_job_output(self, job_id, text):
+        if self.view.selected_queue_job_id() == job_id:
+            self.view.queue_log_view.refresh_tail()
+
+    def on_queue_finished(self, wall_time, serial_time):
+        """队列全部完成时，报告总耗时与串行耗时的对比"""
+        self.queue_timer.stop()
+        self._refresh_running_jobs()
+        speedup = serial_time / wall_time if wall_time > 0 else 1.0
+        self.view.queue_summary_label.setText(
+            f"总耗时 {wall_time:.1f} 秒，串行累计 {serial_time:.1f} 秒，加速比 {speedup:.2f}x"
+        )
+        self.view.set_queue_state(is_running=False)
+        self.refresh_shared_cache_stats()
+
     def install_pyinstaller(self, python_exe):
-        """在选定的环境中安装PyInstaller"""
+        """在后台线程中把PyInstaller安装到选定的环境，pip的输出实时显示；可使用本地wheelhouse离线安装"""
+        command = [f'"{python_exe}"', "-m", "pip", "install", "pyinstaller"]
+        wheelhouse = self.view.wheelhouse_edit.text().strip()
+        if wheelhouse:
+            if not os.path.isdir(wheelhouse):
+                self.view.show_message("配置错误", f"离线安装源目录不存在:\n{wheelhouse}", "error")
+                return
+            command.extend(["--no-index", "--find-links", f'"{wheelhouse}"'])
+
         self.view.log_to_console(f"正在尝试安装PyInstaller...")
-        self.view.set_build_state(is_building=True)
-        self.app.processEvents()  # 强制UI刷新
+        self._run_build_worker(" ".join(command), python_exe, self.on_install_finished)
 
-        try:
-            result = subprocess.check_output(
-                [python_exe, "-m", "pip", "install", "pyinstaller"],
-                stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace'
-            )
-            self.view.log_to_console(result)
-            self.view.log_to_console("\nPyInstaller 安装成功! 现在可以开始构建了。")
-        except subprocess.CalledProcessError as e:
-            self.view.log_to_console("--- 安装失败 ---\n" + e.output, color='red')
+    def on_install_finished(self, return_code):
+        """PyInstaller安装结束时被调用"""
+        if self.build_worker.is_cancelled:
+            self.view.log_to_console("\n--- 已取消安装 ---", color='orange')
+        elif return_code == 0:
+            self.view.log_to_console("\nPyInstaller 安装成功! 现在可以开始构建了。", color="green")
+            self._refresh_env_info()
+        else:
+            self.view.log_to_console(f"\n--- 安装失败，退出代码: {return_code}. ---", color='red')
             self.view.show_message("错误", "PyInstaller安装失败。", "error")
-        finally:
-            self.view.set_build_state(is_building=False)
+        self.view.set_build_state(is_building=False)
+
+    def _refresh_env_info(self):
+        """环境中的包发生变化后重新探测当前环境"""
+        env_path = self._current_env_path()
+        if env_path:
+            self.env_info = None
+            self._probe_env_in_background(env_path, use_cache=False)
 
     def cancel_build(self):
         """取消正在进行的构建"""
@@ -150,17 +645,135 @@ class MainAppController:
 
     def on_build_finished(self, return_code):
         """当构建完成时被调用"""
-        if return_code == 0 and not self.build_worker.is_cancelled:
+        if self.build_worker.skipped:
+            # 输入未变化，复用已有产物
+            self.view.log_to_console(f"\n--- 未检测到输入变化，已跳过构建: {self.view.get_artifact_path()} ---",
+                                     color="green")
+            self.view.open_output_dir_button.setEnabled(True)
+            self.view.profile_launch_button.setEnabled(True)
+            self.view.analyze_bundle_button.setEnabled(True)
+        elif return_code == 0 and not self.build_worker.is_cancelled:
             # 构建成功
             self.view.log_to_console("\n--- 构建成功! ---", color="green")
             # 激活"打开目录"按钮
             self.view.open_output_dir_button.setEnabled(True)
+            self.view.profile_launch_button.setEnabled(True)
+            self.view.analyze_bundle_button.setEnabled(True)
         elif not self.build_worker.is_cancelled:
             # 构建失败
             self.view.log_to_console(f"\n--- 构建失败，退出代码: {return_code}. ---", color="red")
             self.view.show_message("构建失败", "构建过程失败，请检查日志输出获取错误详情。", "error")
 
+        self.last_phase_summary = self.build_worker.phase_summary
+        self.view.export_phases_button.setEnabled(self.last_phase_summary is not None)
         self.view.set_build_state(is_building=False)
+        if self.view.config.spec_mode:
+            self.view.update_command_preview()  # 刷新 spec 状态
+        self.refresh_shared_cache_stats()
+
+    def export_phase_summary(self):
+        """把上次构建的各阶段耗时导出为JSON"""
+        if self.last_phase_summary is not None:
+            self._save_phase_summary(self.last_phase_summary, f"phases_{self.view.get_app_name()}.json")
+
+    def _save_phase_summary(self, summary, default_name):
+        default_dir = self.view.config.output_dir if self.view.config.script else ""
+        path = self.view.ask_save_path("导出阶段耗时", os.path.join(default_dir, default_name), "JSON (*.json)")
+        if not path:
+            return
+        try:
+            save_summary(summary, path)
+        except OSError as e:
+            self.view.show_message("错误", f"导出失败:\n{e}", "error")
+            return
+        self.view.log_to_console(f"阶段耗时已导出: {path}")
+
+    def profile_launch(self):
+        """多次运行生成的程序，测量冷启动和热启动的就绪耗时；分析期间再次点击则取消"""
+        if self.launch_profile_worker is not None:
+            self.launch_profile_worker.cancel()
+            self.view.profile_launch_button.setEnabled(False)
+            self.view.log_to_console("\n正在取消启动分析...", color='orange')
+            return
+        artifact_path = self.view.get_artifact_path()
+        if not artifact_path or not os.path.exists(artifact_path):
+            self.view.show_message("错误", "找不到生成的程序，请先完成构建。", "error")
+            return
+        config = self.view.config
+        if config.noconsole and not config.launch_hook:
+            # 没有钩子时以程序退出作为就绪，窗口程序通常不会自行退出，每次启动都要等到超时
+            reply = self.view.show_message(
+                "启动分析",
+                "当前程序为窗口程序且没有加入启动分析钩子，程序不会自行退出，每次启动都会等待到超时。\n\n"
+                "建议勾选“加入启动分析钩子”并重新构建。是否仍要继续?",
+                level="question"
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        options = self.view.ask_launch_profile_options()
+        if options is None:
+            return
+        runs, collect_imports = options
+        self.view.log_to_console(f"\n--- 开始启动分析: {artifact_path} ---")
+        worker = LaunchProfileWorker(artifact_path, runs, collect_imports)
+        worker.progress.connect(self.view.log_to_console)
+        worker.profiled.connect(self.on_launch_profiled)
+        worker.failed.connect(lambda error: self.view.log_to_console(f"启动分析失败: {error}", color='red'))
+        worker.finished.connect(self.on_launch_profile_finished)
+        self.launch_profile_worker = worker
+        self.view.set_launch_profile_state(True)
+        self._start_worker_thread(worker)
+
+    def on_launch_profile_finished(self):
+        if self.launch_profile_worker.is_cancelled:
+            self.view.log_to_console("启动分析已取消", color='orange')
+        self.launch_profile_worker = None
+        self.view.set_launch_profile_state(False)
+
+    def on_launch_profiled(self, report):
+        from launch_profiler import format_report, save_report
+        self.view.log_to_console(format_report(report))
+        path = os.path.join(self.view.config.output_dir, f"launch_profile_{self.view.get_app_name()}.json")
+        try:
+            save_report(report, path)
+            self.view.log_to_console(f"启动分析结果已保存: {path}")
+        except OSError as e:
+            self.view.log_to_console(f"无法保存启动分析结果: {e}", color='red')
+
+    def analyze_bundle(self):
+        """分析上次构建打包进来的内容，按体积排序并给出排除模块建议"""
+        config = self.view.config
+        build_dir = os.path.join(config.build_path, config.app_name)
+        if not os.path.isdir(build_dir):
+            self.view.show_message("错误", "找不到构建目录，请先完成构建。", "error")
+            return
+        self.view.analyze_bundle_button.setEnabled(False)
+        worker = BundleAnalyzeWorker(build_dir, config.script, tuple(config.exclude_modules))
+        worker.analyzed.connect(self.on_bundle_analyzed)
+        worker.failed.connect(lambda error: self.view.log_to_console(f"产物分析失败: {error}", color='red'))
+        worker.finished.connect(lambda: self.view.analyze_bundle_button.setEnabled(True))
+        self._start_worker_thread(worker)
+
+    def on_bundle_analyzed(self, report):
+        """显示产物分析结果，把用户勾选的模块加入排除模块"""
+        from bundle_analyzer import format_chain, format_report, format_size
+        self.view.log_to_console(format_report(report))
+        if not report.suggestions:
+            self.view.log_to_console("没有发现可以排除的模块。")
+            return
+        suggestions = [
+            (module, f"{module}  {format_size(size)}  {reason}\n    {format_chain(chain)}", checked)
+            for module, reason, size, chain, checked in report.suggestions
+        ]
+        selected = self.view.ask_suggestions(
+            "建议排除的模块",
+            "以下模块被打包进来，但项目代码没有直接导入它们（下方为把它们带进来的导入链）。"
+            "勾选需要添加为 --exclude-module 的模块，修改后需要重新构建:",
+            suggestions
+        )
+        if selected:
+            self.view.add_exclude_modules(selected)
+            self.view.log_to_console(f"已添加排除模块: {', '.join(selected)}")
 
     def open_output_directory(self):
         """打开包含最终可执行文件的输出目录"""
@@ -176,5 +789,8 @@ class MainAppController:
 
 
 if __name__ == "__main__":
+    # 导入分析使用了进程池，打包后的程序需要此调用才能正确启动子进程
+    import multiprocessing
+    multiprocessing.freeze_support()
     controller = MainAppController()
     controller.run()
\ No newline at end of file
@@ -0,0 +1,216 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : resource_limits.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 构建的资源限制：降低CPU/IO优先级、绑定CPU核心、内存上限，以及全局的同时构建数量上限。
+#                限制在子进程启动后按进程ID设置（之后启动的子进程会继承），不使用 preexec_fn，
+#                因为GUI进程中有多个线程。安装了 psutil 时支持更多平台，并按整个进程树的内存占用监控上限。
+
+import os
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 检查进程树内存占用的间隔（秒）
+MEMORY_CHECK_INTERVAL = 1.0
+
+
+def _import_psutil():
+    """psutil 是可选依赖，首次需要时才导入（避免拖慢程序启动）"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil
+
+
+def parse_cpu_list(text):
+    """解析CPU列表，例如 "0-3,6" -> (0, 1, 2, 3, 6)；空字符串表示不限制"""
+    cpu_count = os.cpu_count() or 1
+    cpus = set()
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start, end = int(start), int(end or start)
+        if not 0 <= start <= end < cpu_count:
+            raise ValueError(f"无效的CPU范围 {part}（可用的CPU编号为 0-{cpu_count - 1}）")
+        cpus.update(range(start, end + 1))
+    return tuple(sorted(cpus))
+
+
+def format_cpu_list(cpus):
+    return ",".join(str(cpu) for cpu in cpus)
+
+
+class ResourceLimits:
+    """单次构建的资源限制，默认值表示不限制"""
+
+    def __init__(self, nice=0, io_idle=False, cpu_affinity=(), memory_mb=0):
+        self.nice = nice  # 0-19，越大优先级越低
+        self.io_idle = io_idle  # 只在磁盘空闲时进行IO
+        self.cpu_affinity = tuple(cpu_affinity)  # 允许使用的CPU编号
+        self.memory_mb = memory_mb  # 整个进程树的内存上限（MB），0表示不限制
+
+    @property
+    def is_default(self):
+        return not (self.nice or self.io_idle or self.cpu_affinity or self.memory_mb)
+
+    def copy(self):
+        return ResourceLimits(self.nice, self.io_idle, self.cpu_affinity, self.memory_mb)
+
+    def describe(self):
+        parts = []
+        if self.nice:
+            parts.append(f"nice {self.nice}")
+        if self.io_idle:
+            parts.append("IO空闲优先级")
+        if self.cpu_affinity:
+            parts.append(f"CPU {format_cpu_list(self.cpu_affinity)}")
+        if self.memory_mb:
+            parts.append(f"内存上限 {self.memory_mb} MB")
+        return "，".join(parts)
+
+
+def _set_priority(pid, nice):
+    psutil = _import_psutil()
+    if psutil is not None:
+        process = psutil.Process(pid)
+        if sys.platform == 'win32':
+            process.nice(psutil.IDLE_PRIORITY_CLASS if nice >= 10 else psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            process.nice(nice)
+    elif hasattr(os, "setpriority"):
+        os.setpriority(os.PRIO_PROCESS, pid, nice)
+    else:
+        return "调整优先级需要安装 psutil"
+    return None
+
+
+def _set_io_idle(pid):
+    psutil = _import_psutil()
+    if psutil is None or not hasattr(psutil.Process, "ionice"):
+        return "调整IO优先级需要安装 psutil（不支持macOS）"
+    process = psutil.Process(pid)
+    if sys.platform == 'win32':
+        process.ionice(0)  # 极低
+    else:
+        process.ionice(psutil.IOPRIO_CLASS_IDLE)
+    return None
+
+
+def _set_affinity(pid, cpus):
+    psutil = _import_psutil()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(pid, cpus)
+    elif psutil is not None and hasattr(psutil.Process, "cpu_affinity"):
+        psutil.Process(pid).cpu_affinity(list(cpus))
+    else:
+        return "当前系统不支持设置CPU亲和性"
+    return None
+
+
+def _set_memory_rlimit(pid, memory_mb):
+    """没有 psutil 时的后备方案：限制单个进程的地址空间（子进程继承同样的上限）"""
+    if resource is None or not hasattr(resource, "prlimit"):
+        return "内存上限需要安装 psutil"
+    limit = memory_mb * 2 ** 20
+    resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+    return "未安装 psutil，内存上限按单个进程的地址空间限制（RLIMIT_AS）"
+
+
+def apply_limits(pid, limits):
+    """对刚启动的构建进程应用资源限制，返回无法应用或降级处理的说明列表"""
+    notes = []
+    actions = []
+    if limits.nice:
+        actions.append(lambda: _set_priority(pid, limits.nice))
+    if limits.io_idle:
+        actions.append(lambda: _set_io_idle(pid))
+    if limits.cpu_affinity:
+        actions.append(lambda: _set_affinity(pid, limits.cpu_affinity))
+    if limits.memory_mb and not can_watch_memory():
+        actions.append(lambda: _set_memory_rlimit(pid, limits.memory_mb))
+    for action in actions:
+        try:
+            note = action()
+        except Exception as e:  # OSError、ValueError 或 psutil.Error
+            note = f"无法应用资源限制: {e}"
+        if note:
+            notes.append(note)
+    return notes
+
+
+def can_watch_memory():
+    return _import_psutil() is not None
+
+
+def tree_rss(pid):
+    """进程及其所有子进程的常驻内存之和（字节），进程已退出时返回0"""
+    psutil = _import_psutil()
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+class BuildSlots:
+    """
+    全局的同时构建数量上限，单次构建、构建队列和多环境构建共用。
+    容量为0表示不限制；等待期间可以取消。
+    """
+
+    def __init__(self, capacity=0):
+        self._capacity = capacity
+        self._active = 0
+        self._condition = threading.Condition()
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def active(self):
+        """正在进行的构建数"""
+        return self._active
+
+    def set_capacity(self, capacity):
+        with self._condition:
+            self._capacity = capacity
+            self._condition.notify_all()
+
+    def acquire(self, is_cancelled, on_wait=None):
+        """获取一个构建槽位；需要等待时先调用一次 on_wait。取消时返回False"""
+        with self._condition:
+            waited = False
+            while self._capacity and self._active >= self._capacity:
+                if is_cancelled():
+                    return False
+                if not waited and on_wait is not None:
+                    on_wait()
+                    waited = True
+                self._condition.wait(0.1)
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+
+# 进程内共享的构建槽位
+build_slots = BuildSlots()
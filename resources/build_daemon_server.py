@@ -0,0 +1,152 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : build_daemon_server.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 常驻构建进程（在目标环境的解释器中运行，只使用标准库）。启动时预先导入PyInstaller，
+#                然后在本机端口上等待构建请求；每个请求fork出一个子进程执行构建，输出直接写回连接。
+#                协议：客户端发送一行JSON {"token", "args", "cwd", "env"}；服务端先发送 "\0PID <pid>"，
+#                随后是构建输出，最后是 "\0EXIT <退出代码>"（可能紧跟在没有换行的最后一行输出之后）。
+#                标准输入关闭（EasyPack退出）或空闲超时后退出。
+
+import hmac
+import json
+import os
+import select
+import socket
+import sys
+import time
+import traceback
+
+# 空闲多久（秒）没有请求后自动退出
+IDLE_TIMEOUT = 15 * 60
+# 读取请求行的超时时间（秒）
+REQUEST_TIMEOUT = 5.0
+# 预先导入的模块：PyInstaller本身以及分析、打包阶段用到的主要模块
+PRELOAD_MODULES = (
+    "PyInstaller.__main__",
+    "PyInstaller.building.build_main",
+    "PyInstaller.building.api",
+    "PyInstaller.depend.analysis",
+    "PyInstaller.depend.bindepend",
+    "PyInstaller.utils.hooks",
+)
+
+
+def _preload():
+    import importlib
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    import PyInstaller
+    return PyInstaller
+
+
+def _read_request(conn):
+    conn.settimeout(REQUEST_TIMEOUT)
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+    conn.settimeout(None)
+    return json.loads(data.decode("utf-8"))
+
+
+def _run_build(conn, request):
+    """在fork出的子进程中执行：输出重定向到连接，执行PyInstaller后报告退出代码"""
+    # 成为新的进程组组长，取消构建时可以结束整个进程树（包括PyInstaller启动的子进程）
+    os.setsid()
+    os.dup2(conn.fileno(), 1)
+    os.dup2(conn.fileno(), 2)
+    conn.close()
+    os.write(1, ("\0PID %d\n" % os.getpid()).encode())
+    code = 0
+    try:
+        os.chdir(request.get("cwd") or os.getcwd())
+        # PyInstaller在每次构建开始时才读取 PYINSTALLER_CONFIG_DIR 等环境变量，在这里设置即可生效
+        os.environ.update(request.get("env") or {})
+        sys.argv = ["pyinstaller"] + list(request["args"])
+        import PyInstaller.__main__
+        PyInstaller.__main__.run(list(request["args"]))
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            code = e.code
+        elif e.code is not None:
+            sys.stderr.write("%s\n" % e.code)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    os.write(1, ("\0EXIT %d\n" % code).encode())
+    os._exit(0)
+
+
+def _reap_children():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def serve():
+    # 以脚本方式运行时 resources 目录位于 sys.path 最前面，不能让它出现在PyInstaller的模块搜索路径中
+    if sys.path and os.path.abspath(sys.path[0] or os.curdir) == os.path.dirname(os.path.abspath(__file__)):
+        del sys.path[0]
+    try:
+        pyinstaller = _preload()
+    except Exception as e:
+        sys.stdout.write(json.dumps({"error": "无法导入PyInstaller: %s" % e}) + "\n")
+        sys.stdout.flush()
+        return 1
+
+    token = os.environ.get("EASYPACK_DAEMON_TOKEN", "")
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    sys.stdout.write(json.dumps({
+        "port": server.getsockname()[1],
+        "pid": os.getpid(),
+        "pyinstaller": os.path.dirname(pyinstaller.__file__),
+        "version": getattr(pyinstaller, "__version__", ""),
+    }) + "\n")
+    sys.stdout.flush()
+
+    last_request = time.monotonic()
+    while time.monotonic() - last_request < IDLE_TIMEOUT:
+        readable, _, _ = select.select([server, sys.stdin], [], [], 1.0)
+        _reap_children()
+        if sys.stdin in readable and not sys.stdin.buffer.read1(1):
+            break  # EasyPack 已退出
+        if server not in readable:
+            continue
+        conn, _ = server.accept()
+        try:
+            request = _read_request(conn)
+        except (OSError, ValueError):
+            request = None
+        if request is None or not hmac.compare_digest(str(request.get("token", "")), token):
+            conn.close()
+            continue
+        last_request = time.monotonic()
+        if os.fork() == 0:
+            server.close()
+            _run_build(conn, request)
+        conn.close()
+    server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(serve())
@@ -0,0 +1,151 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : launch_hook.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： EasyPack 启动分析的运行时钩子（--runtime-hook）。只在设置了 EASYPACK_LAUNCH_PROFILE 环境变量时生效：
+#                记录钩子执行时刻（引导程序和单文件解压之后）、程序就绪时刻（GUI事件循环开始处理事件，或进程退出），
+#                可选地记录每个模块的导入耗时（相当于 -X importtime），结果写入该环境变量指定的JSON文件。
+
+import os
+
+_RESULT_PATH = os.environ.get("EASYPACK_LAUNCH_PROFILE")
+
+if _RESULT_PATH:
+    import atexit
+    import json
+    import sys
+    import time
+
+    _state = {"hook": time.time(), "ready": None, "ready_by": None, "imports": []}
+    _exit_when_ready = os.environ.get("EASYPACK_LAUNCH_PROFILE_EXIT") == "1"
+
+    def _write_result():
+        try:
+            with open(_RESULT_PATH + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(_state, f)
+            os.replace(_RESULT_PATH + ".tmp", _RESULT_PATH)
+        except OSError:
+            pass
+
+    def _mark_ready(ready_by):
+        if _state["ready"] is None:
+            _state["ready"] = time.time()
+            _state["ready_by"] = ready_by
+            _write_result()
+
+    # 控制台程序没有事件循环，以退出时刻作为就绪时刻
+    atexit.register(lambda: _mark_ready("exit"))
+
+    def _patch_qt(module_name):
+        """事件循环开始后第一次空闲时视为就绪；分析模式下随即退出程序"""
+        qt_widgets = sys.modules[module_name]
+        qt_core = sys.modules[module_name.rsplit('.', 1)[0] + ".QtCore"]
+        application = qt_widgets.QApplication
+
+        def wrap(original):
+            def exec_(*args, **kwargs):
+                def on_ready():
+                    _mark_ready("event_loop")
+                    if _exit_when_ready:
+                        application.instance().quit()
+                qt_core.QTimer.singleShot(0, on_ready)
+                return original(*args, **kwargs)
+            return exec_
+
+        # QApplication.exec 在各个Qt绑定中都是静态方法
+        for name in ("exec", "exec_"):
+            original = getattr(application, name, None)
+            if original is not None:
+                setattr(application, name, staticmethod(wrap(original)))
+
+    def _patch_tkinter():
+        import tkinter
+        original = tkinter.Misc.mainloop
+
+        def mainloop(self, n=0):
+            def on_ready():
+                _mark_ready("event_loop")
+                if _exit_when_ready:
+                    self.quit()
+            self.after(0, on_ready)
+            return original(self, n)
+
+        tkinter.Misc.mainloop = mainloop
+
+    _PATCHES = {
+        "PyQt6.QtWidgets": lambda: _patch_qt("PyQt6.QtWidgets"),
+        "PyQt5.QtWidgets": lambda: _patch_qt("PyQt5.QtWidgets"),
+        "PySide6.QtWidgets": lambda: _patch_qt("PySide6.QtWidgets"),
+        "PySide2.QtWidgets": lambda: _patch_qt("PySide2.QtWidgets"),
+        "tkinter": _patch_tkinter,
+    }
+    _record_imports = os.environ.get("EASYPACK_LAUNCH_IMPORTS") == "1"
+    _import_stack = []
+
+    class _TimedLoader:
+        """包装原加载器，统计模块执行耗时（累计耗时和扣除子模块导入后的自身耗时），并在需要时打补丁"""
+
+        def __init__(self, loader, name):
+            self._loader = loader
+            self._name = name
+            self._start = None
+
+        def __getattr__(self, attr):
+            return getattr(self._loader, attr)
+
+        def create_module(self, spec):
+            # 扩展模块的加载（如 PyQt6 的各个模块）主要发生在 create_module 中，从这里开始计时
+            self._start = time.perf_counter()
+            _import_stack.append(0.0)
+            try:
+                return self._loader.create_module(spec)
+            except BaseException:
+                _import_stack.pop()
+                self._start = None
+                raise
+
+        def exec_module(self, module):
+            if self._start is None:
+                self._start = time.perf_counter()
+                _import_stack.append(0.0)
+            start = self._start
+            try:
+                self._loader.exec_module(module)
+            finally:
+                children = _import_stack.pop()
+                cumulative = time.perf_counter() - start
+                if _import_stack:
+                    _import_stack[-1] += cumulative
+                if _record_imports:
+                    _state["imports"].append([self._name, round((cumulative - children) * 1e6),
+                                              round(cumulative * 1e6)])
+            patch = _PATCHES.pop(self._name, None)
+            if patch is not None:
+                try:
+                    patch()
+                except Exception:
+                    pass
+
+    class _TimingFinder:
+        """位于 sys.meta_path 最前面，把其他查找器找到的模块的加载器替换为 _TimedLoader"""
+
+        @classmethod
+        def find_spec(cls, name, path=None, target=None):
+            for finder in sys.meta_path:
+                if finder is cls or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    # 不统计导入耗时时只包装需要打补丁的GUI库，其余模块保持原加载器
+                    wrap = _record_imports or name in _PATCHES
+                    if wrap and spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, name)
+                    return spec
+            return None
+
+    sys.meta_path.insert(0, _TimingFinder)
+    # 钩子执行前已经加载的GUI库直接打补丁
+    for _name in list(_PATCHES):
+        if _name in sys.modules:
+            _PATCHES.pop(_name)()
@@ -0,0 +1,319 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : shared_cache.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 跨项目、跨环境共享的构建缓存。构建时把 PYINSTALLER_CONFIG_DIR 指向 EasyPack 管理的共享目录，
+#                PyInstaller 的 bincache（strip/UPX 处理、macOS 重签名后的二进制文件）和 EasyPack 的 UPX 压缩缓存都放在这里，
+#                同一环境中不同项目的构建复用同一份二进制处理结果。超过大小上限时按最近使用时间淘汰，并统计命中/未命中。
+
+import ast
+import glob
+import os
+import platform
+import shutil
+import sys
+import threading
+import time
+
+from app_cache import cache_dir, load_json, save_json
+from bundle_analyzer import format_size, iter_toc_entries, load_toc
+from env_probe import find_cached_probe
+
+SETTINGS_FILE = "shared_cache.json"
+STATS_FILE = "shared_cache_stats.json"
+DEFAULT_LIMIT_MB = 4096
+# 最近这段时间（秒）内使用过的条目不淘汰，避免删除其他构建进程正在使用的文件
+EVICT_GRACE_PERIOD = 10 * 60
+# 统计的缓存类别及其显示名称
+_KINDS = {"pyinstaller": "PyInstaller", "upx": "UPX"}
+
+_stats_lock = threading.Lock()
+
+
+def shared_cache_dir():
+    """返回（并在需要时创建）共享缓存的根目录"""
+    path = os.path.join(cache_dir(), "shared")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def upx_cache_dir():
+    return os.path.join(shared_cache_dir(), "upx")
+
+
+def _bincache_root():
+    # PyInstaller 在 PYINSTALLER_CONFIG_DIR 下再建一层 pyinstaller 目录
+    return os.path.join(shared_cache_dir(), "pyinstaller")
+
+
+def load_settings():
+    """返回 {"enabled": 是否让PyInstaller使用共享缓存, "limit_mb": 大小上限}"""
+    settings = {"enabled": True, "limit_mb": DEFAULT_LIMIT_MB}
+    saved = load_json(SETTINGS_FILE) or {}
+    settings.update((key, saved[key]) for key in settings if key in saved)
+    return settings
+
+
+def save_settings(enabled, limit_mb):
+    save_json(SETTINGS_FILE, {"enabled": bool(enabled), "limit_mb": int(limit_mb)})
+
+
+def record_stats(kind, hits, misses):
+    """累加一次构建的命中/未命中次数，同时记为最近一次构建的结果"""
+    with _stats_lock:
+        stats = load_json(STATS_FILE) or {}
+        entry = stats.setdefault(kind, {"hits": 0, "misses": 0})
+        entry["hits"] += hits
+        entry["misses"] += misses
+        entry["last"] = [hits, misses]
+        save_json(STATS_FILE, stats)
+
+
+def _tree_usage(path):
+    """返回目录树的 (最近修改时间, 总大小)"""
+    last_used = os.stat(path).st_mtime
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                st = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            last_used = max(last_used, st.st_mtime)
+            size += st.st_size
+    return last_used, size
+
+
+def _cache_entries():
+    """
+    可淘汰的条目 [(最近使用时间, 大小, 路径)]：UPX缓存中的每个文件，以及PyInstaller的每个 bincache 目录。
+    bincache 由目录中的 index.dat 索引，只能整个目录淘汰，否则PyInstaller会返回已删除的缓存文件。
+    """
+    entries = []
+    for dirpath, _, filenames in os.walk(upx_cache_dir()):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    for path in glob.glob(os.path.join(_bincache_root(), "*")):
+        try:
+            if os.path.isdir(path):
+                entries.append((*_tree_usage(path), path))
+            else:
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        except OSError:
+            continue
+    return entries
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def evict(limit_mb=None):
+    """缓存超过上限时删除最久未使用的条目，返回 (删除的条目数, 释放的字节数)"""
+    limit = (load_settings()["limit_mb"] if limit_mb is None else limit_mb) * 2 ** 20
+    entries = sorted(_cache_entries())
+    total = sum(size for _, size, _ in entries)
+    removed = freed = 0
+    now = time.time()
+    for last_used, size, path in entries:
+        if total <= limit or now - last_used < EVICT_GRACE_PERIOD:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def clear_cache():
+    """清空共享缓存和统计"""
+    root = shared_cache_dir()
+    for name in os.listdir(root):
+        _remove(os.path.join(root, name))
+    with _stats_lock:
+        save_json(STATS_FILE, {})
+
+
+class CacheStats:
+    """共享缓存的占用和命中统计"""
+
+    def __init__(self, size, entry_count, limit_mb, counters):
+        self.size = size
+        self.entry_count = entry_count
+        self.limit_mb = limit_mb
+        self.counters = counters  # {类别: {"hits", "misses", "last": [命中, 未命中]}}
+
+    def describe(self):
+        text = f"占用 {format_size(self.size)} / {format_size(self.limit_mb * 2 ** 20)}（{self.entry_count} 项）"
+        for kind, label in _KINDS.items():
+            counter = self.counters.get(kind)
+            if not counter:
+                continue
+            lookups = counter["hits"] + counter["misses"]
+            rate = counter["hits"] / lookups * 100 if lookups else 0.0
+            text += f"；{label} 命中 {counter['hits']} / 未命中 {counter['misses']}（{rate:.0f}%）"
+            if counter.get("last"):
+                text += f"，上次 {counter['last'][0]} / {counter['last'][1]}"
+        return text
+
+
+def cache_stats():
+    entries = _cache_entries()
+    return CacheStats(sum(size for _, size, _ in entries), len(entries), load_settings()["limit_mb"],
+                      load_json(STATS_FILE) or {})
+
+
+def _load_index(path):
+    """
+    读取 bincache 的 index.dat（{缓存ID: 摘要}）。摘要保存为 bytearray(b'...')，不是纯字面量，
+    所以逐项解析而不是直接 literal_eval；文件损坏时返回空字典。
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), mode='eval')
+        if not isinstance(tree.body, ast.Dict):
+            return {}
+        index = {}
+        for key, value in zip(tree.body.keys, tree.body.values):
+            if isinstance(value, ast.Call) and value.args:
+                value = value.args[0]
+            index[ast.literal_eval(key)] = ast.literal_eval(value)
+        return index
+    except (OSError, ValueError, SyntaxError):
+        return {}
+
+
+def _load_indexes():
+    """{index.dat 路径: 索引}；macOS 上的 bincache 按签名身份分了子目录，所以遍历整个目录树"""
+    indexes = {}
+    for dirpath, _, filenames in os.walk(_bincache_root()):
+        if "index.dat" in filenames:
+            path = os.path.join(dirpath, "index.dat")
+            indexes[path] = _load_index(path)
+    return indexes
+
+
+def _built_binaries(workpath):
+    """构建用到的二进制文件，按PyInstaller的缓存ID（大小写规范化后的目标路径）表示"""
+    names = set()
+    for toc_path in glob.glob(os.path.join(workpath, "*.toc")):
+        for dest_name, _, typecode in iter_toc_entries(load_toc(toc_path)):
+            if typecode in ("BINARY", "EXTENSION"):
+                names.add(os.path.normcase(dest_name))
+    return names
+
+
+def _python_tag(python_executable):
+    """
+    bincache 目录名中的Python版本和架构部分（如 py31164bit）。取自环境的缓存探测结果，不另外启动解释器；
+    没有探测结果时按 EasyPack 自身的解释器推测。
+    """
+    info = find_cached_probe(python_executable)
+    if info and info.get("python_version") and info.get("architecture"):
+        major, minor = info["python_version"].split(".")[:2]
+        return f"py{major}{minor}{info['architecture']}"
+    return f"py{sys.version_info[0]}{sys.version_info[1]}{platform.architecture()[0]}"
+
+
+def _candidate_bincaches(command_list, python_tag):
+    """
+    本次构建可能使用的 bincache 目录名（bincache<strip><upx><Python版本和架构>）。
+    spec 模式下 strip/UPX 写在 spec 中，两种都有可能；除 macOS 外，不使用 strip 和 UPX 时PyInstaller不使用缓存。
+    """
+    spec_mode = len(command_list) > 3 and command_list[3].lower().endswith(".spec")
+    strip_options = (0, 1) if spec_mode else (int("--strip" in command_list or "-s" in command_list),)
+    upx_options = (0,) if "--noupx" in command_list else (0, 1)
+    return {f"bincache{strip}{upx}{python_tag}" for strip in strip_options for upx in upx_options
+            if strip or upx or sys.platform == 'darwin'}
+
+
+class SharedCache:
+    """
+    一次构建对共享缓存的使用。redirect为True时让PyInstaller使用共享目录（PYINSTALLER_CONFIG_DIR），
+    由 BuildRunner 在构建前调用 begin 记录 bincache 索引，构建后调用 finish 统计命中并淘汰旧条目。
+    """
+
+    def __init__(self, redirect=True):
+        self.redirect = redirect
+        self._indexes = None
+        self._candidates = set()
+
+    @property
+    def env(self):
+        """需要加到构建进程中的环境变量"""
+        return {"PYINSTALLER_CONFIG_DIR": shared_cache_dir()} if self.redirect else {}
+
+    def begin(self, command_list, python_executable):
+        if not self.redirect:
+            return
+        self._candidates = _candidate_bincaches(command_list, _python_tag(python_executable))
+        if self._candidates:
+            self._indexes = _load_indexes()
+
+    def finish(self, workpath, on_output, can_evict=True):
+        """构建成功后调用：统计 bincache 命中，超出上限时淘汰（有其他构建正在进行时 can_evict 为False）"""
+        notes = []
+        if self._indexes is not None and workpath:
+            hits, misses = self._bincache_usage(workpath)
+            if hits or misses:
+                record_stats("pyinstaller", hits, misses)
+                notes.append(f"PyInstaller 二进制缓存命中 {hits} 个，未命中 {misses} 个")
+        if can_evict:
+            removed, freed = evict()
+            if removed:
+                notes.append(f"已淘汰 {removed} 项旧缓存（{format_size(freed)}）")
+        if notes:
+            on_output(f"共享缓存: {'，'.join(notes)}\n")
+
+    def _bincache_usage(self, workpath):
+        """
+        比较构建前后的 bincache 索引：构建用到的二进制文件中，索引项新增或变化的是未命中，未变化的是命中。
+        一次构建只使用一个 bincache 目录（按 strip/UPX 选项、Python版本和架构区分），只比较可能使用的目录：
+        有未命中的目录就是本次使用的目录，全部命中时取命中最多的目录。使用过的目录更新修改时间，用于淘汰。
+        """
+        binaries = _built_binaries(workpath)
+        root = _bincache_root()
+        usage = []
+        for path, index in _load_indexes().items():
+            if os.path.relpath(path, root).split(os.sep)[0] not in self._candidates:
+                continue
+            before = self._indexes.get(path, {})
+            ids = binaries & index.keys()
+            misses = sum(1 for cache_id in ids if before.get(cache_id) != index[cache_id])
+            usage.append((misses, len(ids) - misses, path))
+        used = [item for item in usage if item[0]]
+        if not used:
+            best = max((hits for _, hits, _ in usage), default=0)
+            used = [item for item in usage if best and item[1] == best][:1]
+        for _, _, path in used:
+            top_dir = os.path.join(root, os.path.relpath(path, root).split(os.sep)[0])
+            try:
+                os.utime(top_dir)
+            except OSError:
+                pass
+        return sum(hits for _, hits, _ in used), sum(misses for misses, _, _ in used)
+
+
+def make_shared_cache(enabled=None, upx_pass=None):
+    """
+    创建一次构建的共享缓存；enabled为None时按保存的设置。
+    未启用共享时，使用UPX压缩（upx_pass）的构建仍需要淘汰UPX缓存；两者都不需要时返回None。
+    """
+    if enabled is None:
+        enabled = load_settings()["enabled"]
+    if not enabled and upx_pass is None:
+        return None
+    return SharedCache(redirect=enabled)
@@ -0,0 +1,134 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : spec_file.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： spec 模式。由当前打包选项生成一次 spec 文件（pyi-makespec），之后直接由 spec 构建，
+#                可以在 spec 中手动调整 Analysis 的排除项、过滤 TOC 等，不会在下次构建时丢失。
+#                spec 旁边的 <程序名>.spec.easypack.json 记录生成时的选项和 spec 内容的哈希，
+#                用于判断界面上的选项是否仍与 spec 一致、spec 是否被手动修改过。
+
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+from build_config import makespec_command
+
+# spec 文件的状态
+SPEC_MISSING = "missing"  # 尚未生成
+SPEC_CURRENT = "current"  # 与当前选项一致，未手动修改
+SPEC_EDITED = "edited"  # 与当前选项一致，已手动修改
+SPEC_STALE = "stale"  # 选项已变化，spec 未手动修改，可以直接重新生成
+SPEC_CONFLICT = "conflict"  # 选项已变化，但 spec 已手动修改（或不是由EasyPack生成的）
+
+# 选项变化且 spec 已手动修改时的处理方式
+CONFLICT_KEEP = "keep"  # 保留手动修改过的 spec，并把当前选项记为已确认
+CONFLICT_REGENERATE = "regenerate"  # 重新生成，原文件备份为 .bak
+
+_STATUS_MESSAGES = {
+    SPEC_MISSING: "尚未生成spec文件，构建前自动生成",
+    SPEC_CURRENT: "spec文件与当前选项一致",
+    SPEC_EDITED: "spec文件已手动修改，直接使用",
+    SPEC_STALE: "打包选项已变化，构建前重新生成spec文件",
+    SPEC_CONFLICT: "打包选项已变化，但spec文件已手动修改",
+}
+
+
+class SpecError(Exception):
+    """spec 文件无法生成"""
+
+
+def _sha256_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _sidecar_path(spec_path):
+    return spec_path + ".easypack.json"
+
+
+def _load_sidecar(spec_path):
+    try:
+        with open(_sidecar_path(spec_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_sidecar(spec_path, options, spec_sha):
+    with open(_sidecar_path(spec_path), 'w', encoding='utf-8') as f:
+        json.dump({"options": options, "spec_sha256": spec_sha}, f, ensure_ascii=False, indent=2)
+
+
+def spec_status(config):
+    """返回 (状态, 说明)；配置无效时返回 (None, 错误信息)"""
+    options, error = makespec_command(config)
+    if error:
+        return None, error
+    if not os.path.isfile(config.spec_path):
+        status = SPEC_MISSING
+    else:
+        sidecar = _load_sidecar(config.spec_path)
+        edited = sidecar.get("spec_sha256") != _sha256_file(config.spec_path)
+        if sidecar.get("options") == options:
+            status = SPEC_EDITED if edited else SPEC_CURRENT
+        else:
+            status = SPEC_CONFLICT if edited else SPEC_STALE
+    return status, _STATUS_MESSAGES[status]
+
+
+class SpecFile:
+    """一次 spec 模式构建的 spec 文件，构建前由 BuildRunner 调用 prepare 按需生成"""
+
+    def __init__(self, config, on_conflict=CONFLICT_KEEP):
+        self.config = config.copy()
+        self.on_conflict = on_conflict
+
+    @property
+    def spec_path(self):
+        return self.config.spec_path
+
+    def prepare(self, on_output):
+        status, message = spec_status(self.config)
+        if status is None:
+            raise SpecError(message)
+        if status == SPEC_CONFLICT and self.on_conflict == CONFLICT_KEEP:
+            # 保留手动修改；记录当前选项，之后不再重复提示
+            sidecar = _load_sidecar(self.spec_path)
+            _save_sidecar(self.spec_path, makespec_command(self.config)[0], sidecar.get("spec_sha256"))
+            on_output(f"spec: {message}，保留现有的spec文件: {self.spec_path}\n")
+        elif status in (SPEC_MISSING, SPEC_STALE, SPEC_CONFLICT):
+            if status == SPEC_CONFLICT:
+                shutil.copy2(self.spec_path, self.spec_path + ".bak")
+                on_output(f"spec: {message}，已备份为 {self.spec_path}.bak 并重新生成\n")
+            else:
+                on_output(f"spec: {message}\n")
+            self.generate(on_output)
+        else:
+            on_output(f"spec: {message}: {self.spec_path}\n")
+
+    def generate(self, on_output):
+        command, error = makespec_command(self.config)
+        if error:
+            raise SpecError(error)
+        on_output(f"生成spec文件:\n{command}\n")
+        os.makedirs(os.path.dirname(self.spec_path), exist_ok=True)
+        creation_flags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        try:
+            result = subprocess.run(shlex.split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True, encoding='utf-8', errors='replace', creationflags=creation_flags)
+        except OSError as e:
+            raise SpecError(f"无法运行 pyi-makespec: {e}")
+        if result.returncode != 0 or not os.path.isfile(self.spec_path):
+            raise SpecError(f"生成spec文件失败（退出代码 {result.returncode}）:\n{result.stdout}")
+        _save_sidecar(self.spec_path, command, _sha256_file(self.spec_path))
+        on_output(f"已生成spec文件: {self.spec_path}\n\n")
+
+
+def make_spec_file(config, on_conflict=CONFLICT_KEEP):
+    """spec 模式下返回 SpecFile，否则返回None"""
+    return SpecFile(config, on_conflict) if config.spec_mode else None
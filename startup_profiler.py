@@ -0,0 +1,65 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : startup_profiler.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： 启动耗时分析，记录启动各阶段的时间点并输出耗时明细。设置环境变量 EASYPACK_PROFILE_STARTUP=1
+#                或使用 --profile-startup 参数启用。
+
+import os
+import sys
+import time
+
+from app_cache import load_json, save_json
+
+PROFILE_ENV = "EASYPACK_PROFILE_STARTUP"
+PROFILE_FLAG = "--profile-startup"
+PROFILE_FILE = "startup_profile.json"
+# 保留最近若干次启动的记录，便于对比优化前后的数据
+MAX_SAVED_RUNS = 20
+
+_start = time.perf_counter()
+_marks = []
+_reported = False
+
+enabled = os.environ.get(PROFILE_ENV, "") not in ("", "0") or PROFILE_FLAG in sys.argv
+if PROFILE_FLAG in sys.argv:
+    # 不把参数传给 QApplication
+    sys.argv.remove(PROFILE_FLAG)
+
+
+def mark(phase):
+    """记录一个阶段结束的时间点，未启用时不做任何事"""
+    if enabled:
+        _marks.append((phase, time.perf_counter() - _start))
+
+
+def breakdown():
+    """返回 [(阶段, 本阶段耗时, 累计耗时), ...]，单位为秒"""
+    rows = []
+    previous = 0.0
+    for phase, elapsed in _marks:
+        rows.append((phase, elapsed - previous, elapsed))
+        previous = elapsed
+    return rows
+
+
+def report():
+    """输出各阶段的耗时明细并保存到缓存目录，每次运行只输出一次"""
+    global _reported
+    if not enabled or _reported:
+        return
+    _reported = True
+    rows = breakdown()
+    lines = ["启动耗时分析 (从导入 startup_profiler 开始计时):",
+             f"  {'耗时 (ms)':>10}  {'累计 (ms)':>10}  阶段"]
+    for phase, duration, elapsed in rows:
+        lines.append(f"  {duration * 1000:>10.1f}  {elapsed * 1000:>10.1f}  {phase}")
+    print("\n".join(lines), file=sys.stderr, flush=True)
+
+    runs = load_json(PROFILE_FILE) or []
+    runs.append({
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "phases": [[phase, round(elapsed * 1000, 1)] for phase, _, elapsed in rows],
+    })
+    save_json(PROFILE_FILE, runs[-MAX_SAVED_RUNS:])
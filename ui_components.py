@@ -5,17 +5,27 @@
 # @Software : PyCharm Professional 2025.1.2
 # Introduction： PyQt6的GUI界面定义模块，负责所有UI控件的创建、布局和样式。
 
+import html
 import os
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox,
     QLabel, QLineEdit, QPushButton, QComboBox, QCheckBox, QRadioButton,
     QPlainTextEdit, QFileDialog, QTableWidget, QAbstractItemView, QHeaderView,
-    QMessageBox, QFormLayout, QTableWidgetItem, QSplitter
+    QMessageBox, QFormLayout, QTableWidgetItem, QSplitter, QTabWidget, QSpinBox,
+    QDialog, QDialogButtonBox, QListWidget, QListWidgetItem, QToolButton
 )
-from PyQt6.QtGui import QIcon, QFont
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QIcon, QFont, QTextCursor, QTextCharFormat
+from PyQt6.QtCore import Qt, pyqtSignal
 import sys
 
+import startup_profiler
+from build_config import BuildConfig, build_command
+from data_scanner import DEFAULT_DATA_EXCLUDES, split_patterns
+from log_diagnostics import KINDS
+from log_store import LogStore
+from resource_limits import ResourceLimits, build_slots, format_cpu_list, parse_cpu_list
+from spec_file import CONFLICT_KEEP, CONFLICT_REGENERATE, spec_status
+
 
 def resource_path(relative_path):
     """ 获取资源的绝对路径，无论是开发环境还是打包后的环境 """
@@ -62,7 +72,201 @@ DARK_THEME = """
 """
 
 
+class LogConsole(QPlainTextEdit):
+    """
+    显示 LogStore 内容的只读日志窗口。
+    窗口中最多显示 store.max_lines 行；滚动到顶部时从磁盘按页读回更早的内容，
+    滚动到底部时再逐页回到最新内容并恢复实时跟随。
+    """
+    PAGE_LINES = 1000
+
+    def __init__(self, store=None):
+        super().__init__()
+        self.setReadOnly(True)
+        self.store = store or LogStore()
+        self._first_shown = 0  # 窗口中第一行对应的日志行号
+        self._shown_count = 0
+        self._following = True  # 是否实时跟随最新的日志
+        self._paging = False
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
+    def start_log(self, log_path=None):
+        """清空窗口并开始新的日志文件"""
+        self.store.open(log_path)
+        self._reset_view()
+
+    def set_store(self, store):
+        """切换到另一个日志存储并显示其最新内容"""
+        self.store = store
+        self._reset_view()
+        self._show_lines(list(store.lines))
+
+    def append_text(self, text, color=None):
+        """把文本写入存储并显示，返回拆分出的日志行"""
+        lines = self.store.append_text(text)
+        if lines and self._following:
+            self._show_lines(lines, color)
+        return lines
+
+    def refresh_tail(self):
+        """显示存储中新增但尚未显示的行（存储由其他对象写入时使用）"""
+        if self._following:
+            last_shown = self._first_shown + self._shown_count
+            self._show_lines(self.store.read_lines(last_shown, self.store.line_count))
+
+    def _reset_view(self):
+        self.clear()
+        self._first_shown = self.store.first_buffered_line
+        self._shown_count = 0
+        self._following = True
+
+    def _show_lines(self, lines, color=None):
+        """在末尾追加若干行，超过上限时从顶部裁剪，并只滚动一次"""
+        if not lines:
+            return
+        paging, self._paging = self._paging, True
+        if color:
+            for line in lines:
+                self.appendHtml(f'<font color="{color}">{html.escape(line)}</font>')
+        else:
+            self.appendPlainText('\n'.join(lines))
+        self._shown_count += len(lines)
+
+        overflow = self._shown_count - self.store.max_lines
+        if overflow > 0:
+            self._remove_blocks(overflow, from_top=True)
+            self._first_shown += overflow
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self._paging = paging
+
+    def _remove_blocks(self, count, from_top):
+        count = min(count, self._shown_count)
+        doc = self.document()
+        cursor = QTextCursor(doc)
+        if from_top:
+            cursor.setPosition(doc.findBlockByNumber(count).position())
+            cursor.setPosition(0, QTextCursor.MoveMode.KeepAnchor)
+        else:
+            block = doc.findBlockByNumber(doc.blockCount() - count)
+            cursor.setPosition(max(0, block.position() - 1))
+            cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self._shown_count -= count
+
+    def _on_scrolled(self, value):
+        # 翻页过程中修改内容和滚动条也会触发本信号，需要忽略
+        if self._paging:
+            return
+        self._paging = True
+        try:
+            scroll_bar = self.verticalScrollBar()
+            if value == scroll_bar.minimum() and self._first_shown > self.store.first_available_line:
+                self._page_back()
+            elif value == scroll_bar.maximum() and not self._following:
+                self._page_forward()
+        finally:
+            self._paging = False
+
+    def _page_back(self):
+        """在顶部插入更早的一页日志，并从底部裁剪以保持行数上限"""
+        start = max(self.store.first_available_line, self._first_shown - self.PAGE_LINES)
+        lines = self.store.read_lines(start, self._first_shown)
+        if not lines:
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.Start)
+        cursor.setCharFormat(QTextCharFormat())
+        cursor.insertText('\n'.join(lines) + ('\n' if self._shown_count else ''))
+        self._first_shown = start
+        self._shown_count += len(lines)
+
+        overflow = self._shown_count - self.store.max_lines
+        if overflow > 0:
+            self._remove_blocks(overflow, from_top=False)
+            self._following = False
+        self.verticalScrollBar().setValue(len(lines))
+
+    def _page_forward(self):
+        """在底部追加后一页日志，到达最新内容后恢复实时跟随"""
+        last_shown = self._first_shown + self._shown_count
+        lines = self.store.read_lines(last_shown, last_shown + self.PAGE_LINES)
+        if not lines:
+            self._following = True
+            return
+        self._following = last_shown + len(lines) >= self.store.line_count
+        old_count = self._shown_count
+        self.appendPlainText('\n'.join(lines))
+        self._shown_count += len(lines)
+        overflow = self._shown_count - self.store.max_lines
+        if overflow > 0:
+            self._remove_blocks(overflow, from_top=True)
+            self._first_shown += overflow
+        self.verticalScrollBar().setValue(max(0, old_count - overflow - self.verticalScrollBar().pageStep()))
+
+    def scroll_to_line(self, line):
+        """定位并选中日志的第 line 行，不在窗口中时读回它所在的一页；之后停止实时跟随，滚动到底部时恢复"""
+        if not self._first_shown <= line < self._first_shown + self._shown_count:
+            start = max(self.store.first_available_line, line - self.PAGE_LINES // 2)
+            lines = self.store.read_lines(start, start + self.PAGE_LINES)
+            if not start <= line < start + len(lines):
+                return False
+            self._paging = True
+            self.clear()
+            self.appendPlainText('\n'.join(lines))
+            self._first_shown = start
+            self._shown_count = len(lines)
+            self._paging = False
+        self._following = False
+        cursor = QTextCursor(self.document().findBlockByNumber(line - self._first_shown))
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        self._paging = True
+        self.setTextCursor(cursor)
+        self.centerCursor()
+        self._paging = False
+        return True
+
+
+class SuggestionDialog(QDialog):
+    """带复选框的建议列表对话框，用户勾选后一键应用"""
+
+    def __init__(self, parent, title, message, suggestions):
+        """suggestions 为 [(值, 显示文本), ...] 或 [(值, 显示文本, 是否勾选), ...]，默认勾选"""
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumSize(600, 400)
+        layout = QVBoxLayout(self)
+        label = QLabel(message)
+        label.setWordWrap(True)
+        layout.addWidget(label)
+
+        self.list_widget = QListWidget()
+        for value, text, *checked in suggestions:
+            item = QListWidgetItem(text)
+            item.setData(Qt.ItemDataRole.UserRole, value)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if checked[:1] != [False] else Qt.CheckState.Unchecked)
+            self.list_widget.addItem(item)
+        layout.addWidget(self.list_widget)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def selected_values(self):
+        return [self.list_widget.item(i).data(Qt.ItemDataRole.UserRole)
+                for i in range(self.list_widget.count())
+                if self.list_widget.item(i).checkState() == Qt.CheckState.Checked]
+
+
 class PyInstallerGUI(QMainWindow):
+    # 任何影响构建命令的配置项发生变化时发出
+    config_changed = pyqtSignal()
+    # 点击"分析..."按钮时发出
+    scan_imports_requested = pyqtSignal()
+    # 附加数据条目（路径或过滤模式）发生变化时发出
+    data_files_changed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("EasyPack")
@@ -80,21 +284,171 @@ class PyInstallerGUI(QMainWindow):
                 self.style().StandardPixmap.SP_CommandLink
             )))
 
-        self.python_executable = None
+        # 界面上的构建选项实时同步到配置模型中，命令由配置模型生成
+        self.config = BuildConfig()
         self.output_path = None
+        # 在创建子控件之前设置样式表，子控件只需计算一次样式
+        self.setStyleSheet(LIGHT_THEME)
+
+        # 高级打包选项在首次展开时才创建，之前相关字段只保存在配置模型中
+        self.advanced_group = None
+        self.hidden_imports_edit = None
+        self.exclude_modules_edit = None
+        self.scan_imports_button = None
+        self.paths_edit = None
+        self.data_table = None
+        self.priority_spin = None
+        self.io_idle_check = None
+        self.cpu_affinity_edit = None
+        self.memory_limit_spin = None
+        self.build_slots_spin = None
+        self.upx_check = None
+        self.upx_dir_edit = None
+        self.upx_exclude_edit = None
+        # 资源限制同样不依赖高级选项控件，每次构建时复制一份
+        self.resource_limits = ResourceLimits()
+        self._cpu_affinity_error = None
+        self._paths_placeholder = "从Conda环境自动检测"
+        self._import_scan_running = False
 
         self.splitter = QSplitter(Qt.Orientation.Horizontal, self)
         self.setCentralWidget(self.splitter)
 
         left_panel = self._create_left_panel()
+        startup_profiler.mark("创建左侧面板")
         right_panel = self._create_right_panel()
+        startup_profiler.mark("创建右侧面板")
 
         self.splitter.addWidget(left_panel)
         self.splitter.addWidget(right_panel)
         self.splitter.setSizes([500, 700])
 
+        self._bind_config_fields()
         self.update_command_preview()
 
+    @property
+    def python_executable(self):
+        return self.config.python_executable or None
+
+    @python_executable.setter
+    def python_executable(self, value):
+        self._set_config_field("python_executable", value or "")
+
+    def _bind_config_fields(self):
+        """把各个输入控件绑定到配置模型的对应字段，控件变化时只更新该字段"""
+        text_fields = {
+            self.script_path_edit: "script",
+            self.app_name_edit: "name",
+            self.icon_path_edit: "icon",
+        }
+        for edit, field in text_fields.items():
+            self._set_config_field(field, edit.text())
+            edit.textChanged.connect(lambda text, field=field: self._set_config_field(field, text))
+
+        check_fields = {
+            self.onefile_radio: "onefile",
+            self.noconsole_check: "noconsole",
+            self.clean_check: "clean",
+            self.launch_hook_check: "launch_hook",
+            self.spec_mode_check: "spec_mode",
+        }
+        for check, field in check_fields.items():
+            self._set_config_field(field, check.isChecked())
+            check.toggled.connect(lambda checked, field=field: self._set_config_field(field, checked))
+
+    def _bind_advanced_fields(self):
+        """高级打包选项创建后，用配置模型中已有的值填充控件，再把控件绑定到配置模型"""
+        self.paths_edit.setText(self.config.paths)
+        self.paths_edit.setPlaceholderText(self._paths_placeholder)
+        self.hidden_imports_edit.setText(", ".join(self.config.hidden_imports))
+        self.exclude_modules_edit.setText(", ".join(self.config.exclude_modules))
+        for source, dest, include, exclude in self.config.data_files:
+            self._insert_data_row(self.data_table, source, dest, include, exclude)
+
+        self.paths_edit.textChanged.connect(lambda text: self._set_config_field("paths", text))
+        self.hidden_imports_edit.textChanged.connect(
+            lambda text: self._set_config_field("hidden_imports",
+                                                tuple(i.strip() for i in text.split(',') if i.strip()))
+        )
+        self.exclude_modules_edit.textChanged.connect(
+            lambda text: self._set_config_field("exclude_modules",
+                                                tuple(m.strip() for m in text.split(',') if m.strip()))
+        )
+        # 只有表格内容变化时才遍历表格
+        table_model = self.data_table.model()
+        table_model.rowsInserted.connect(self._sync_data_files)
+        table_model.rowsRemoved.connect(self._sync_data_files)
+        table_model.dataChanged.connect(self._sync_data_files)
+        if self.config.data_files:
+            self.data_files_changed.emit()  # 统计已有条目的文件数和大小
+
+        self.upx_check.setChecked(self.config.upx)
+        self.upx_dir_edit.setText(self.config.upx_dir)
+        self.upx_exclude_edit.setText(", ".join(self.config.upx_exclude))
+        self.upx_check.toggled.connect(lambda checked: self._set_config_field("upx", checked))
+        self.upx_dir_edit.textChanged.connect(lambda text: self._set_config_field("upx_dir", text.strip()))
+        self.upx_exclude_edit.textChanged.connect(
+            lambda text: self._set_config_field("upx_exclude",
+                                                tuple(p.strip() for p in text.split(',') if p.strip()))
+        )
+
+        limits = self.resource_limits
+        self.priority_spin.setValue(limits.nice)
+        self.io_idle_check.setChecked(limits.io_idle)
+        self.cpu_affinity_edit.setText(format_cpu_list(limits.cpu_affinity))
+        self.memory_limit_spin.setValue(limits.memory_mb)
+        self.build_slots_spin.setValue(build_slots.capacity)
+        self.priority_spin.valueChanged.connect(lambda value: setattr(self.resource_limits, "nice", value))
+        self.io_idle_check.toggled.connect(lambda checked: setattr(self.resource_limits, "io_idle", checked))
+        self.cpu_affinity_edit.textChanged.connect(self._set_cpu_affinity)
+        self.memory_limit_spin.valueChanged.connect(lambda value: setattr(self.resource_limits, "memory_mb", value))
+        self.build_slots_spin.valueChanged.connect(build_slots.set_capacity)
+
+    def _set_cpu_affinity(self, text):
+        try:
+            self.resource_limits.cpu_affinity = parse_cpu_list(text)
+            self._cpu_affinity_error = None
+            self.cpu_affinity_edit.setToolTip("")
+        except ValueError as e:
+            self._cpu_affinity_error = f"CPU亲和性设置无效: {e}"
+            self.cpu_affinity_edit.setToolTip(self._cpu_affinity_error)
+
+    def get_resource_limits(self):
+        """返回 (本次构建使用的资源限制副本, 错误信息)"""
+        if self._cpu_affinity_error:
+            return None, self._cpu_affinity_error
+        return self.resource_limits.copy(), None
+
+    def _set_config_field(self, field, value):
+        if getattr(self.config, field) != value:
+            setattr(self.config, field, value)
+            self.config_changed.emit()
+
+    def _sync_data_files(self, *args):
+        """从附加数据表格读取 (源路径, 目标路径, 包含模式, 排除模式)，跳过尚未填写完整的行"""
+        entries = []
+        for row in range(self.data_table.rowCount()):
+            items = [self.data_table.item(row, column) for column in range(4)]
+            if None not in items:
+                source, dest, include, exclude = (item.text() for item in items)
+                entries.append((source, dest, split_patterns(include), split_patterns(exclude)))
+        if tuple(entries) != self.config.data_files:
+            self._set_config_field("data_files", tuple(entries))
+            self.data_files_changed.emit()
+
+    def show_data_stats(self, data_files, results):
+        """在附加数据表格中显示扫描得到的文件数和总大小；扫描期间条目又发生了变化时忽略结果"""
+        if self.data_table is None or data_files != self.config.data_files:
+            return
+        for row, result in enumerate(results):
+            if isinstance(result, str):
+                item = QTableWidgetItem("无法读取")
+                item.setToolTip(result)
+            else:
+                item = QTableWidgetItem(result.describe())
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            self.data_table.setItem(row, 4, item)
+
     def _create_left_panel(self):
         panel = QWidget()
         layout = QVBoxLayout(panel)
@@ -116,6 +470,12 @@ class PyInstallerGUI(QMainWindow):
         main_settings_layout.addRow("Python 脚本:", script_container)
         self.conda_env_combo = QComboBox()
         main_settings_layout.addRow("Conda 环境:", self.conda_env_combo)
+        self.wheelhouse_edit = QLineEdit()
+        self.wheelhouse_edit.setPlaceholderText("可选，本地wheel目录，用于离线安装PyInstaller")
+        browse_wheelhouse_btn = QPushButton("浏览...")
+        browse_wheelhouse_btn.clicked.connect(self.browse_wheelhouse)
+        wheelhouse_container = self._create_line_edit_with_button(self.wheelhouse_edit, browse_wheelhouse_btn)
+        main_settings_layout.addRow("离线安装源:", wheelhouse_container)
         main_settings_group.setLayout(main_settings_layout)
 
         general_group = QGroupBox("常规选项")
@@ -130,9 +490,25 @@ class PyInstallerGUI(QMainWindow):
         self.noconsole_check = QCheckBox("隐藏控制台窗口 (--noconsole)")
         self.noconsole_check.setChecked(True)
         self.clean_check = QCheckBox("构建前清理 (--clean)")
-        self.clean_check.setChecked(True)
+        self.incremental_check = QCheckBox("增量构建（输入未变化时跳过构建）")
+        self.incremental_check.setChecked(True)
+        self.daemon_check = QCheckBox("常驻构建进程（预先导入PyInstaller，加快重复构建）")
+        self.daemon_check.setToolTip("每个环境保持一个已导入PyInstaller的后台进程，构建时不再重新启动解释器")
+        if not hasattr(os, "fork"):
+            self.daemon_check.setEnabled(False)
+            self.daemon_check.setToolTip("常驻构建进程需要 fork，当前系统不支持")
         general_layout.addRow(self.noconsole_check)
+        self.launch_hook_check = QCheckBox("加入启动分析钩子（用于测量启动耗时）")
+        self.launch_hook_check.setToolTip("通过 --runtime-hook 加入一个钩子，只在“启动分析”运行程序时生效")
         general_layout.addRow(self.clean_check)
+        general_layout.addRow(self.incremental_check)
+        general_layout.addRow(self.daemon_check)
+        general_layout.addRow(self._create_shared_cache_row())
+        general_layout.addRow(self.launch_hook_check)
+        self.spec_mode_check = QCheckBox("spec模式（只生成一次spec文件，之后直接由spec构建）")
+        self.spec_mode_check.setToolTip("spec文件保存在 output/spec/ 中，可以手动修改（如调整排除项、过滤TOC），"
+                                        "修改不会在下次构建时被覆盖")
+        general_layout.addRow(self.spec_mode_check)
         general_group.setLayout(general_layout)
 
         mode_group = QGroupBox("打包模式")
@@ -144,27 +520,133 @@ class PyInstallerGUI(QMainWindow):
         mode_layout.addWidget(self.onedir_radio)
         mode_group.setLayout(mode_layout)
 
+        # 高级打包选项默认折叠，首次展开时才创建
+        self.advanced_toggle = QToolButton()
+        self.advanced_toggle.setText("高级打包选项")
+        self.advanced_toggle.setCheckable(True)
+        self.advanced_toggle.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextBesideIcon)
+        self.advanced_toggle.setArrowType(Qt.ArrowType.RightArrow)
+        self.advanced_toggle.toggled.connect(self.set_advanced_expanded)
+
+        layout.addWidget(appearance_group)
+        layout.addWidget(main_settings_group)
+        layout.addWidget(general_group)
+        layout.addWidget(mode_group)
+        layout.addWidget(self.advanced_toggle)
+        layout.addStretch()
+        self.left_layout = layout
+        return panel
+
+    def _create_shared_cache_row(self):
+        """共享缓存的开关、大小上限和统计，设置对所有项目生效，由控制器读取和保存"""
+        self.shared_cache_check = QCheckBox("共享构建缓存，上限:")
+        self.shared_cache_check.setToolTip("PyInstaller的二进制缓存（PYINSTALLER_CONFIG_DIR）和UPX压缩缓存由所有项目、"
+                                           "所有环境共用；启用后 --clean 只清理本项目的构建目录")
+        self.shared_cache_limit_spin = QSpinBox()
+        self.shared_cache_limit_spin.setRange(256, 1024 * 1024)
+        self.shared_cache_limit_spin.setSingleStep(512)
+        self.shared_cache_limit_spin.setSuffix(" MB")
+        self.shared_cache_limit_spin.setToolTip("超过上限时删除最久未使用的缓存")
+        self.clear_shared_cache_button = QPushButton("清空")
+        self.shared_cache_label = QLabel("")
+        self.shared_cache_label.setWordWrap(True)
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        controls = QHBoxLayout()
+        controls.addWidget(self.shared_cache_check)
+        controls.addWidget(self.shared_cache_limit_spin)
+        controls.addWidget(self.clear_shared_cache_button)
+        controls.addStretch()
+        layout.addLayout(controls)
+        layout.addWidget(self.shared_cache_label)
+        return container
+
+    def show_shared_cache_stats(self, stats):
+        self.shared_cache_label.setText(stats.describe())
+
+    def _create_advanced_group(self):
         advanced_group = QGroupBox("高级打包选项")
         advanced_layout = QFormLayout()
         self.hidden_imports_edit = QLineEdit()
         self.hidden_imports_edit.setPlaceholderText("例如: my_package, another_module.sub")
-        advanced_layout.addRow("隐藏导入:", self.hidden_imports_edit)
+        self.scan_imports_button = QPushButton("分析...")
+        self.scan_imports_button.setToolTip("扫描项目源码中的动态导入，建议需要添加的隐藏导入")
+        self.scan_imports_button.setEnabled(not self._import_scan_running)
+        self.scan_imports_button.clicked.connect(self.scan_imports_requested)
+        hidden_imports_container = self._create_line_edit_with_button(self.hidden_imports_edit,
+                                                                      self.scan_imports_button)
+        advanced_layout.addRow("隐藏导入:", hidden_imports_container)
+        self.exclude_modules_edit = QLineEdit()
+        self.exclude_modules_edit.setPlaceholderText("例如: tkinter, unittest（构建后可用“分析产物”获取建议）")
+        advanced_layout.addRow("排除模块:", self.exclude_modules_edit)
         self.paths_edit = QLineEdit()
-        self.paths_edit.setPlaceholderText("从Conda环境自动检测")
         advanced_layout.addRow("模块路径:", self.paths_edit)
-        self.data_table = self._create_table(["源文件/目录", "在程序中的相对路径"])
+        self.data_table = self._create_table(["源文件/目录", "在程序中的相对路径", "包含", "排除", "文件 / 大小"])
+        self.data_table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked |
+                                        QAbstractItemView.EditTrigger.EditKeyPressed)
+        self.data_table.setToolTip("双击编辑目标路径和过滤模式。包含/排除为逗号分隔的通配符，"
+                                   "如 *.png、docs/*.md；不含 / 的模式匹配文件或目录名")
         data_buttons = self._create_table_buttons(self.data_table)
         advanced_layout.addRow("附加数据:", self.data_table)
         advanced_layout.addRow(data_buttons)
+
+        self.upx_check = QCheckBox("启用")
+        self.upx_check.setToolTip("单目录模式下构建完成后并行压缩，压缩结果按文件内容缓存，未变化的库直接复用；"
+                                  "单文件模式交给PyInstaller压缩")
+        self.upx_dir_edit = QLineEdit()
+        self.upx_dir_edit.setPlaceholderText("UPX所在目录（留空在 PATH 中查找）")
+        browse_upx_btn = QPushButton("浏览...")
+        browse_upx_btn.clicked.connect(self.browse_upx_dir)
+        upx_container = self._create_line_edit_with_button(self.upx_dir_edit, browse_upx_btn)
+        upx_container.layout().insertWidget(0, self.upx_check)
+        advanced_layout.addRow("UPX压缩:", upx_container)
+        self.upx_exclude_edit = QLineEdit()
+        self.upx_exclude_edit.setPlaceholderText("不压缩的二进制文件，例如: vcruntime140.dll, Qt6*.dll")
+        advanced_layout.addRow("UPX排除:", self.upx_exclude_edit)
+
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(0, 19)
+        self.priority_spin.setSpecialValueText("正常")
+        self.priority_spin.setToolTip("构建进程的nice值，越大越少占用前台程序的CPU时间")
+        self.io_idle_check = QCheckBox("低IO优先级")
+        self.io_idle_check.setToolTip("只在磁盘空闲时读写（需要 psutil）")
+        priority_container = QWidget()
+        priority_layout = QHBoxLayout(priority_container)
+        priority_layout.setContentsMargins(0, 0, 0, 0)
+        priority_layout.addWidget(self.priority_spin)
+        priority_layout.addWidget(self.io_idle_check)
+        priority_layout.addStretch()
+        advanced_layout.addRow("构建优先级:", priority_container)
+        self.cpu_affinity_edit = QLineEdit()
+        self.cpu_affinity_edit.setPlaceholderText(f"例如: 0-3,6（留空不限制，共 {os.cpu_count() or 1} 个CPU）")
+        advanced_layout.addRow("CPU亲和性:", self.cpu_affinity_edit)
+        self.memory_limit_spin = QSpinBox()
+        self.memory_limit_spin.setRange(0, 1024 * 1024)
+        self.memory_limit_spin.setSingleStep(256)
+        self.memory_limit_spin.setSuffix(" MB")
+        self.memory_limit_spin.setSpecialValueText("不限制")
+        self.memory_limit_spin.setToolTip("构建进程树的内存占用超过上限时终止构建")
+        advanced_layout.addRow("内存上限:", self.memory_limit_spin)
+        self.build_slots_spin = QSpinBox()
+        self.build_slots_spin.setRange(0, 64)
+        self.build_slots_spin.setSpecialValueText("不限制")
+        self.build_slots_spin.setToolTip("单次构建、构建队列和多环境构建共用的同时运行的PyInstaller进程数上限")
+        advanced_layout.addRow("同时构建上限:", self.build_slots_spin)
         advanced_group.setLayout(advanced_layout)
+        return advanced_group
 
-        layout.addWidget(appearance_group)
-        layout.addWidget(main_settings_group)
-        layout.addWidget(general_group)
-        layout.addWidget(mode_group)
-        layout.addWidget(advanced_group)
-        layout.addStretch()
-        return panel
+    def set_advanced_expanded(self, expanded):
+        """展开或折叠高级打包选项"""
+        if expanded and self.advanced_group is None:
+            self.advanced_group = self._create_advanced_group()
+            self.left_layout.insertWidget(self.left_layout.indexOf(self.advanced_toggle) + 1, self.advanced_group)
+            self._bind_advanced_fields()
+        if self.advanced_group is not None:
+            self.advanced_group.setVisible(expanded)
+        self.advanced_toggle.setArrowType(Qt.ArrowType.DownArrow if expanded else Qt.ArrowType.RightArrow)
+        if self.advanced_toggle.isChecked() != expanded:
+            self.advanced_toggle.setChecked(expanded)
 
     def _create_right_panel(self):
         panel = QWidget()
@@ -180,12 +662,12 @@ class PyInstallerGUI(QMainWindow):
         cmd_layout.addWidget(self.command_preview_label)
         cmd_group.setLayout(cmd_layout)
 
-        output_group = QGroupBox("构建日志")
-        output_layout = QVBoxLayout()
-        self.output_console = QPlainTextEdit()
-        self.output_console.setReadOnly(True)
-        output_layout.addWidget(self.output_console)
-        output_group.setLayout(output_layout)
+        self.output_tabs = QTabWidget()
+        self.output_console = LogConsole()
+        self.output_tabs.addTab(self.output_console, "构建日志")
+        self.output_tabs.addTab(self._create_queue_tab(), "构建队列")
+        self.diagnostics_tab = self._create_diagnostics_tab()
+        self.output_tabs.addTab(self.diagnostics_tab, "诊断")
 
         button_layout = QHBoxLayout()
         self.build_button = QPushButton("开始构建")
@@ -196,17 +678,196 @@ class PyInstallerGUI(QMainWindow):
         self.open_output_dir_button = QPushButton("打开输出目录")
         self.open_output_dir_button.setFixedHeight(35)
         self.open_output_dir_button.setEnabled(False)
+        self.export_phases_button = QPushButton("导出阶段耗时")
+        self.export_phases_button.setFixedHeight(35)
+        self.export_phases_button.setToolTip("把上次构建各阶段（Analysis、PYZ、PKG、EXE、COLLECT）的耗时导出为JSON")
+        self.export_phases_button.setEnabled(False)
 
+        button_layout.addWidget(self.export_phases_button)
         button_layout.addStretch()
         button_layout.addWidget(self.build_button)
         button_layout.addWidget(self.cancel_button)
         button_layout.addWidget(self.open_output_dir_button)
+        self.profile_launch_button = QPushButton("启动分析")
+        self.profile_launch_button.setFixedHeight(35)
+        self.profile_launch_button.setToolTip("多次运行生成的程序，测量冷启动和热启动耗时")
+        self.profile_launch_button.setEnabled(False)
+        button_layout.addWidget(self.profile_launch_button)
+        self.analyze_bundle_button = QPushButton("分析产物")
+        self.analyze_bundle_button.setFixedHeight(35)
+        self.analyze_bundle_button.setToolTip("按体积列出打包进来的模块、二进制和数据文件，并建议可以排除的模块")
+        self.analyze_bundle_button.setEnabled(False)
+        button_layout.addWidget(self.analyze_bundle_button)
 
         layout.addWidget(cmd_group)
-        layout.addWidget(output_group)
+        layout.addWidget(self.output_tabs)
         layout.addLayout(button_layout)
         return panel
 
+    def _create_queue_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        self.queue_table = self._create_table(["任务", "环境", "Python", "状态", "耗时 (秒)", "产物大小 (MB)",
+                                               "退出代码"])
+        self.queue_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.queue_table.setMinimumHeight(120)
+        self.queue_log_view = LogConsole()
+        self.queue_log_view.setPlaceholderText("选中一个任务以查看其日志")
+
+        controls_layout = QHBoxLayout()
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, 64)
+        self.enqueue_button = QPushButton("加入队列")
+        self.matrix_button = QPushButton("多环境构建...")
+        self.matrix_button.setToolTip("选择多个Conda环境，用当前配置在每个环境中各构建一次，输出到 output/<环境名>/")
+        self.remove_job_button = QPushButton("移除选中")
+        self.start_queue_button = QPushButton("开始队列")
+        self.cancel_queue_button = QPushButton("取消队列")
+        self.cancel_queue_button.setEnabled(False)
+        self.export_queue_phases_button = QPushButton("导出耗时")
+        self.export_queue_phases_button.setToolTip("把已完成任务的各阶段耗时导出为JSON")
+        controls_layout.addWidget(QLabel("并行数:"))
+        controls_layout.addWidget(self.parallel_spin)
+        controls_layout.addStretch()
+        controls_layout.addWidget(self.enqueue_button)
+        controls_layout.addWidget(self.matrix_button)
+        controls_layout.addWidget(self.remove_job_button)
+        controls_layout.addWidget(self.start_queue_button)
+        controls_layout.addWidget(self.cancel_queue_button)
+        controls_layout.addWidget(self.export_queue_phases_button)
+
+        agents_layout = QHBoxLayout()
+        self.agents_edit = QLineEdit()
+        self.agents_edit.setPlaceholderText("host:port, host:port（为空时在本机构建）")
+        self.agents_edit.setToolTip("填写后，队列中的任务交给其中最空闲的构建代理，在同名环境中构建并取回产物。"
+                                    "构建代理用 python -m easypack agent 启动")
+        self.agent_token_edit = QLineEdit()
+        self.agent_token_edit.setEchoMode(QLineEdit.EchoMode.Password)
+        self.agent_token_edit.setPlaceholderText("令牌")
+        agents_layout.addWidget(QLabel("构建代理:"))
+        agents_layout.addWidget(self.agents_edit, 3)
+        agents_layout.addWidget(self.agent_token_edit, 1)
+
+        self.queue_summary_label = QLabel("")
+
+        layout.addLayout(controls_layout)
+        layout.addLayout(agents_layout)
+        layout.addWidget(self.queue_table)
+        layout.addWidget(self.queue_summary_label)
+        layout.addWidget(self.queue_log_view)
+        return tab
+
+    def _create_diagnostics_tab(self):
+        """从构建日志中实时提取的警告、缺失模块等，双击定位到日志中的对应行"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        controls_layout = QHBoxLayout()
+        self.diagnostics_kind_combo = QComboBox()
+        self.diagnostics_kind_combo.addItem("全部类型", "")
+        for kind in KINDS:
+            self.diagnostics_kind_combo.addItem(kind, kind)
+        self.diagnostics_filter_edit = QLineEdit()
+        self.diagnostics_filter_edit.setPlaceholderText("按模块或内容筛选")
+        self.diagnostics_fix_button = QPushButton("加入隐藏导入")
+        self.diagnostics_fix_button.setToolTip("把选中诊断中缺失的模块加入隐藏导入 (--hidden-import)")
+        self.diagnostics_fix_button.setEnabled(False)
+        controls_layout.addWidget(self.diagnostics_kind_combo)
+        controls_layout.addWidget(self.diagnostics_filter_edit, 1)
+        controls_layout.addWidget(self.diagnostics_fix_button)
+
+        self.diagnostics_table = self._create_table(["行号", "类型", "模块", "内容"])
+        header = self.diagnostics_table.horizontalHeader()
+        for column in range(3):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        self.diagnostics_table.verticalHeader().setVisible(False)
+        self.diagnostics_table.setToolTip("双击在构建日志中定位到对应的行")
+
+        self.diagnostics_kind_combo.currentIndexChanged.connect(self._apply_diagnostics_filter)
+        self.diagnostics_filter_edit.textChanged.connect(self._apply_diagnostics_filter)
+        self.diagnostics_table.itemSelectionChanged.connect(self._update_diagnostics_fix_button)
+        self.diagnostics_table.cellDoubleClicked.connect(self._show_diagnostic_line)
+        self.diagnostics_fix_button.clicked.connect(self._fix_selected_diagnostics)
+
+        layout.addLayout(controls_layout)
+        layout.addWidget(self.diagnostics_table)
+        return tab
+
+    def clear_diagnostics(self):
+        self.diagnostics_table.setRowCount(0)
+        self._update_diagnostics_title()
+
+    def add_diagnostics(self, diagnostics):
+        """在诊断表末尾追加新发现的诊断，按当前筛选条件决定是否显示"""
+        if not diagnostics:
+            return
+        table = self.diagnostics_table
+        table.setUpdatesEnabled(False)
+        for diagnostic in diagnostics:
+            row = table.rowCount()
+            table.insertRow(row)
+            line_item = QTableWidgetItem(str(diagnostic.line + 1))
+            line_item.setData(Qt.ItemDataRole.UserRole, diagnostic)
+            table.setItem(row, 0, line_item)
+            table.setItem(row, 1, QTableWidgetItem(diagnostic.kind))
+            table.setItem(row, 2, QTableWidgetItem(diagnostic.module))
+            message_item = QTableWidgetItem(diagnostic.message)
+            message_item.setToolTip(diagnostic.message)
+            table.setItem(row, 3, message_item)
+            table.setRowHidden(row, not self._diagnostic_matches(diagnostic))
+        table.setUpdatesEnabled(True)
+        self._update_diagnostics_title()
+
+    def _diagnostic_at(self, row):
+        return self.diagnostics_table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+
+    def _diagnostic_matches(self, diagnostic):
+        kind = self.diagnostics_kind_combo.currentData()
+        text = self.diagnostics_filter_edit.text().strip().lower()
+        return (not kind or diagnostic.kind == kind) and (
+            not text or text in diagnostic.module.lower() or text in diagnostic.message.lower())
+
+    def _apply_diagnostics_filter(self):
+        for row in range(self.diagnostics_table.rowCount()):
+            self.diagnostics_table.setRowHidden(row, not self._diagnostic_matches(self._diagnostic_at(row)))
+        self._update_diagnostics_title()
+
+    def _update_diagnostics_title(self):
+        table = self.diagnostics_table
+        total = table.rowCount()
+        shown = sum(1 for row in range(total) if not table.isRowHidden(row))
+        count = f"{shown}/{total}" if shown != total else str(total)
+        self.output_tabs.setTabText(self.output_tabs.indexOf(self.diagnostics_tab),
+                                    f"诊断 ({count})" if total else "诊断")
+
+    def _selected_hidden_imports(self):
+        """选中的诊断中可以加入隐藏导入、且尚未加入的模块"""
+        existing = set(self.get_hidden_imports())
+        modules = []
+        for index in self.diagnostics_table.selectionModel().selectedRows():
+            module = self._diagnostic_at(index.row()).hidden_import
+            if module and module not in existing and module not in modules:
+                modules.append(module)
+        return modules
+
+    def _update_diagnostics_fix_button(self):
+        self.diagnostics_fix_button.setEnabled(bool(self._selected_hidden_imports()))
+
+    def _fix_selected_diagnostics(self):
+        modules = self._selected_hidden_imports()
+        if modules:
+            self.add_hidden_imports(modules)
+            self.log_to_console(f"已加入隐藏导入: {', '.join(modules)}（下次构建生效）", color='green')
+        self._update_diagnostics_fix_button()
+
+    def _show_diagnostic_line(self, row, column):
+        self.output_tabs.setCurrentWidget(self.output_console)
+        if not self.output_console.scroll_to_line(self._diagnostic_at(row).line):
+            self.show_message("提示", "该行已不在日志中（没有保存日志文件时只保留最近的内容）。", "warning")
+
     def _create_line_edit_with_button(self, line_edit, button):
         container = QWidget()
         layout = QHBoxLayout(container)
@@ -257,38 +918,203 @@ class PyInstallerGUI(QMainWindow):
         if path:
             self.icon_path_edit.setText(path)
 
+    def ask_save_path(self, title, default_path, file_filter):
+        """弹出保存文件对话框，返回选择的路径；取消时返回空字符串"""
+        path, _ = QFileDialog.getSaveFileName(self, title, default_path, file_filter)
+        return path
+
+    def ask_launch_profile_options(self):
+        """询问启动分析的次数以及是否统计导入耗时，返回 (次数, 是否统计导入)；取消时返回None"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("启动分析")
+        layout = QFormLayout(dialog)
+        runs_spin = QSpinBox()
+        runs_spin.setRange(1, 50)
+        runs_spin.setValue(5)
+        imports_check = QCheckBox("统计导入耗时（需要启动分析钩子）")
+        imports_check.setChecked(self.config.launch_hook)
+        imports_check.setEnabled(self.config.launch_hook)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addRow("每种启动的次数:", runs_spin)
+        layout.addRow(imports_check)
+        layout.addRow(buttons)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return None
+        return runs_spin.value(), imports_check.isChecked()
+
+    def browse_upx_dir(self):
+        path = QFileDialog.getExistingDirectory(self, "选择UPX所在目录")
+        if path:
+            self.upx_dir_edit.setText(path)
+
+    def browse_wheelhouse(self):
+        path = QFileDialog.getExistingDirectory(self, "选择本地wheel目录")
+        if path:
+            self.wheelhouse_edit.setText(path)
+
     def add_table_row(self, table, mode='file'):
         if mode == 'file':
             source_path, _ = QFileDialog.getOpenFileName(self, "选择数据文件")
         else:
             source_path = QFileDialog.getExistingDirectory(self, "选择数据目录")
         if source_path:
-            dest_path = os.path.basename(source_path)
-            row_count = table.rowCount()
-            table.insertRow(row_count)
-            table.setItem(row_count, 0, QTableWidgetItem(source_path))
-            table.setItem(row_count, 1, QTableWidgetItem(dest_path))
+            # 目录默认排除版本控制、缓存和虚拟环境等目录
+            excludes = DEFAULT_DATA_EXCLUDES if mode == 'dir' else ()
+            self._insert_data_row(table, source_path, os.path.basename(source_path), (), excludes)
+
+    def _insert_data_row(self, table, source, dest, include, exclude):
+        row = table.rowCount()
+        table.insertRow(row)
+        source_item = QTableWidgetItem(source)
+        source_item.setFlags(source_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        stats_item = QTableWidgetItem("统计中...")
+        stats_item.setFlags(stats_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        # 先设置不参与同步的列，最后一次设置完整一行，只触发一次完整的同步
+        table.setItem(row, 4, stats_item)
+        table.setItem(row, 0, source_item)
+        table.setItem(row, 2, QTableWidgetItem(", ".join(include)))
+        table.setItem(row, 3, QTableWidgetItem(", ".join(exclude)))
+        table.setItem(row, 1, QTableWidgetItem(dest))
 
     def remove_table_row(self, table):
         selected_rows = table.selectionModel().selectedRows()
         for row in sorted([r.row() for r in selected_rows], reverse=True):
             table.removeRow(row)
 
+    def get_hidden_imports(self):
+        return list(self.config.hidden_imports)
+
+    def add_hidden_imports(self, modules):
+        """把模块追加到隐藏导入中，已存在的不重复添加"""
+        imports = self.get_hidden_imports()
+        imports.extend(m for m in modules if m not in imports)
+        if self.hidden_imports_edit is None:
+            self._set_config_field("hidden_imports", tuple(imports))
+        else:
+            self.hidden_imports_edit.setText(", ".join(imports))
+
+    def get_exclude_modules(self):
+        return list(self.config.exclude_modules)
+
+    def add_exclude_modules(self, modules):
+        """把模块追加到排除模块中，已存在的不重复添加"""
+        excludes = self.get_exclude_modules()
+        excludes.extend(m for m in modules if m not in excludes)
+        if self.exclude_modules_edit is None:
+            self._set_config_field("exclude_modules", tuple(excludes))
+        else:
+            self.exclude_modules_edit.setText(", ".join(excludes))
+
+    def set_import_scan_running(self, is_running):
+        self._import_scan_running = is_running
+        if self.scan_imports_button is not None:
+            self.scan_imports_button.setEnabled(not is_running)
+
+    def ask_suggestions(self, title, message, suggestions):
+        """显示建议列表对话框，返回用户勾选的值；取消时返回空列表"""
+        dialog = SuggestionDialog(self, title, message, suggestions)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            return dialog.selected_values()
+        return []
+
     def populate_conda_envs(self, envs):
-        self.conda_env_combo.addItems([""] + list(envs.keys()))
+        """用环境列表刷新下拉框，尽量保留当前选择；列表可能在后台发现过程中多次更新"""
+        names = [""] + list(envs.keys())
+        combo = self.conda_env_combo
+        if names == [combo.itemText(i) for i in range(combo.count())]:
+            return
+        current = combo.currentText()
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItems(names)
+        index = combo.findText(current)
+        combo.setCurrentIndex(max(index, 0))
+        combo.blockSignals(False)
+        if current and index < 0:
+            # 之前选中的环境已不存在
+            combo.currentIndexChanged.emit(0)
+
+    def _set_module_paths(self, paths, placeholder="从Conda环境自动检测"):
+        """设置模块路径；高级打包选项尚未创建时只更新配置模型"""
+        self._paths_placeholder = placeholder
+        if self.paths_edit is None:
+            self._set_config_field("paths", paths)
+        else:
+            self.paths_edit.setPlaceholderText(placeholder)
+            self.paths_edit.setText(paths)
+
+    def clear_env_info(self):
+        """未选择环境或探测失败：清空解释器路径和模块路径"""
+        self.python_executable = None
+        self._set_module_paths("")
+
+    def set_env_probing(self, env_path):
+        """环境探测进行中：先清空路径，等待探测结果"""
+        self.python_executable = None
+        self._set_module_paths("", "正在检测环境...")
 
-    def update_paths_from_env(self, env_path):
-        self.python_executable = os.path.join(env_path, "python.exe")
-        site_packages = os.path.join(env_path, "Lib", "site-packages")
-        self.paths_edit.setText(site_packages if os.path.isdir(site_packages) else "")
+    def apply_env_info(self, info):
+        """用环境探测结果填充解释器路径和模块路径"""
+        self.python_executable = info["executable"]
+        self._set_module_paths(os.pathsep.join(info["site_packages"]))
 
     def log_to_console(self, text, color=None):
-        if color:
-            html_text = f'<font color="{color}">{text.strip()}</font>'
-            self.output_console.appendHtml(html_text)
+        """追加一段文本（可能包含多行）到日志窗口，每次调用只滚动一次；返回拆分出的日志行"""
+        return self.output_console.append_text(text, color)
+
+    def _find_queue_row(self, job_id):
+        for row in range(self.queue_table.rowCount()):
+            if self.queue_table.item(row, 0).data(Qt.ItemDataRole.UserRole) == job_id:
+                return row
+        return -1
+
+    def add_queue_row(self, job):
+        row = self.queue_table.rowCount()
+        self.queue_table.insertRow(row)
+        name_item = QTableWidgetItem(job.name)
+        name_item.setData(Qt.ItemDataRole.UserRole, job.job_id)
+        self.queue_table.setItem(row, 0, name_item)
+        self.queue_table.setItem(row, 1, QTableWidgetItem(job.env_name))
+        self.queue_table.setItem(row, 2, QTableWidgetItem(job.python_version))
+        for column in range(3, self.queue_table.columnCount()):
+            self.queue_table.setItem(row, column, QTableWidgetItem(""))
+        self.update_queue_row(job)
+
+    def update_queue_row(self, job):
+        row = self._find_queue_row(job.job_id)
+        if row < 0:
+            return
+        self.queue_table.item(row, 3).setText(job.status)
+        duration = job.duration
+        self.queue_table.item(row, 4).setText(f"{duration:.1f}" if duration is not None else "")
+        self.queue_table.item(row, 5).setText(f"{job.artifact_size:.2f}" if job.artifact_size is not None else "")
+        self.queue_table.item(row, 6).setText(str(job.return_code) if job.return_code is not None else "")
+
+    def remove_queue_row(self, job_id):
+        row = self._find_queue_row(job_id)
+        if row >= 0:
+            self.queue_table.removeRow(row)
+
+    def selected_queue_job_id(self):
+        selected_rows = self.queue_table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        return self.queue_table.item(selected_rows[0].row(), 0).data(Qt.ItemDataRole.UserRole)
+
+    def show_job_log(self, store):
+        if store is None:
+            self.queue_log_view.set_store(LogStore())
         else:
-            self.output_console.appendPlainText(text.strip())
-        self.output_console.verticalScrollBar().setValue(self.output_console.verticalScrollBar().maximum())
+            self.queue_log_view.set_store(store)
+
+    def set_queue_state(self, is_running):
+        self.start_queue_button.setEnabled(not is_running)
+        self.cancel_queue_button.setEnabled(is_running)
+        self.parallel_spin.setEnabled(not is_running)
+        self.agents_edit.setEnabled(not is_running)
+        self.agent_token_edit.setEnabled(not is_running)
 
     def show_message(self, title, text, level="info"):
         msg_box = QMessageBox(self)
@@ -310,55 +1136,53 @@ class PyInstallerGUI(QMainWindow):
         self.splitter.widget(0).setEnabled(not is_building)
         if is_building:
             self.open_output_dir_button.setEnabled(False)
+            self.profile_launch_button.setEnabled(False)
+            self.analyze_bundle_button.setEnabled(False)
 
-    def get_pyinstaller_command(self):
-        # --- FIX START ---
-        # 确保所有return语句都返回两个值
-        if not self.python_executable or not os.path.exists(self.python_executable):
-            return None, "无效的Python解释器。请选择一个有效的Conda环境。"
-
-        script = self.script_path_edit.text()
-        if not script:
-            return None, "未选择主Python脚本。"
-        # --- FIX END ---
-
-        base_output_dir = os.path.join(os.path.dirname(script), "output")
-        dist_path = os.path.join(base_output_dir, "dist")
-        build_path = os.path.join(base_output_dir, "build")
-        spec_path = base_output_dir
-
-        self.output_path = dist_path
-
-        command = [f'"{self.python_executable}"', "-m", "PyInstaller", f'"{script}"']
-
-        command.extend([
-            f'--distpath="{dist_path}"',
-            f'--workpath="{build_path}"',
-            f'--specpath="{spec_path}"'
-        ])
-
-        command.append("-F" if self.onefile_radio.isChecked() else "-D")
-        if self.app_name_edit.text():
-            command.extend(["--name", f'"{self.app_name_edit.text()}"'])
-        if self.noconsole_check.isChecked():
-            command.append("--noconsole")
-        if self.clean_check.isChecked():
-            command.append("--clean")
-        if self.icon_path_edit.text():
-            command.extend(["--icon", f'"{self.icon_path_edit.text()}"'])
-        if self.paths_edit.text():
-            command.extend(["--paths", f'"{self.paths_edit.text()}"'])
-        for row in range(self.data_table.rowCount()):
-            source = self.data_table.item(row, 0).text()
-            dest = self.data_table.item(row, 1).text()
-            command.extend(["--add-data", f'"{source}{os.pathsep}{dest}"'])
-        if self.hidden_imports_edit.text():
-            imports = [i.strip() for i in self.hidden_imports_edit.text().split(',') if i.strip()]
-            for imp in imports:
-                command.extend(["--hidden-import", imp])
+    def set_launch_profile_state(self, is_profiling):
+        """启动分析期间"启动分析"按钮变为取消按钮"""
+        self.profile_launch_button.setText("取消启动分析" if is_profiling else "启动分析")
+        self.profile_launch_button.setEnabled(True)
+
+    def get_app_name(self):
+        """程序名称，未填写时使用脚本文件名"""
+        return self.config.app_name
 
-        return " ".join(command), None
+    def get_artifact_path(self):
+        """最终产物的路径：单文件模式为可执行文件，单目录模式为程序目录"""
+        if not self.output_path:
+            return None
+        return self.config.artifact_path
+
+    def get_pyinstaller_command(self, clean=None):
+        """由配置模型生成PyInstaller命令；clean为None时按复选框决定是否加 --clean"""
+        command, error = build_command(self.config, clean)
+        if not error:
+            self.output_path = self.config.dist_path
+        return command, error
 
     def update_command_preview(self):
         command, error = self.get_pyinstaller_command()
-        self.command_preview_label.setText(f"<错误: {error}>" if error else command)
\ No newline at end of file
+        if error:
+            self.command_preview_label.setText(f"<错误: {error}>")
+        elif self.config.spec_mode:
+            self.command_preview_label.setText(f"{command}\n（{spec_status(self.config)[1]}）")
+        else:
+            self.command_preview_label.setText(command)
+
+    def ask_spec_conflict(self, spec_path):
+        """打包选项已变化但spec文件已手动修改时询问如何处理，返回处理方式；取消时返回None"""
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("spec文件")
+        msg_box.setIcon(QMessageBox.Icon.Question)
+        msg_box.setText(f"打包选项在生成spec文件之后发生了变化，但spec文件已被手动修改:\n{spec_path}\n\n"
+                        "保留现有的spec文件（界面上的选项变化不会生效），还是按当前选项重新生成（原文件备份为 .bak）？")
+        keep_button = msg_box.addButton("保留spec", QMessageBox.ButtonRole.AcceptRole)
+        regenerate_button = msg_box.addButton("重新生成", QMessageBox.ButtonRole.DestructiveRole)
+        msg_box.addButton(QMessageBox.StandardButton.Cancel)
+        msg_box.exec()
+        if msg_box.clickedButton() is keep_button:
+            return CONFLICT_KEEP
+        if msg_box.clickedButton() is regenerate_button:
+            return CONFLICT_REGENERATE
+        return None
\ No newline at end of file
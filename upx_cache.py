@@ -0,0 +1,222 @@
+# -*- coding = utf-8 -*-
+# @TIME : 2025/10/08 21:12
+# @Author : Grace
+# @File : upx_cache.py
+# @Software : PyCharm Professional 2025.1.2
+# Introduction： UPX 压缩。单目录模式下PyInstaller以 --noupx 构建，构建完成后由 UpxPass 在线程池中并行压缩
+#                dist 中的二进制文件；压缩结果按（原文件内容、UPX版本和参数）的哈希缓存在共享缓存目录中，
+#                未变化的 Qt/NumPy 等库直接复用，不再重复压缩。跳过规则与PyInstaller一致（Qt插件、CFG等）。
+
+import hashlib
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from shared_cache import record_stats, upx_cache_dir
+
+# 与PyInstaller相同的UPX参数：不压缩图标、使用LZMA、安静模式
+UPX_OPTIONS = ["--compress-icons=0", "--lzma", "-q"] + (["--strip-loadconf"] if sys.platform == 'win32' else [])
+# 需要压缩的二进制文件扩展名（.so 之后可以带版本号，如 libfoo.so.1.2）
+_BINARY_SUFFIXES = (".so", ".pyd", ".dll", ".dylib")
+# Qt插件中的元数据标记，PyInstaller据此跳过Qt插件
+_QT_PLUGIN_MARKER = b"QTMETADATA"
+# UPX明确表示文件无法压缩时的输出，只有这些结果会被缓存；其他失败（权限、磁盘空间等）下次仍会重试
+_UNPACKABLE_MARKERS = ("AlreadyPackedException", "already packed", "NotCompressibleException",
+                       "UnknownExecutableFormatException", "CantPackException")
+
+
+def find_upx(upx_dir=""):
+    """返回UPX可执行文件的路径，找不到时返回None"""
+    name = "upx.exe" if sys.platform == 'win32' else "upx"
+    if upx_dir:
+        path = os.path.join(upx_dir, name)
+        return path if os.path.isfile(path) else None
+    return shutil.which(name)
+
+
+@lru_cache(maxsize=8)
+def upx_version(upx_exe):
+    """UPX的版本信息（`upx --version` 的第一行），作为缓存键的一部分"""
+    try:
+        result = subprocess.run([upx_exe, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, errors='replace', timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return result.stdout.splitlines()[0] if result.stdout else ""
+
+
+def upx_supported():
+    """
+    与PyInstaller一致，只在Windows上使用UPX：Linux上压缩过的动态库在加载时可能崩溃，macOS上大多无法压缩且会破坏签名。
+    设置 PYINSTALLER_FORCE_UPX 环境变量可以强制启用。
+    """
+    return sys.platform in ('win32', 'cygwin') or os.environ.get("PYINSTALLER_FORCE_UPX", "0") != "0"
+
+
+def is_binary(path):
+    name = os.path.basename(path).lower()
+    return name.endswith(_BINARY_SUFFIXES) or ".so." in name
+
+
+def _has_control_flow_guard(data):
+    """Windows 上启用了控制流保护（CFG）的二进制文件不能用UPX压缩，按PE头中的 DllCharacteristics 判断"""
+    if data[:2] != b"MZ" or len(data) < 0x40:
+        return False
+    pe_offset = int.from_bytes(data[0x3C:0x40], "little")
+    characteristics_offset = pe_offset + 24 + 70
+    if data[pe_offset:pe_offset + 4] != b"PE\0\0" or len(data) < characteristics_offset + 2:
+        return False
+    return bool(int.from_bytes(data[characteristics_offset:characteristics_offset + 2], "little") & 0x4000)
+
+
+def _inspect(path, salt):
+    """分块读取文件，返回 (缓存键, 文件头, 是否为Qt插件)，避免把大型库整个读入内存"""
+    digest = hashlib.sha256(salt + b"\0")
+    header = b""
+    is_qt_plugin = False
+    tail = b""
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+            if not header:
+                header = block[:4096]
+            if not is_qt_plugin:
+                is_qt_plugin = _QT_PLUGIN_MARKER in tail + block
+                tail = block[-len(_QT_PLUGIN_MARKER):]
+    return digest.hexdigest(), header, is_qt_plugin
+
+
+def skip_reason(path, header, is_qt_plugin, exclude_patterns):
+    """不应压缩的原因，可以压缩时返回None"""
+    pure_path = pathlib.PurePath(path)
+    for pattern in exclude_patterns:
+        # 与 --upx-exclude 相同，使用 PurePath.match 从路径末尾开始匹配
+        if pure_path.match(pattern):
+            return f"匹配排除模式 {pattern}"
+    if is_qt_plugin:
+        return "Qt插件"
+    if sys.platform == 'win32' and _has_control_flow_guard(header):
+        return "启用了CFG"
+    if sys.platform.startswith('linux') and (
+            os.path.isfile(os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.hmac")) or
+            os.path.isfile(os.path.splitext(path)[0] + ".chk")):
+        return "带有 .hmac/.chk 校验文件"
+    return None
+
+
+def _replace_file(source, target):
+    """用 source 的内容替换 target，保留 target 的权限"""
+    tmp_path = f"{target}.easypack-upx"
+    shutil.copyfile(source, tmp_path)
+    shutil.copymode(target, tmp_path)
+    os.replace(tmp_path, target)
+
+
+class UpxPass:
+    """单目录产物的UPX压缩：并行压缩，按内容哈希缓存压缩结果"""
+
+    def __init__(self, app_dir, upx_dir="", exclude_patterns=(), max_workers=None):
+        self.app_dir = app_dir
+        self.upx_dir = upx_dir
+        self.exclude_patterns = tuple(exclude_patterns)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_dir = upx_cache_dir()
+
+    def run(self, on_output, is_cancelled=lambda: False):
+        """压缩 app_dir 中的所有二进制文件，返回是否成功（找不到UPX时返回False）"""
+        if not upx_supported():
+            on_output("UPX: 当前平台上压缩动态库可能导致程序崩溃，与PyInstaller一致不进行压缩"
+                      "（设置 PYINSTALLER_FORCE_UPX=1 可强制启用）\n")
+            return True
+        upx_exe = find_upx(self.upx_dir)
+        if upx_exe is None:
+            on_output("错误: 未找到UPX，无法压缩\n")
+            return False
+        salt = "\0".join([upx_version(upx_exe)] + UPX_OPTIONS).encode('utf-8')
+
+        binaries = []
+        for dirpath, _, filenames in os.walk(self.app_dir):
+            binaries.extend(os.path.join(dirpath, name) for name in filenames if is_binary(name))
+        # 大文件先开始，缩短整体耗时
+        binaries.sort(key=lambda path: os.path.getsize(path), reverse=True)
+
+        start = time.monotonic()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(
+                lambda path: self._process(path, upx_exe, salt, is_cancelled), binaries
+            ))
+        if is_cancelled():
+            return False
+
+        counts = {"cached": 0, "compressed": 0, "skipped": 0, "failed": 0}
+        size_before = size_after = 0
+        for path, (outcome, before, after, note) in zip(binaries, results):
+            counts[outcome] += 1
+            size_before += before
+            size_after += after
+            if note:
+                on_output(f"  UPX 跳过 {os.path.relpath(path, self.app_dir)}: {note}\n")
+        on_output(f"UPX: {len(binaries)} 个二进制文件，复用缓存 {counts['cached']} 个，新压缩 {counts['compressed']} 个，"
+                  f"跳过 {counts['skipped'] + counts['failed']} 个；"
+                  f"{size_before / 2 ** 20:.1f} MB → {size_after / 2 ** 20:.1f} MB，"
+                  f"耗时 {time.monotonic() - start:.1f} 秒\n")
+        record_stats("upx", counts["cached"], counts["compressed"])
+        return True
+
+    def _process(self, path, upx_exe, salt, is_cancelled):
+        """压缩单个文件，返回 (结果, 压缩前大小, 压缩后大小, 说明)"""
+        if is_cancelled():
+            return "skipped", 0, 0, None
+        size = os.path.getsize(path)
+        key, header, is_qt_plugin = _inspect(path, salt)
+        reason = skip_reason(path, header, is_qt_plugin, self.exclude_patterns)
+        if reason is not None:
+            return "skipped", size, size, reason
+
+        cached = os.path.join(self.cache_dir, key[:2], key)
+        if os.path.isfile(cached + ".skip"):
+            return "failed", size, size, None  # 之前已确认UPX无法压缩
+        if os.path.isfile(cached):
+            os.utime(cached)  # 记录最近一次使用，用于淘汰
+            _replace_file(cached, path)
+            return "cached", size, os.path.getsize(cached), None
+
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+        creation_flags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        try:
+            result = subprocess.run([upx_exe, *UPX_OPTIONS, "-o", tmp_path, path],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                    errors='replace', creationflags=creation_flags)
+        except OSError as e:
+            return "failed", size, size, f"无法运行UPX: {e}"
+        if result.returncode != 0 or not os.path.isfile(tmp_path):
+            # UPX确认已压缩过、格式不支持等：记住结果，下次不再尝试；其他失败只报告
+            if any(marker in result.stdout for marker in _UNPACKABLE_MARKERS):
+                open(cached + ".skip", 'w').close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            lines = result.stdout.strip().splitlines()
+            return "failed", size, size, lines[-1] if lines else f"退出代码 {result.returncode}"
+        os.replace(tmp_path, cached)
+        _replace_file(cached, path)
+        return "compressed", size, os.path.getsize(cached), None
+
+
+def uses_upx_pass(config):
+    """单目录模式由EasyPack在构建后并行压缩；单文件模式的二进制在产物内部，只能交给PyInstaller压缩"""
+    return config.upx and not config.onefile
+
+
+def make_upx_pass(config):
+    """需要在构建后压缩时返回 UpxPass，否则返回None"""
+    if not uses_upx_pass(config):
+        return None
+    return UpxPass(config.artifact_path, config.upx_dir, config.upx_exclude)